@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+
+try:
+    from src.benchmark import (
+        run_benchmark, compare_reports, DEFAULT_SIZES, DEFAULT_SEED, DEFAULT_ROUNDS,
+        DEFAULT_NOVEL_RATE, DEFAULT_BUILD_TIMEOUT
+    )
+except ImportError as e:
+    print(f"❌ FATAL ERROR: Gagal mengimpor modul. Pastikan semua file .py ada: {e}")
+    exit()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def main():
+    """
+    Benchmark skala: korpus sintetis (dari distribusi corpus_master.csv)
+    -> build_index.py -> load aset -> latensi p50/p95/p99. Hasil: JSON.
+    Contoh: python bench.py --sizes 10000 100000 1000000 --output bench_baru.json --compare bench_lama.json
+    """
+    parser = argparse.ArgumentParser(description="Benchmark Skala Mesin Pencari STKI")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=list(DEFAULT_SIZES),
+        help=f"Ukuran korpus sintetis (jumlah ulasan), default: {' '.join(map(str, DEFAULT_SIZES))}"
+    )
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Seed generator korpus & kueri")
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=DEFAULT_ROUNDS,
+        help=f"Berapa kali campuran kueri diulang per operasi (default: {DEFAULT_ROUNDS})"
+    )
+    parser.add_argument(
+        "--novel-rate",
+        type=float,
+        default=DEFAULT_NOVEL_RATE,
+        help="Porsi token dari kosakata sintetis baru (pertumbuhan kosakata, default: %(default)s)"
+    )
+    parser.add_argument("--build-workers", type=int, default=1, help="--workers untuk build_index.py")
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_BUILD_TIMEOUT,
+        help="Batas waktu (detik) build & probe per ukuran; ukuran yang melewati batas dianggap gagal"
+    )
+    parser.add_argument("--workdir", type=str, default=None, help="Folder workspace (default: folder sementara)")
+    parser.add_argument("--keep", action="store_true", help="Jangan hapus workspace (korpus & aset sintetis)")
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="benchmark_results.json",
+        help="File JSON hasil (default: benchmark_results.json)"
+    )
+    parser.add_argument("--compare", type=str, default=None, help="File JSON run sebelumnya untuk dibandingkan")
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        BASE_DIR, sizes=sorted(set(args.sizes)), seed=args.seed, rounds=max(args.rounds, 1),
+        novel_rate=args.novel_rate, build_workers=max(args.build_workers, 1), build_timeout=args.timeout,
+        workdir=args.workdir, keep=args.keep
+    )
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Hasil benchmark disimpan ke '{args.output}'.")
+
+    if args.compare:
+        try:
+            with open(args.compare, encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"❌ GAGAL membaca '{args.compare}': {e}")
+            return
+        print(f"\n--- Perbandingan dengan '{args.compare}' (rasio < 1 = lebih cepat/kecil) ---")
+        for size, name, old, new, ratio in compare_reports(baseline, report):
+            print(f"{size:>9,} | {name:<32} {old:>12.3f} -> {new:>12.3f}  x{ratio:.2f}")
+
+if __name__ == "__main__":
+    main()
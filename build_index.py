@@ -1,12 +1,18 @@
+import argparse
 import pandas as pd
-import math
 import joblib
 import os
-import json
 
 try:
-    from src.preprocessing import full_preprocessing
-    from src.vsm_structures import SlinkedList, Node
+    from src.indexer import (
+        preprocess_corpus, count_document_frequencies, compute_idf,
+        build_boolean_index, build_vsm_index, build_metadata, build_index_parallel
+    )
+    from src.mmap_index import write_index, INDEX_FILENAME
+    from src.segments import install_base_index
+    from src.places import PlaceTable, slim_metadata
+    from src.utils import PLACES_FILENAME
+    from src import preprocessing
 except ImportError as e:
     print(f"❌ FATAL ERROR: Gagal mengimpor modul. Pastikan semua file .py ada: {e}")
     exit()
@@ -15,153 +21,104 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 KORPUS_FOLDER = 'Documents'
 KORPUS_FILENAME = 'corpus_master.csv'
 DATASET_PATH = os.path.join(BASE_DIR, KORPUS_FOLDER, KORPUS_FILENAME)
-
-try:
-    print(f"🔄 Memuat korpus dari: {DATASET_PATH} ...")
-    df_corpus = pd.read_csv(DATASET_PATH)
-    print(f"✅ Berhasil memuat korpus dari: {DATASET_PATH}")
-except FileNotFoundError:
-    print(f"❌ FATAL ERROR: File korpus tidak ditemukan di: {DATASET_PATH}")
-    print("   Pastikan folder 'korpus' dan file 'corpus_master.csv' ada.")
-    exit() # Hentikan skrip jika korpus tidak ada
-except Exception as e:
-    print(f"❌ FATAL ERROR saat memuat korpus: {e}")
-    exit()
-
-# --- 3. APLIKASI PREPROCESSING & HITUNG DF & IDF (INDEXING PHASE 1) ---
-# Pastikan dataset sudah dimuat di df_corpus
-print("🔄 Memulai preprocessing dan perhitungan DF/IDF...")
-df_corpus['Teks_Mentah'] = df_corpus['Teks_Mentah'].fillna('')
-df_corpus['Clean_Tokens'] = df_corpus['Teks_Mentah'].apply(full_preprocessing)
-
-N = len(df_corpus)
-df_counts = {} # Document Frequency
-
-for tokens in df_corpus['Clean_Tokens']:
-    for word in set(tokens): 
-        df_counts[word] = df_counts.get(word, 0) + 1
-
-idf_scores = {}
-for term, count in df_counts.items():
-    idf_scores[term] = math.log10(N / count)
-print("✅ Selesai preprocessing dan perhitungan DF/IDF.")
-
-# --- 4. BUILDING THE INVERTED INDEX WITH TF-IDF (INDEXING PHASE 2) ---
-print("🔄 Membangun Boolean inverted index...")
-boolean_inverted_index = {} # dict(term -> set(doc_ids))
-unique_words_all = set(df_counts.keys())
-
-# Inisialisasi semua term dengan set kosong
-for word in unique_words_all:
-    boolean_inverted_index[word] = set()
-
-# Isi set dengan Doc_ID yang relevan
-for index, row in df_corpus.iterrows():
-    doc_id = row['Doc_ID']
-    tokens = row['Clean_Tokens']
-    
-    for term in set(tokens): # Hanya term unik per dokumen
-        if term in boolean_inverted_index:
-            boolean_inverted_index[term].add(doc_id)
-print("✅ Selesai membangun Boolean inverted index.")
-
-# --- 5. BUILDING THE VSM INVERTED INDEX WITH LINKED LIST (INDEXING PHASE 3) ---
-print("🔄 Membangun VSM inverted index (Linked List) dengan RAW TF...")
-vsm_index_tf = {} 
-
-for word in unique_words_all:
-    vsm_index_tf[word] = SlinkedList()
-    vsm_index_tf[word].head = Node(docId=0, freq=None) 
-
-for index, row in df_corpus.iterrows():
-    doc_id = row['Doc_ID']
-    tokens = row['Clean_Tokens']
-    
-    tf_in_doc = {word: tokens.count(word) for word in set(tokens)}
-
-    for term, tf in tf_in_doc.items():
-        if term in idf_scores: # Pastikan term ada di IDF
-            
-            # Cari ujung linked list untuk term ini
-            current_node = vsm_index_tf[term].head
-            while current_node.nextval is not None:
-                current_node = current_node.nextval
-            
-            # Tambahkan node baru di ujung
-            current_node.nextval = Node(docId=doc_id, freq=tf)
-print("✅ Selesai membangun VSM inverted index (Raw TF).")
-
-# Mapping Doc ID to Name and Rating for final result
-df_metadata = df_corpus[['Doc_ID', 'Nama_Tempat', 'Lokasi', 'Rating']].copy()
-avg_rating_per_place = df_metadata.groupby('Nama_Tempat')['Rating'].mean().reset_index()
-avg_rating_per_place.rename(columns={'Rating': 'Avg_Rating'}, inplace=True)
-df_metadata = df_metadata.merge(avg_rating_per_place, on='Nama_Tempat', how='left')
-
-# Kita gabungkan data statis (foto, harga, dll) dari info_tempat.csv
-try:
-    print("🔄 Memuat data statis (foto, harga, dll)...")
-    INFO_STATIS_PATH = os.path.join(BASE_DIR, KORPUS_FOLDER, 'info_tempat.csv')
-    df_info_statis = pd.read_csv(INFO_STATIS_PATH)
-    print(f"✅ Berhasil memuat data statis dari: {INFO_STATIS_PATH}")
-
-    # Definisikan parser JSON yang aman HANYA UNTUK HARGA
-    def parse_price_json(json_str):
-        if pd.isna(json_str) or not isinstance(json_str, str) or not json_str.startswith('['):
-            return [] # Fallback: list kosong
-        try:
-            # Membaca string JSON dari CSV
-            return json.loads(json_str) 
-        except (json.JSONDecodeError, TypeError):
-            return [] # Fallback jika JSON rusak
-
-    # 1. Proses Price_Items (HARUSNYA Tipe List) -> BENAR
-    df_info_statis['Price_Items'] = df_info_statis['Price_Items'].apply(parse_price_json)
-    
-    # 2. Proses Facilities (HARUSNYA Tipe String) -> BENAR
-    df_info_statis['Facilities'] = df_info_statis['Facilities'].fillna("").astype(str)
-    
-    # 3. Proses kolom lain (Jaga-jaga) -> BENAR
-    df_info_statis['Photo_URL'] = df_info_statis['Photo_URL'].fillna("")
-    df_info_statis['Gmaps_Link'] = df_info_statis['Gmaps_Link'].fillna("")
-
-    # Gabungkan data statis ke metadata utama berdasarkan 'Nama_Tempat'
-    df_metadata = df_metadata.merge(df_info_statis, on='Nama_Tempat', how='left')
-    print("✅ Berhasil menggabungkan data statis (foto, harga, dll).")
-
-    # 4. FINAL FALLBACK -> BENAR
-    df_metadata['Price_Items'] = df_metadata['Price_Items'].apply(lambda x: [] if isinstance(x, float) and pd.isna(x) else x)
-    df_metadata['Facilities'] = df_metadata['Facilities'].fillna("")
-    df_metadata['Waktu_Buka'] = df_metadata['Waktu_Buka'].fillna("Info tidak tersedia")
-    df_metadata['Photo_URL'] = df_metadata['Photo_URL'].fillna("")
-    df_metadata['Gmaps_Link'] = df_metadata['Gmaps_Link'].fillna("")
-    
-except FileNotFoundError:
-    print(f"⚠️ PERINGATAN: {INFO_STATIS_PATH} tidak ditemukan.")
-    print("   Melanjutkan tanpa data foto/harga/fasilitas.")
-    # Buat kolom placeholder KONSISTEN
-    df_metadata['Price_Items'] = [[] for _ in range(len(df_metadata))] # Tipe List
-    df_metadata['Facilities'] = "" # Tipe String
-    df_metadata['Waktu_Buka'] = "Info tidak tersedia"
-    df_metadata['Photo_URL'] = ""
-    df_metadata['Gmaps_Link'] = ""
-
-# Jadikan Doc_ID sebagai index
-df_metadata.set_index('Doc_ID', inplace=True)
-
-# --- SIMPAN HASIL INDEXING KE FILE ASET ---
-
+INFO_STATIS_PATH = os.path.join(BASE_DIR, KORPUS_FOLDER, 'info_tempat.csv')
 OUTPUT_DIR = 'Assets'
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-try:
-    print("🔄 Menyimpan file aset (.pkl)...")
-    joblib.dump(idf_scores, os.path.join(OUTPUT_DIR, 'idf_scores.pkl'))
-    joblib.dump(vsm_index_tf, os.path.join(OUTPUT_DIR, 'vsm_index_tf.pkl'))
-    joblib.dump(df_metadata, os.path.join(OUTPUT_DIR, 'df_metadata.pkl'))
-
-    joblib.dump(boolean_inverted_index, os.path.join(OUTPUT_DIR, 'boolean_index.pkl'))
-
-    print(f"✅ SUKSES: Semua file aset (.pkl) telah dibuat dan disimpan di folder '{OUTPUT_DIR}'.")
 
-except Exception as e:
-    print(f"❌ GAGAL menyimpan file aset: {e}")
\ No newline at end of file
+def main():
+    parser = argparse.ArgumentParser(description="Build indeks STKI (Boolean, VSM, index.bin)")
+    parser.add_argument(
+        "--workers", 
+        type=int, 
+        default=1, 
+        help="Jumlah proses untuk preprocessing & indexing paralel (default 1 = serial)"
+    )
+    args = parser.parse_args()
+
+    try:
+        print(f"🔄 Memuat korpus dari: {DATASET_PATH} ...")
+        df_corpus = pd.read_csv(DATASET_PATH)
+        print(f"✅ Berhasil memuat korpus dari: {DATASET_PATH}")
+    except FileNotFoundError:
+        print(f"❌ FATAL ERROR: File korpus tidak ditemukan di: {DATASET_PATH}")
+        print("   Pastikan folder 'korpus' dan file 'corpus_master.csv' ada.")
+        exit() # Hentikan skrip jika korpus tidak ada
+    except Exception as e:
+        print(f"❌ FATAL ERROR saat memuat korpus: {e}")
+        exit()
+
+    # --- 3. APLIKASI PREPROCESSING & HITUNG DF & IDF (INDEXING PHASE 1) ---
+    # Snapshot analyzer (stopwords + kamus) dibuat ulang dari sumbernya; worker paralel memuatnya
+    try:
+        preprocessing.rebuild_analyzer()
+    except OSError as e:
+        print(f"⚠️ Gagal menyimpan snapshot analyzer: {e}")
+    if args.workers > 1:
+        # Mode paralel: preprocessing + postings parsial per shard (PHASE 1 & 3 sekaligus)
+        print(f"🔄 Memulai preprocessing & indexing paralel ({args.workers} worker)...")
+        df_corpus, df_counts, vsm_index_tf = build_index_parallel(df_corpus, args.workers)
+    else:
+        print("🔄 Memulai preprocessing dan perhitungan DF/IDF...")
+        df_corpus = preprocess_corpus(df_corpus)
+        df_counts = count_document_frequencies(df_corpus['Clean_Tokens'])
+        vsm_index_tf = None
+    idf_scores = compute_idf(df_counts, len(df_corpus))
+    print("✅ Selesai preprocessing dan perhitungan DF/IDF.")
+    if args.workers <= 1:
+        print(f"   Kamus stem: {preprocessing.STEM_CACHE.format_stats()}")
+    try:
+        preprocessing.save_stem_cache()
+    except OSError as e:
+        print(f"⚠️ Gagal menyimpan kamus stem: {e}")
+
+    # --- 4. BUILDING THE INVERTED INDEX WITH TF-IDF (INDEXING PHASE 2) ---
+    print("🔄 Membangun Boolean inverted index...")
+    boolean_inverted_index = build_boolean_index(df_corpus['Doc_ID'], df_corpus['Clean_Tokens'])
+    print("✅ Selesai membangun Boolean inverted index.")
+
+    # --- 5. BUILDING THE VSM INVERTED INDEX WITH COMPACT POSTINGS (INDEXING PHASE 3) ---
+    if vsm_index_tf is None:
+        print("🔄 Membangun VSM inverted index (Postings Array) dengan RAW TF...")
+        vsm_index_tf = build_vsm_index(df_corpus['Doc_ID'], df_corpus['Clean_Tokens'])
+        print("✅ Selesai membangun VSM inverted index (Raw TF).")
+
+    # Mapping Doc ID to Name and Rating for final result (+ data statis info_tempat.csv)
+    df_metadata = build_metadata(df_corpus, INFO_STATIS_PATH)
+
+    # Pisahkan data per-tempat (foto, harga, fasilitas) ke tabel tempat + kartu hasil
+    place_table = PlaceTable.from_metadata(df_metadata)
+    df_metadata = slim_metadata(df_metadata)
+    print(f"✅ Tabel tempat dibuat ({len(place_table)} tempat untuk {len(df_metadata)} ulasan).")
+
+    # Partisi region (hierarki config_region_map.csv) + listing tempat urut Avg_Rating per region
+    place_table.assign_regions(preprocessing.classify_location)
+    n_tanpa_region = sum(not regions for regions in place_table.place_regions)
+    print(f"✅ Region ditetapkan ({len(place_table.region_codes)} region, {n_tanpa_region} tempat tanpa region).")
+
+    # --- SIMPAN HASIL INDEXING KE FILE ASET ---
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    try:
+        print("🔄 Menyimpan file aset (.pkl)...")
+        joblib.dump(idf_scores, os.path.join(OUTPUT_DIR, 'idf_scores.pkl'))
+        joblib.dump(vsm_index_tf, os.path.join(OUTPUT_DIR, 'vsm_index_tf.pkl'))
+        joblib.dump(df_metadata, os.path.join(OUTPUT_DIR, 'df_metadata.pkl'))
+        joblib.dump(place_table, os.path.join(OUTPUT_DIR, PLACES_FILENAME))
+
+        joblib.dump(boolean_inverted_index, os.path.join(OUTPUT_DIR, 'boolean_index.pkl'))
+
+        print(f"✅ SUKSES: Semua file aset (.pkl) telah dibuat dan disimpan di folder '{OUTPUT_DIR}'.")
+
+        # Format biner mmap (dipakai utama oleh load_assets & initialize_boolean)
+        print(f"🔄 Menyimpan indeks biner ({INDEX_FILENAME})...")
+        # Ditulis ke file staging dulu; build penuh sudah mencakup semua dokumen,
+        # jadi index.bin diganti bersamaan dengan pembuangan segmen inkremental lama
+        staged_path = os.path.join(OUTPUT_DIR, f"{INDEX_FILENAME}.new")
+        write_index(staged_path, idf_scores, vsm_index_tf, df_metadata, places=place_table)
+        install_base_index(OUTPUT_DIR, staged_path)
+        print(f"✅ SUKSES: {INDEX_FILENAME} disimpan di folder '{OUTPUT_DIR}'.")
+
+    except Exception as e:
+        print(f"❌ GAGAL menyimpan file aset: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -101,16 +101,21 @@ def run_evaluation():
     results = []
     map_scores = defaultdict(list) # Untuk menyimpan skor AP per skema
 
+    # 3b. Skor VSM semua kueri sekaligus (API batch: satu perkalian matriks sparse per skema)
+    query_texts = [item['query_text'] for item in queries]
+    vsm_batches = {
+        (scheme, scoring): mesin_pencari.search_many(query_texts, k=10, weighting=scheme, scoring=scoring)
+        for scheme in ('tfidf', 'sublinear') for scoring in ('dot', 'cosine')
+    }
+    vsm_batches[('bm25', 'dot')] = mesin_pencari.search_many(query_texts, k=10, weighting='bm25', scoring='dot')
+
     # 4. Iterasi setiap kueri di Gold Set
-    for item in queries:
+    for i, item in enumerate(queries):
         query_id = item['query_id']
         query_text = item['query_text']
         relevant_docs = item['relevant_docs']
         
         print(f"\n--- Mengevaluasi QID: {query_id} ('{query_text}') ---")
-        
-        # 4a. Dapatkan token VSM (untuk model VSM)
-        vsm_tokens, _, _ = mesin_pencari.analyze_full_query(query_text)
 
         # === 4b. Evaluasi Model Boolean (Soal 03) ===
         bool_retrieved = boolean_ir.search_boolean(query_text)
@@ -124,7 +129,7 @@ def run_evaluation():
         
         # === 4c. Evaluasi Model VSM (TF-IDF) (Soal 04) ===
         # Panggil fungsi inti VSM yang sudah di-refactor
-        vsm_tfidf_results = mesin_pencari._calculate_vsm_scores(vsm_tokens, 'tfidf')
+        vsm_tfidf_results = vsm_batches[('tfidf', 'dot')][i]['results']
         vsm_tfidf_docs = [doc_id for doc_id, score in vsm_tfidf_results]
         ap_tfidf = calc_average_precision_map(vsm_tfidf_docs, relevant_docs)
         map_scores['tfidf'].append(ap_tfidf)
@@ -136,7 +141,7 @@ def run_evaluation():
         })
 
         # === 4d. Evaluasi Model VSM (Sublinear TF) (Soal 05) ===
-        vsm_sublin_results = mesin_pencari._calculate_vsm_scores(vsm_tokens, 'sublinear')
+        vsm_sublin_results = vsm_batches[('sublinear', 'dot')][i]['results']
         vsm_sublin_docs = [doc_id for doc_id, score in vsm_sublin_results]
         ap_sublin = calc_average_precision_map(vsm_sublin_docs, relevant_docs)
         map_scores['sublinear'].append(ap_sublin)
@@ -147,6 +152,30 @@ def run_evaluation():
             "Details": f"(Top 3: {vsm_sublin_docs[:3]})"
         })
 
+        # === 4d2. Evaluasi BM25 (bobot posting dihitung saat build_index.py) ===
+        bm25_docs = [doc_id for doc_id, score in vsm_batches[('bm25', 'dot')][i]['results']]
+        ap_bm25 = calc_average_precision_map(bm25_docs, relevant_docs)
+        map_scores['bm25'].append(ap_bm25)
+        results.append({
+            "QID": query_id,
+            "Model": "BM25",
+            "Metrics": f"AP@10: {ap_bm25:.3f}",
+            "Details": f"(Top 3: {bm25_docs[:3]})"
+        })
+
+        # === 4e. Evaluasi VSM Cosine (matriks sparse, dinormalisasi) ===
+        for scheme, label in [('tfidf', 'TF-IDF'), ('sublinear', 'Sublinear')]:
+            cosine_results = vsm_batches[(scheme, 'cosine')][i]['results']
+            cosine_docs = [doc_id for doc_id, score in cosine_results]
+            ap_cosine = calc_average_precision_map(cosine_docs, relevant_docs)
+            map_scores[f'cosine_{scheme}'].append(ap_cosine)
+            results.append({
+                "QID": query_id,
+                "Model": f"VSM Cosine ({label})",
+                "Metrics": f"AP@10: {ap_cosine:.3f}",
+                "Details": f"(Top 3: {cosine_docs[:3]})"
+            })
+
     # 5. Tampilkan Laporan Hasil
     print("\n\n--- 📊 HASIL EVALUASI KESELURUHAN ---")
     df_results = pd.DataFrame(results)
@@ -158,6 +187,12 @@ def run_evaluation():
     
     print(f"Mean Average Precision (MAP@10) [TF-IDF]:     {map_tfidf:.4f}")
     print(f"Mean Average Precision (MAP@10) [Sublinear]:  {map_sublin:.4f}")
+    map_cos_tfidf = sum(map_scores['cosine_tfidf']) / len(map_scores['cosine_tfidf'])
+    map_cos_sublin = sum(map_scores['cosine_sublinear']) / len(map_scores['cosine_sublinear'])
+    print(f"Mean Average Precision (MAP@10) [Cosine TF-IDF]:    {map_cos_tfidf:.4f}")
+    print(f"Mean Average Precision (MAP@10) [Cosine Sublinear]: {map_cos_sublin:.4f}")
+    map_bm25 = sum(map_scores['bm25']) / len(map_scores['bm25'])
+    print(f"Mean Average Precision (MAP@10) [BM25]:       {map_bm25:.4f}")
     
     if map_sublin > map_tfidf:
         print("Analisis: Skema 'Sublinear' memberikan performa ranking yang lebih baik.")
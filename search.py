@@ -1,8 +1,15 @@
 import argparse
 import json
+import sys
+import time
+_IMPORT_START = time.perf_counter()
 from src import preprocessing
 from src import boolean_ir
 from src import mesin_pencari
+from src import instrumentation
+from src.vsm_structures import WEIGHTING_SCHEMES
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
+HEAVY_MODULES = ('pandas', 'scipy', 'joblib', 'nltk', 'Sastrawi', 'streamlit')
 
 def main_cli():
     """
@@ -19,12 +26,39 @@ def main_cli():
         required=True, 
         help="Model retrieval yang akan digunakan ('boolean' or 'vsm')"
     )
-    parser.add_argument(
+    query_group = parser.add_mutually_exclusive_group(required=True)
+    query_group.add_argument(
         "--query", 
         type=str, 
-        required=True, 
         help="Teks kueri yang akan dicari"
     )
+    query_group.add_argument(
+        "--queries-file",
+        type=str,
+        help="File JSONL berisi banyak kueri (satu objek per baris, kunci 'query' atau 'query_text'); mode batch"
+    )
+    parser.add_argument(
+        "--places",
+        action="store_true",
+        help="VSM: tampilkan rekomendasi tempat (seperti aplikasi web) per halaman, bukan Doc_ID"
+    )
+    parser.add_argument(
+        "--page",
+        type=int,
+        default=1,
+        help="Halaman hasil untuk --places (mulai 1; ukuran halaman = --k)"
+    )
+    parser.add_argument(
+        "--all-pages",
+        action="store_true",
+        help="Untuk --places: cetak semua halaman berurutan (diambil lazy, halaman demi halaman)"
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="File JSONL hasil mode batch (default: dicetak ke layar)"
+    )
     parser.add_argument(
         "--k", 
         type=int, 
@@ -34,13 +68,77 @@ def main_cli():
     parser.add_argument(
         "--weighting", 
         type=str, 
-        choices=['tfidf', 'sublinear'], 
+        choices=list(WEIGHTING_SCHEMES), 
         default='tfidf', 
-        help="Skema pembobotan VSM ('tfidf' atau 'sublinear')"
+        help="Skema pembobotan VSM ('tfidf', 'sublinear' atau 'bm25'); bobot dokumen sudah dihitung saat build_index.py"
+    )
+    parser.add_argument(
+        "--scoring", 
+        type=str, 
+        choices=['dot', 'cosine'], 
+        default='dot', 
+        help="Fungsi skor VSM: 'dot' (dot product, default) atau 'cosine' (matriks sparse + norma dokumen)"
+    )
+    parser.add_argument(
+        "--timing",
+        action="store_true",
+        help="Cetak laporan waktu import, inisialisasi aset & analyzer, dan pencarian"
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        nargs="?",
+        const="all",
+        default=None,
+        help="Profiling pencarian: 'cprofile', 'tracemalloc' atau 'all' (default env STKI_PROFILE); "
+             "juga mencetak latensi per tahap"
     )
     
     args = parser.parse_args()
-    
+    timings = {'import modul src': IMPORT_SECONDS}
+    try:
+        if args.profile is not None:
+            profile_modes = instrumentation.parse_profile_modes(args.profile)
+        else:
+            profile_modes = instrumentation.profile_modes_from_env()
+    except ValueError as e:
+        parser.error(str(e))
+    if profile_modes:
+        instrumentation.enable()
+
+    if args.queries_file:
+        main_batch(args, timings, profile_modes)
+    else:
+        run_single(args, timings, profile_modes)
+    if args.timing:
+        print_timing_report(timings)
+    if instrumentation.ENABLED:
+        print("\n--- ⏱️ Latensi per Tahap ---")
+        print(instrumentation.format_summaries())
+
+def timed(timings, label, fn, *fn_args, **fn_kwargs):
+    """Menjalankan fn dan mencatat durasinya (detik) di 'timings'."""
+    start = time.perf_counter()
+    result = fn(*fn_args, **fn_kwargs)
+    timings[label] = timings.get(label, 0.0) + time.perf_counter() - start
+    return result
+
+def print_timing_report(timings):
+    """Laporan --timing: tahap startup & pencarian, plus modul berat yang ikut dimuat."""
+    analyzer = preprocessing.analyzer_stats()
+    print("\n--- ⏱️ Laporan Waktu ---")
+    for label, seconds in timings.items():
+        print(f"{label:<28} {seconds * 1000:>9.1f} ms")
+    if analyzer['source'] is not None:
+        print(f"{'  analyzer (' + analyzer['source'] + ')':<28} {analyzer['load_seconds'] * 1000:>9.1f} ms")
+    if analyzer['stemmer_seconds']:
+        print(f"{'  stemmer Sastrawi':<28} {analyzer['stemmer_seconds'] * 1000:>9.1f} ms")
+    print(f"{'total sejak proses mulai':<28} {time.process_time() * 1000:>9.1f} ms (CPU)")
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    print(f"Modul berat dimuat: {', '.join(loaded) if loaded else '-'}")
+
+def run_single(args, timings, profile_modes=()):
+    """Satu kueri (--query)."""
     print(f"--- 🚀 Menjalankan Pencarian CLI ---")
     print(f"Model:   {args.model}")
     print(f"Kueri:   '{args.query}'")
@@ -48,28 +146,39 @@ def main_cli():
     # 2. Inisialisasi mesin yang relevan
     if args.model == 'boolean':
         print("Menginisialisasi mesin Boolean...")
-        boolean_ir.initialize_boolean()
+        timed(timings, 'inisialisasi aset', boolean_ir.initialize_boolean)
     else:
-        print(f"Menginisialisasi mesin VSM (Skema: {args.weighting})...")
-        mesin_pencari.initialize_mesin()
+        print(f"Menginisialisasi mesin VSM (Skema: {args.weighting}, Skor: {args.scoring})...")
+        timed(timings, 'inisialisasi aset', mesin_pencari.initialize_mesin)
+
+    # 3. Jalankan Logika Pencarian (aset sudah dimuat: profil hanya mencakup pencarian)
+    with instrumentation.profiled(profile_modes, label=args.query), instrumentation.trace(args.query, event=args.model):
+        search_single(args, timings)
 
-    # 3. Jalankan Logika Pencarian
+def search_single(args, timings):
+    """Pencarian + cetak hasil untuk satu kueri (aset sudah diinisialisasi)."""
     if args.model == 'boolean':
         # Model Boolean menerima kueri mentah (termasuk operator AND/OR)
-        results = boolean_ir.search_boolean(args.query)
+        results = timed(timings, 'pencarian', boolean_ir.search_boolean, args.query)
         print(f"\n--- Hasil Model Boolean ({len(results)} dokumen) ---")
         print(json.dumps(results, indent=2))
         
     elif args.model == 'vsm':
         # Model VSM butuh token yang sudah di-preprocess
         # Kita gunakan analyze_full_query untuk konsistensi
-        vsm_tokens, _, _ = mesin_pencari.analyze_full_query(args.query)
+        vsm_tokens, intent, region = timed(timings, 'analisis kueri', mesin_pencari.analyze_full_query, args.query)
         print(f"Tokens:  {vsm_tokens}")
+
+        if args.places:
+            return timed(timings, 'pencarian', print_place_pages, vsm_tokens, intent, region, args)
         
         # Panggil fungsi inti VSM
-        ranked_results = mesin_pencari._calculate_vsm_scores(vsm_tokens, args.weighting)
-        
-        top_k_results = ranked_results[:args.k]
+        if args.scoring == 'cosine':
+            top_k_results = timed(timings, 'pencarian', mesin_pencari._calculate_cosine_scores, vsm_tokens, args.weighting, k=args.k)
+        else:
+            # Top-k dengan pemangkasan MaxScore (tanpa skor & sort semua dokumen)
+            with instrumentation.span('vsm_top_k'):
+                top_k_results = timed(timings, 'pencarian', mesin_pencari._calculate_vsm_top_k, vsm_tokens, args.k, args.weighting)
         
         print(f"\n--- Hasil Model VSM (Top-{args.k}) ---")
         # Kita juga bisa memuat DF_METADATA untuk hasil lebih cantik
@@ -81,5 +190,77 @@ def main_cli():
             for doc_id, score in top_k_results:
                 print(f"- Doc_ID: {doc_id:<10} | Skor: {score:.4f}")
 
+def print_place_pages(vsm_tokens, intent, region, args):
+    """Rekomendasi tempat per halaman (kartu hanya dibuat untuk halaman yang dicetak)."""
+    page_size = max(args.k, 1)
+    page_no = max(args.page, 1)
+    print(f"Intent:  {intent} | Region: {region}")
+    while True:
+        page = mesin_pencari.search_page(vsm_tokens, intent, region, offset=(page_no - 1) * page_size, limit=page_size)
+        total_pages = max(-(-page['total'] // page_size), 1)
+        print(f"\n--- Rekomendasi Tempat (Halaman {page_no}/{total_pages}, total {page['total']} tempat) ---")
+        if not page['results']:
+            print("Tidak ada hasil ditemukan.")
+        for rank, item in enumerate(page['results'], start=page['offset'] + 1):
+            rating = f"{item['avg_rating']:.2f}" if item['avg_rating'] is not None else "-"
+            print(f"{rank:>3}. {item['name']} ({item['location']}) | Rating: {rating} | Skor: {item['top_vsm_score']:.4f}")
+        if not (args.all_pages and page['has_more']):
+            return
+        page_no += 1
+
+def read_queries_file(path):
+    """
+    Membaca kueri dari file JSONL. Tiap baris: {"query": "..."} atau
+    {"query_id": ..., "query_text": "..."} (format gold_set); kunci lain
+    ikut disalin ke hasil. Baris kosong dilewati.
+    """
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {'query': record}
+            query_text = record.get('query', record.get('query_text'))
+            if not isinstance(query_text, str):
+                raise ValueError(f"Baris {line_no}: kunci 'query' / 'query_text' tidak ditemukan.")
+            record['query'] = query_text
+            records.append(record)
+    return records
+
+def main_batch(args, timings, profile_modes=()):
+    """Mode batch (--queries-file): semua kueri dijalankan sekaligus, hasil ditulis sebagai JSONL."""
+    try:
+        records = read_queries_file(args.queries_file)
+    except (OSError, ValueError) as e:
+        print(f"❌ GAGAL membaca '{args.queries_file}': {e}")
+        return
+
+    print(f"--- 🚀 Menjalankan Pencarian Batch ({len(records)} kueri) ---")
+    print(f"Model:   {args.model}")
+    queries = [record['query'] for record in records]
+
+    if args.model == 'boolean':
+        timed(timings, 'inisialisasi aset', boolean_ir.initialize_boolean)
+        with instrumentation.profiled(profile_modes, label=f"batch {len(queries)} kueri"):
+            outputs = timed(timings, 'pencarian', lambda: [{'results': boolean_ir.search_boolean(query)} for query in queries])
+    else:
+        timed(timings, 'inisialisasi aset', mesin_pencari.initialize_mesin)
+        # Satu perkalian matriks sparse untuk semua kueri (lihat mesin_pencari.search_many)
+        with instrumentation.profiled(profile_modes, label=f"batch {len(queries)} kueri"):
+            outputs = timed(timings, 'pencarian', mesin_pencari.search_many, queries, k=args.k, weighting=args.weighting, scoring=args.scoring)
+        for output in outputs:
+            output['results'] = [{'doc_id': doc_id, 'score': score} for doc_id, score in output['results']]
+
+    lines = [json.dumps({**record, **output}, ensure_ascii=False) for record, output in zip(records, outputs)]
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + ("\n" if lines else ""))
+        print(f"✅ {len(lines)} hasil disimpan ke '{args.output}'.")
+    else:
+        print("\n".join(lines))
+
 if __name__ == "__main__":
     main_cli()
\ No newline at end of file
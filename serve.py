@@ -0,0 +1,38 @@
+import argparse
+import asyncio
+
+try:
+    from src.service import serve, DEFAULT_HOST, DEFAULT_PORT, DEFAULT_MAX_CONCURRENCY
+except ImportError as e:
+    print(f"❌ FATAL ERROR: Gagal mengimpor modul. Pastikan semua file .py ada: {e}")
+    exit()
+
+def main():
+    """
+    Layanan HTTP/JSON pencarian yang berjalan terus (aset dimuat sekali).
+    Contoh: curl 'http://127.0.0.1:8765/search?q=kamar+mandi+bersih&k=5'
+    """
+    parser = argparse.ArgumentParser(description="Layanan HTTP Mesin Pencari STKI (asyncio)")
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST, help=f"Alamat bind (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Jumlah proses worker untuk skoring (0 = satu thread di proses utama)"
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help=f"Maksimal request yang diskor bersamaan; sisanya antre (default: {DEFAULT_MAX_CONCURRENCY})"
+    )
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, max(args.workers, 0), max(args.max_concurrency, 1)))
+    except KeyboardInterrupt:
+        print("\n✅ Layanan dihentikan.")
+
+if __name__ == "__main__":
+    main()
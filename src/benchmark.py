@@ -0,0 +1,472 @@
+import json
+import os
+import platform
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+# ======================================================================
+# BENCHMARK SKALA: KORPUS SINTETIS -> BUILD -> LOAD -> LATENSI
+# ======================================================================
+# Untuk setiap ukuran korpus:
+#   1. Korpus sintetis dibangkitkan dari distribusi corpus_master.csv
+#      (frekuensi kata, panjang ulasan, tempat/lokasi/rating), ditambah
+#      kosakata baru (hukum Heaps) agar jumlah term ikut tumbuh.
+#   2. build_index.py dijalankan di workspace terpisah (folder sementara
+#      dengan symlink ke src/ & Kamus/), jadi Assets/ asli tidak tersentuh.
+#      Diukur: waktu build, puncak memori (RSS), ukuran aset.
+#   3. Proses "probe" di workspace itu memuat aset (waktu load) lalu
+#      mengukur latensi p50/p95/p99 search_boolean, _calculate_vsm_scores
+#      dan search_by_keyword atas campuran kueri yang tetap (seed).
+# Hasil ditulis ke JSON agar bisa dibandingkan antar run (--compare).
+BENCHMARK_VERSION = 1
+DEFAULT_SIZES = (10_000, 100_000)
+DEFAULT_SEED = 42
+DEFAULT_ROUNDS = 5 # Berapa kali campuran kueri diulang per operasi
+DEFAULT_NOVEL_RATE = 0.02 # Porsi token yang diambil dari kosakata sintetis baru
+DEFAULT_BUILD_TIMEOUT = 3600.0 # Detik
+HEAPS_BETA = 0.5 # V = K * N^beta (pertumbuhan kosakata)
+PERCENTILES = (50, 95, 99)
+_WORD_REGEX = re.compile(r'[a-z]+')
+_STEM_STATS_REGEX = re.compile(r'Kamus stem: .*\((\d+) hit / (\d+) miss\)')
+_SYLLABLES = [c + v for c in 'bcdghjklmnprstw' for v in 'aiueo']
+
+# ======================================================================
+# 1. PROFIL & GENERATOR KORPUS SINTETIS
+# ======================================================================
+class CorpusProfile:
+    """Distribusi empiris dari corpus_master.csv yang dipakai generator."""
+
+    def __init__(self, words, counts, lengths, rows, info):
+        self.words = words # Kosakata (kata mentah, huruf kecil)
+        self.counts = counts # Frekuensi tiap kata
+        self.lengths = lengths # Panjang (jumlah kata) tiap ulasan asli
+        self.rows = rows # DataFrame [Nama_Tempat, Lokasi, Rating] ulasan asli
+        self.info = info # DataFrame info_tempat.csv (bisa None)
+
+    @classmethod
+    def from_corpus(cls, corpus_path, info_path=None):
+        import pandas as pd
+        df = pd.read_csv(corpus_path).dropna(subset=['Nama_Tempat', 'Teks_Mentah'])
+        token_lists = [_WORD_REGEX.findall(str(text).lower()) for text in df['Teks_Mentah']]
+        counter = Counter(word for tokens in token_lists for word in tokens)
+        words, counts = zip(*counter.most_common())
+        info = pd.read_csv(info_path) if info_path and os.path.exists(info_path) else None
+        return cls(
+            list(words), list(counts), [max(len(tokens), 1) for tokens in token_lists],
+            df[['Nama_Tempat', 'Lokasi', 'Rating']].reset_index(drop=True), info
+        )
+
+    @property
+    def n_tokens(self):
+        return sum(self.counts)
+
+    def novel_vocabulary_size(self, n_tokens):
+        """Perkiraan kosakata baru untuk n_tokens (hukum Heaps, dikalibrasi ke korpus asli)."""
+        k = len(self.words) / self.n_tokens ** HEAPS_BETA
+        return max(int(k * n_tokens ** HEAPS_BETA) - len(self.words), 0)
+
+    def top_words(self, n, min_length=4):
+        return [word for word in self.words if len(word) >= min_length][:n]
+
+    def generate(self, n_reviews, documents_dir, seed=DEFAULT_SEED, novel_rate=DEFAULT_NOVEL_RATE):
+        """
+        Menulis corpus_master.csv (+ info_tempat.csv) sintetis ke 'documents_dir'.
+        Mengembalikan (statistik, daftar kata sintetis baru).
+        """
+        import numpy as np
+        import pandas as pd
+        rng = np.random.default_rng(seed)
+
+        # --- Tempat: pola ulasan/tempat mengikuti korpus asli ---
+        reviews_per_place = len(self.rows) / self.rows['Nama_Tempat'].nunique()
+        base_places = self.rows['Nama_Tempat'].drop_duplicates().tolist()
+        n_places = max(int(round(n_reviews / reviews_per_place)), len(base_places))
+        # Tiap ulasan meminjam tempat/lokasi/rating dari ulasan asli acak;
+        # salinan ke-j dari tempat asli diberi nama "Nama (j)"
+        source_rows = rng.integers(0, len(self.rows), size=n_reviews)
+        copy_no = rng.integers(0, -(-n_places // len(base_places)), size=n_reviews)
+        place_codes = pd.factorize(self.rows['Nama_Tempat'])[0][source_rows]
+        order = np.lexsort((source_rows, copy_no, place_codes)) # Ulasan satu tempat berurutan (Doc_ID berdekatan)
+        source_rows, copy_no = source_rows[order], copy_no[order]
+        sampled = self.rows.iloc[source_rows].reset_index(drop=True)
+        names = [name if copy == 0 else f"{name} ({copy + 1})" for name, copy in zip(sampled['Nama_Tempat'], copy_no.tolist())]
+
+        # --- Teks: panjang & kata diambil dari distribusi empiris ---
+        lengths = rng.choice(np.asarray(self.lengths), size=n_reviews)
+        total_tokens = int(lengths.sum())
+        probabilities = np.asarray(self.counts, dtype=np.float64)
+        probabilities /= probabilities.sum()
+        vocabulary = np.asarray(self.words, dtype=object)
+        token_ids = rng.choice(len(vocabulary), size=total_tokens, p=probabilities)
+        tokens = vocabulary[token_ids]
+
+        novel_words = []
+        n_novel = self.novel_vocabulary_size(total_tokens)
+        if n_novel and novel_rate > 0:
+            novel_words = _novel_words(n_novel, rng, set(self.words))
+            zipf = 1.0 / np.arange(1, n_novel + 1)
+            is_novel = rng.random(total_tokens) < novel_rate
+            tokens[is_novel] = np.asarray(novel_words, dtype=object)[
+                rng.choice(n_novel, size=int(is_novel.sum()), p=zipf / zipf.sum())
+            ]
+
+        bounds = np.concatenate(([0], np.cumsum(lengths))).tolist()
+        texts = [' '.join(tokens[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+
+        os.makedirs(documents_dir, exist_ok=True)
+        pd.DataFrame({
+            'Doc_ID': np.arange(1, n_reviews + 1),
+            'Nama_Tempat': names,
+            'Lokasi': sampled['Lokasi'].values,
+            'Rating': sampled['Rating'].values,
+            'Teks_Mentah': texts,
+        }).to_csv(os.path.join(documents_dir, 'corpus_master.csv'), index=False)
+
+        if self.info is not None:
+            info_by_name = self.info.drop_duplicates('Nama_Tempat').set_index('Nama_Tempat')
+            info_rows = []
+            for name, source in zip(names, sampled['Nama_Tempat']):
+                if source in info_by_name.index and (not info_rows or info_rows[-1]['Nama_Tempat'] != name):
+                    info_rows.append({'Nama_Tempat': name, **info_by_name.loc[source].to_dict()})
+            pd.DataFrame(info_rows).drop_duplicates('Nama_Tempat').to_csv(
+                os.path.join(documents_dir, 'info_tempat.csv'), index=False
+            )
+
+        stats = {
+            'n_reviews': n_reviews,
+            'n_places': len(set(names)),
+            'n_tokens': total_tokens,
+            'n_novel_words': len(novel_words),
+        }
+        return stats, novel_words
+
+def _novel_words(n, rng, existing):
+    """Kata sintetis unik (gabungan 2-4 suku kata) yang tidak ada di kosakata asli."""
+    words = set()
+    while len(words) < n:
+        n_syllables = rng.integers(2, 5, size=n)
+        picks = rng.integers(0, len(_SYLLABLES), size=(n, 4))
+        for count, row in zip(n_syllables.tolist(), picks.tolist()):
+            word = ''.join(_SYLLABLES[i] for i in row[:count])
+            if word not in existing:
+                words.add(word)
+                if len(words) == n:
+                    break
+    return sorted(words)
+
+# ======================================================================
+# 2. CAMPURAN KUERI
+# ======================================================================
+def build_query_mix(profile, gold_queries, region_terms, intent_terms, seed=DEFAULT_SEED, n_random=30):
+    """
+    Kueri VSM (bahasa alami) & Boolean yang sama untuk semua ukuran korpus:
+    kueri gold set, 1-3 kata populer, kata + region, intent (+ region).
+    """
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    popular = profile.top_words(200)
+
+    def words(n):
+        return [popular[i] for i in rng.choice(len(popular), size=n, replace=False).tolist()]
+
+    vsm = list(gold_queries)
+    vsm += [' '.join(words(int(rng.integers(1, 4)))) for _ in range(n_random)]
+    if region_terms:
+        vsm += [f"{words(1)[0]} di {region_terms[int(rng.integers(len(region_terms)))]}" for _ in range(n_random // 3)]
+    if intent_terms:
+        vsm += [intent_terms[int(rng.integers(len(intent_terms)))] for _ in range(n_random // 6)]
+        if region_terms:
+            vsm += [f"{intent_terms[int(rng.integers(len(intent_terms)))]} di {region_terms[int(rng.integers(len(region_terms)))]}"
+                    for _ in range(n_random // 6)]
+
+    boolean = []
+    for _ in range(n_random):
+        a, b, c = words(3)
+        boolean.append(rng.choice([f"{a} AND {b}", f"{a} OR {b}", f"{a} AND NOT {b}", f"({a} OR {b}) AND {c}", a]))
+    return {'vsm': vsm, 'boolean': [str(query) for query in boolean]}
+
+# ======================================================================
+# 3. WORKSPACE, BUILD & PROBE
+# ======================================================================
+def prepare_workspace(workdir, base_dir, novel_words):
+    """
+    Workspace terisolasi: src/ & Kamus/ di-symlink, build_index.py disalin
+    (BASE_DIR modul dihitung dari path symlink, bukan path aslinya).
+    Kamus stem asli disalin & kata sintetis didaftarkan sebagai stem dirinya
+    sendiri, agar biaya Sastrawi untuk kata buatan tidak mendominasi build.
+    """
+    os.makedirs(os.path.join(workdir, 'Assets'), exist_ok=True)
+    for name in ('src', 'Kamus'):
+        link = os.path.join(workdir, name)
+        if not os.path.lexists(link):
+            os.symlink(os.path.join(base_dir, name), link)
+    shutil.copy(os.path.join(base_dir, 'build_index.py'), os.path.join(workdir, 'build_index.py'))
+
+    from .stem_cache import STEM_DICT_FILENAME, STEM_DICT_VERSION
+    stems = {}
+    try:
+        with open(os.path.join(base_dir, 'Assets', STEM_DICT_FILENAME), encoding='utf-8') as f:
+            stems = json.load(f).get('stems', {})
+    except (OSError, json.JSONDecodeError):
+        pass
+    stems.update({word: word for word in novel_words})
+    with open(os.path.join(workdir, 'Assets', STEM_DICT_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump({'version': STEM_DICT_VERSION, 'stems': stems}, f, ensure_ascii=False)
+
+def _workspace_env(workdir):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = workdir # 'src' di-resolve dari workspace, bukan repo asli
+    return env
+
+def run_build(workdir, build_workers=1, timeout=DEFAULT_BUILD_TIMEOUT):
+    """Menjalankan build_index.py di workspace; waktu, puncak RSS (wait4) & status."""
+    log_path = os.path.join(workdir, 'build.log')
+    start = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        process = subprocess.Popen(
+            [sys.executable, 'build_index.py', '--workers', str(build_workers)],
+            cwd=workdir, env=_workspace_env(workdir), stdout=log, stderr=subprocess.STDOUT
+        )
+        status, usage, timed_out = None, None, False
+        while status is None:
+            pid, wait_status, rusage = os.wait4(process.pid, os.WNOHANG)
+            if pid:
+                status, usage = os.waitstatus_to_exitcode(wait_status), rusage
+            elif time.perf_counter() - start > timeout:
+                process.kill()
+                timed_out = True
+            else:
+                time.sleep(0.05)
+        process.returncode = status
+    seconds = time.perf_counter() - start
+    ok = status == 0 and os.path.exists(os.path.join(workdir, 'Assets', 'index.bin'))
+    with open(log_path, encoding='utf-8', errors='replace') as f:
+        log_text = f.read()
+    result = {
+        'ok': ok,
+        'seconds': seconds,
+        'peak_rss_mb': usage.ru_maxrss / 1024 if usage is not None else None, # Linux: KB
+        'timed_out': timed_out,
+    }
+    # Kata baru memanggil Sastrawi (puluhan-ratusan ms per kata): sering dominan di waktu build
+    match = _STEM_STATS_REGEX.search(log_text)
+    if match:
+        result['stem_hits'], result['stem_misses'] = int(match.group(1)), int(match.group(2))
+    if not ok:
+        result['log_tail'] = log_text[-2000:]
+    return result
+
+def asset_sizes(assets_dir):
+    sizes = {}
+    for root, _, files in os.walk(assets_dir):
+        for filename in files:
+            path = os.path.join(root, filename)
+            sizes[os.path.relpath(path, assets_dir)] = os.path.getsize(path)
+    return {'total_mb': sum(sizes.values()) / 2**20, 'files': sizes}
+
+def run_probe(workdir, queries, rounds=DEFAULT_ROUNDS, timeout=DEFAULT_BUILD_TIMEOUT):
+    """Menjalankan probe_main() di workspace (proses baru = load dingin)."""
+    query_path = os.path.join(workdir, 'queries.json')
+    result_path = os.path.join(workdir, 'probe.json')
+    with open(query_path, 'w', encoding='utf-8') as f:
+        json.dump({'queries': queries, 'rounds': rounds, 'output': result_path}, f)
+    completed = subprocess.run(
+        [sys.executable, '-c', f"from src import benchmark; benchmark.probe_main({query_path!r})"],
+        cwd=workdir, env=_workspace_env(workdir), capture_output=True, text=True, timeout=timeout
+    )
+    if completed.returncode != 0 or not os.path.exists(result_path):
+        return {'ok': False, 'log_tail': (completed.stdout + completed.stderr)[-2000:]}
+    with open(result_path, encoding='utf-8') as f:
+        return {'ok': True, **json.load(f)}
+
+def summarize_latencies(seconds):
+    import numpy as np
+    values = np.asarray(seconds) * 1000
+    summary = {'n': int(values.size)}
+    if values.size:
+        summary.update({f"p{p}_ms": float(np.percentile(values, p)) for p in PERCENTILES})
+        summary.update({'mean_ms': float(values.mean()), 'max_ms': float(values.max())})
+    return summary
+
+def probe_main(query_path):
+    """
+    Dijalankan DI DALAM workspace (lihat run_probe): memuat aset lalu
+    mengukur latensi tiap operasi. Cache hasil dikosongkan sebelum setiap
+    panggilan search_by_keyword agar yang terukur adalah skoring+ranking.
+    """
+    with open(query_path, encoding='utf-8') as f:
+        config = json.load(f)
+    from . import mesin_pencari, boolean_ir
+
+    load = {}
+    start = time.perf_counter()
+    mesin_pencari.initialize_mesin()
+    load['vsm_seconds'] = time.perf_counter() - start
+    start = time.perf_counter()
+    boolean_ir.initialize_boolean()
+    load['boolean_seconds'] = time.perf_counter() - start
+
+    # Analisis kueri sekali di luar pengukuran (operasi yang diukur menerima token)
+    start = time.perf_counter()
+    analyzed = [mesin_pencari.analyze_full_query(query) for query in config['queries']['vsm']]
+    load['analyze_seconds'] = time.perf_counter() - start
+
+    operations = {
+        'search_boolean': [lambda q=query: boolean_ir.search_boolean(q) for query in config['queries']['boolean']],
+        '_calculate_vsm_scores': [
+            lambda t=tokens, r=region: mesin_pencari._calculate_vsm_scores(t, 'tfidf', r)
+            for tokens, _, region in analyzed
+        ],
+        'search_by_keyword': [
+            lambda t=tokens, i=intent, r=region: mesin_pencari.search_by_keyword(t, i, r)
+            for tokens, intent, region in analyzed
+        ],
+    }
+    latency = {}
+    for name, calls in operations.items():
+        for call in calls[:3]: # Pemanasan
+            call()
+        samples = []
+        for _ in range(config['rounds']):
+            for call in calls:
+                mesin_pencari.clear_query_cache()
+                start = time.perf_counter()
+                call()
+                samples.append(time.perf_counter() - start)
+        latency[name] = summarize_latencies(samples)
+
+    result = {
+        'load': load,
+        'latency': latency,
+        'n_docs': len(mesin_pencari.DF_METADATA),
+        'n_terms': len(mesin_pencari.IDF_SCORES),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    with open(config['output'], 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+
+# ======================================================================
+# 4. ORKESTRASI & PERBANDINGAN
+# ======================================================================
+def run_benchmark(base_dir, sizes=DEFAULT_SIZES, seed=DEFAULT_SEED, rounds=DEFAULT_ROUNDS,
+                  novel_rate=DEFAULT_NOVEL_RATE, build_workers=1, build_timeout=DEFAULT_BUILD_TIMEOUT,
+                  workdir=None, keep=False):
+    """Menjalankan benchmark untuk tiap ukuran; berhenti di ukuran pertama yang gagal."""
+    from . import preprocessing
+    documents_dir = os.path.join(base_dir, 'Documents')
+    profile = CorpusProfile.from_corpus(
+        os.path.join(documents_dir, 'corpus_master.csv'), os.path.join(documents_dir, 'info_tempat.csv')
+    )
+    with open(os.path.join(base_dir, 'gold_set.json'), encoding='utf-8') as f:
+        gold_queries = [query['query_text'] for query in json.load(f)['queries']]
+    queries = build_query_mix(
+        profile, gold_queries,
+        sorted(preprocessing.REGION_MAP), sorted(preprocessing.SPECIAL_INTENT_MAP), seed=seed
+    )
+
+    report = {
+        'benchmark_version': BENCHMARK_VERSION,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'git_commit': _git_commit(base_dir),
+        },
+        'config': {
+            'sizes': list(sizes), 'seed': seed, 'rounds': rounds, 'novel_rate': novel_rate,
+            'build_workers': build_workers, 'n_vsm_queries': len(queries['vsm']),
+            'n_boolean_queries': len(queries['boolean']),
+        },
+        'runs': [],
+    }
+
+    root = workdir or tempfile.mkdtemp(prefix='stki-bench-')
+    try:
+        for size in sizes:
+            run_dir = os.path.join(root, f"n{size}")
+            shutil.rmtree(run_dir, ignore_errors=True)
+            print(f"🔄 [{size:,} ulasan] Membangkitkan korpus sintetis...")
+            start = time.perf_counter()
+            corpus, novel_words = profile.generate(size, os.path.join(run_dir, 'Documents'), seed=seed, novel_rate=novel_rate)
+            corpus['generate_seconds'] = time.perf_counter() - start
+            prepare_workspace(run_dir, base_dir, novel_words)
+            run = {'size': size, 'corpus': corpus}
+            report['runs'].append(run)
+
+            print(f"🔄 [{size:,} ulasan] build_index.py...")
+            run['build'] = run_build(run_dir, build_workers, build_timeout)
+            if not run['build']['ok']:
+                print(f"❌ [{size:,} ulasan] Build gagal; ukuran lebih besar dilewati.")
+                break
+            run['assets'] = asset_sizes(os.path.join(run_dir, 'Assets'))
+
+            print(f"🔄 [{size:,} ulasan] Mengukur load & latensi...")
+            try:
+                run['probe'] = run_probe(run_dir, queries, rounds, build_timeout)
+            except subprocess.TimeoutExpired:
+                run['probe'] = {'ok': False, 'timed_out': True}
+            if not run['probe']['ok']:
+                print(f"❌ [{size:,} ulasan] Probe gagal; ukuran lebih besar dilewati.")
+                break
+            print(f"✅ [{size:,} ulasan] " + format_run(run))
+            if not keep:
+                shutil.rmtree(run_dir, ignore_errors=True)
+    finally:
+        if not keep and workdir is None:
+            shutil.rmtree(root, ignore_errors=True)
+    return report
+
+def _git_commit(base_dir):
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=base_dir,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def format_run(run):
+    """Ringkasan satu baris untuk satu ukuran korpus."""
+    probe = run['probe']
+    latency = ' | '.join(f"{name} p50 {stats['p50_ms']:.2f} / p99 {stats['p99_ms']:.2f} ms"
+                         for name, stats in probe['latency'].items() if stats['n'])
+    return (f"build {run['build']['seconds']:.1f}s ({run['build']['peak_rss_mb']:.0f} MB, "
+            f"{run['build'].get('stem_misses', '?')} stem miss), "
+            f"aset {run['assets']['total_mb']:.1f} MB, load {probe['load']['vsm_seconds'] * 1000:.0f} ms | {latency}")
+
+def _flatten_metrics(run):
+    """Metrik numerik utama satu run: {nama: nilai} (lebih kecil = lebih baik)."""
+    metrics = {}
+    if run.get('build', {}).get('ok'):
+        metrics['build_seconds'] = run['build']['seconds']
+        metrics['build_peak_rss_mb'] = run['build']['peak_rss_mb']
+        metrics['assets_mb'] = run['assets']['total_mb']
+    probe = run.get('probe', {})
+    if probe.get('ok'):
+        metrics['load_vsm_seconds'] = probe['load']['vsm_seconds']
+        metrics['load_boolean_seconds'] = probe['load']['boolean_seconds']
+        for name, stats in probe['latency'].items():
+            for p in PERCENTILES:
+                if f"p{p}_ms" in stats:
+                    metrics[f"{name}_p{p}_ms"] = stats[f"p{p}_ms"]
+    return metrics
+
+def compare_reports(baseline, current):
+    """Baris perbandingan (ukuran, metrik, lama, baru, rasio) untuk ukuran yang ada di keduanya."""
+    baseline_runs = {run['size']: run for run in baseline.get('runs', [])}
+    rows = []
+    for run in current.get('runs', []):
+        if run['size'] not in baseline_runs:
+            continue
+        old_metrics = _flatten_metrics(baseline_runs[run['size']])
+        for name, new in _flatten_metrics(run).items():
+            old = old_metrics.get(name)
+            if old is not None:
+                rows.append((run['size'], name, old, new, new / old if old else float('inf')))
+    return rows
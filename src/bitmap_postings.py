@@ -0,0 +1,228 @@
+import numpy as np
+
+# ======================================================================
+# POSTINGS BITMAP GAYA ROARING (UNTUK MODEL BOOLEAN)
+# ======================================================================
+# Doc_ID dibagi per chunk 65536 (16 bit atas = kunci chunk). Tiap chunk
+# disimpan dalam salah satu dari dua container:
+#   - array  : uint16 terurut (16 bit bawah Doc_ID), untuk chunk jarang
+#   - bitmap : 1024 x uint64 (65536 bit), untuk chunk padat
+# Container dipilih otomatis dari kardinalitasnya (batas ARRAY_MAX, sama
+# seperti Roaring): ukuran memori selalu <= 8 KB per chunk, dan operasi
+# AND/OR/NOT antar bitmap berjalan per word 64 bit (vektorisasi NumPy).
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+ARRAY_MAX = 4096 # Lebih dari ini -> container bitmap
+_WORDS = CHUNK_SIZE // 64
+_GALLOP_RATIO = 8 # Array timpang -> cari elemen kecil di array besar
+_BITMAP_FLAG = 1 << 31 # Penanda container bitmap saat di-pickle
+
+def _popcount(words):
+    if hasattr(np, 'bitwise_count'): # NumPy >= 2.0
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+def _is_bitmap(container):
+    return container.dtype == np.uint64
+
+def _to_bitmap(container):
+    if _is_bitmap(container):
+        return container
+    bits = np.zeros(CHUNK_SIZE, dtype=bool)
+    bits[container] = True
+    return np.packbits(bits, bitorder='little').view(np.uint64)
+
+def _to_array(words):
+    bits = np.unpackbits(words.view(np.uint8), bitorder='little')
+    return np.flatnonzero(bits).astype(np.uint16)
+
+def _bits_set(words, values):
+    """Mask boolean: apakah tiap nilai uint16 di 'values' ada di bitmap 'words'."""
+    values = values.astype(np.uint64)
+    return ((words[values >> np.uint64(6)] >> (values & np.uint64(63))) & np.uint64(1)).astype(bool)
+
+def _normalize(container):
+    """Memilih representasi sesuai kardinalitas. Mengembalikan (container, card) atau None jika kosong."""
+    if _is_bitmap(container):
+        card = _popcount(container)
+        if card == 0:
+            return None
+        return (_to_array(container), card) if card <= ARRAY_MAX else (container, card)
+    card = len(container)
+    if card == 0:
+        return None
+    return (_to_bitmap(container), card) if card > ARRAY_MAX else (container, card)
+
+# --- Operasi per container ---
+def _and(a, b):
+    if _is_bitmap(a) and _is_bitmap(b):
+        return a & b
+    if _is_bitmap(a):
+        return b[_bits_set(a, b)]
+    if _is_bitmap(b):
+        return a[_bits_set(b, a)]
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) >= _GALLOP_RATIO * len(a):
+        # Pencarian biner per elemen array kecil (setara galloping: O(m log n))
+        pos = np.searchsorted(b, a)
+        pos[pos == len(b)] = len(b) - 1
+        return a[b[pos] == a]
+    return np.intersect1d(a, b, assume_unique=True)
+
+def _or(a, b):
+    if not _is_bitmap(a) and not _is_bitmap(b) and len(a) + len(b) <= ARRAY_MAX:
+        return np.union1d(a, b)
+    return _to_bitmap(a) | _to_bitmap(b)
+
+def _andnot(a, b):
+    if _is_bitmap(a):
+        return a & ~_to_bitmap(b)
+    if _is_bitmap(b):
+        return a[~_bits_set(b, a)]
+    return a[~np.isin(a, b, assume_unique=True)]
+
+class DocBitmap:
+    """
+    Himpunan Doc_ID terkompresi (gaya Roaring).
+    Kardinalitas (len) tersedia tanpa mematerialisasi list Doc_ID.
+    """
+    __slots__ = ('_keys', '_containers', '_cards')
+
+    def __init__(self, keys=(), containers=(), cards=()):
+        self._keys = list(keys)
+        self._containers = list(containers)
+        self._cards = list(cards)
+
+    @classmethod
+    def from_sorted(cls, doc_ids):
+        """Membangun bitmap dari array Doc_ID terurut naik & unik."""
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        if len(doc_ids) == 0:
+            return cls()
+        highs = doc_ids >> CHUNK_BITS
+        starts = np.flatnonzero(np.r_[True, highs[1:] != highs[:-1]])
+        ends = np.r_[starts[1:], len(doc_ids)]
+        keys, containers, cards = [], [], []
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            container, card = _normalize((doc_ids[start:end] & (CHUNK_SIZE - 1)).astype(np.uint16))
+            keys.append(int(highs[start]))
+            containers.append(container)
+            cards.append(card)
+        return cls(keys, containers, cards)
+
+    @classmethod
+    def from_iterable(cls, doc_ids):
+        """Membangun bitmap dari iterable Doc_ID apa pun (misal set lama)."""
+        return cls.from_sorted(np.unique(np.fromiter(doc_ids, dtype=np.int64)))
+
+    def __len__(self):
+        return sum(self._cards)
+
+    @property
+    def cardinality(self):
+        return len(self)
+
+    def __bool__(self):
+        return bool(self._keys)
+
+    def __contains__(self, doc_id):
+        high, low = int(doc_id) >> CHUNK_BITS, int(doc_id) & (CHUNK_SIZE - 1)
+        if high not in self._keys:
+            return False
+        container = self._containers[self._keys.index(high)]
+        if _is_bitmap(container):
+            return bool(_bits_set(container, np.array([low], dtype=np.uint16))[0])
+        pos = np.searchsorted(container, low)
+        return pos < len(container) and container[pos] == low
+
+    def to_array(self):
+        """Doc_ID terurut naik (int64)."""
+        parts = []
+        for key, container in zip(self._keys, self._containers):
+            lows = _to_array(container) if _is_bitmap(container) else container
+            parts.append((key << CHUNK_BITS) | lows.astype(np.int64))
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def tolist(self):
+        return self.to_array().tolist()
+
+    def memory_bytes(self):
+        return sum(container.nbytes for container in self._containers)
+
+    def __repr__(self):
+        n_bitmaps = sum(_is_bitmap(c) for c in self._containers)
+        return f"DocBitmap(card={len(self)}, chunks={len(self._keys)}, bitmap_chunks={n_bitmaps})"
+
+    # --- Aljabar himpunan ---
+    def _combine(self, other, op, keep_left_only, keep_right_only):
+        keys, containers, cards = [], [], []
+        i = j = 0
+        while i < len(self._keys) or j < len(other._keys):
+            ka = self._keys[i] if i < len(self._keys) else None
+            kb = other._keys[j] if j < len(other._keys) else None
+            if kb is None or (ka is not None and ka < kb):
+                if keep_left_only:
+                    keys.append(ka); containers.append(self._containers[i]); cards.append(self._cards[i])
+                i += 1
+            elif ka is None or kb < ka:
+                if keep_right_only:
+                    keys.append(kb); containers.append(other._containers[j]); cards.append(other._cards[j])
+                j += 1
+            else:
+                result = _normalize(op(self._containers[i], other._containers[j]))
+                if result is not None:
+                    keys.append(ka); containers.append(result[0]); cards.append(result[1])
+                i += 1
+                j += 1
+        return DocBitmap(keys, containers, cards)
+
+    def __and__(self, other):
+        return self._combine(other, _and, False, False)
+
+    def __or__(self, other):
+        return self._combine(other, _or, True, True)
+
+    def __sub__(self, other):
+        return self._combine(other, _andnot, True, False)
+
+    @staticmethod
+    def union_all(bitmaps):
+        result = DocBitmap()
+        for bitmap in bitmaps:
+            result = result | bitmap
+        return result
+
+    # --- Pickle: satu blob bytes (tidak bergantung versi NumPy) ---
+    # [n_chunk][keys x n][panjang x n, bit teratas = bitmap][data container...]
+    def __getstate__(self):
+        lengths = [len(c) | _BITMAP_FLAG if _is_bitmap(c) else len(c) for c in self._containers]
+        header = np.array([len(self._keys)] + self._keys + lengths, dtype=np.uint32)
+        return header.tobytes() + b''.join(c.tobytes() for c in self._containers)
+
+    def __setstate__(self, state):
+        n_chunks = int(np.frombuffer(state, dtype=np.uint32, count=1)[0])
+        header = np.frombuffer(state, dtype=np.uint32, count=1 + 2 * n_chunks)
+        offset = header.nbytes
+        self._keys = header[1:1 + n_chunks].tolist()
+        self._containers = []
+        for length in header[1 + n_chunks:].tolist():
+            if length & _BITMAP_FLAG:
+                container = np.frombuffer(state, dtype=np.uint64, count=length & ~_BITMAP_FLAG, offset=offset)
+            else:
+                container = np.frombuffer(state, dtype=np.uint16, count=length, offset=offset)
+            self._containers.append(container)
+            offset += container.nbytes
+        self._cards = [_popcount(c) if _is_bitmap(c) else len(c) for c in self._containers]
+
+def ensure_bitmap_index(boolean_index):
+    """
+    Adapter boolean_index.pkl lama (dict(term -> set)) -> dict(term -> DocBitmap).
+    Dipanggil sekali saat dimuat, sama seperti ensure_compact_index untuk VSM.
+    """
+    if not boolean_index:
+        return boolean_index
+    return {
+        term: doc_ids if isinstance(doc_ids, DocBitmap) else DocBitmap.from_iterable(doc_ids)
+        for term, doc_ids in boolean_index.items()
+    }
@@ -1,12 +1,16 @@
 import os
-import joblib
 import re
+import numpy as np
 from . import preprocessing
+from . import instrumentation
+from .bitmap_postings import DocBitmap, ensure_bitmap_index
+from .mmap_index import open_index, MappedBooleanIndex, INDEX_FILENAME
+from .segments import open_segmented_index, SegmentedBooleanIndex
 
 # ======================================================================
 # 1. VARIABEL GLOBAL ASET BOOLEAN
 # ======================================================================
-BOOLEAN_INDEX = None # Akan berisi dict(term -> set(doc_ids))
+BOOLEAN_INDEX = None # Akan berisi dict(term -> DocBitmap) atau MappedBooleanIndex
 # Dapatkan path ke folder 'src' saat ini
 SRC_DIR = os.path.dirname(os.path.abspath(__file__))
 # Dapatkan path ke folder ROOT (satu level di atas 'src')
@@ -17,14 +21,32 @@ BASE_DIR = os.path.dirname(SRC_DIR)
 # ======================================================================
 def initialize_boolean():
     """Memuat aset boolean_index.pkl ke dalam variabel global."""
-    global BOOLEAN_INDEX
+    global BOOLEAN_INDEX, _DOC_UNIVERSE
+    _DOC_UNIVERSE = None
+    _TERM_BITMAPS.clear()
     
     print("--- Memuat Aset Boolean (Indeks)... ---")
     assets_dir = os.path.join(BASE_DIR, 'Assets')
     index_path = os.path.join(assets_dir, 'boolean_index.pkl')
+
+    # Utamakan index.bin (mmap): postings VSM memuat Doc_ID yang sama
+    try:
+        mapped_index = open_index(assets_dir)
+        if mapped_index is not None:
+            segmented = open_segmented_index(assets_dir, mapped_index)
+            if segmented is not None:
+                BOOLEAN_INDEX = SegmentedBooleanIndex(segmented)
+            else:
+                BOOLEAN_INDEX = MappedBooleanIndex(mapped_index)
+            print(f"✅ Mesin Pencari (Boolean) Siap (mmap {INDEX_FILENAME}).")
+            return
+    except Exception as e:
+        print(f"⚠️ Gagal membuka {INDEX_FILENAME}: {e}. Memakai boolean_index.pkl.")
     
     try:
-        BOOLEAN_INDEX = joblib.load(index_path)
+        import joblib
+        # Adapter: boolean_index.pkl lama (set per term) dikonversi ke DocBitmap
+        BOOLEAN_INDEX = ensure_bitmap_index(joblib.load(index_path))
         print("✅ Mesin Pencari (Boolean) Siap.")
     except FileNotFoundError:
         print(f"❌ FATAL ERROR: File 'boolean_index.pkl' tidak ditemukan di '{assets_dir}'.")
@@ -33,73 +55,240 @@ def initialize_boolean():
         print(f"❌ ERROR saat memuat aset boolean: {e}")
 
 # ======================================================================
-# 3. FUNGSI HELPER
+# 3. FUNGSI HELPER (POSTINGS BITMAP)
 # ======================================================================
+_EMPTY = DocBitmap()
+_DOC_UNIVERSE = None # Cache bitmap semua Doc_ID (untuk NOT tanpa operand positif)
+_TERM_BITMAPS = {} # Cache term -> DocBitmap untuk indeks mmap/segmen
+
+def _term_bitmap(token):
+    """
+    Postings satu token sebagai DocBitmap. Untuk index.bin / segmen, bitmap
+    dibangun dari array Doc_ID terurut saat term pertama kali dipakai, lalu
+    di-cache (representasi array/bitmap dipilih per chunk dari kardinalitas).
+    """
+    if isinstance(BOOLEAN_INDEX, dict):
+        return BOOLEAN_INDEX.get(token, _EMPTY) # boolean_index.pkl (sudah DocBitmap)
+
+    bitmap = _TERM_BITMAPS.get(token)
+    if bitmap is None:
+        if hasattr(BOOLEAN_INDEX, 'mapped_index'):
+            mapped_index = BOOLEAN_INDEX.mapped_index
+            term_id = mapped_index.term_id(token)
+            doc_ids = mapped_index.postings_at(term_id).doc_ids if term_id >= 0 else None
+        else:
+            segmented = BOOLEAN_INDEX.segmented_index
+            doc_ids = segmented.postings(token).doc_ids if segmented.has_term(token) else None
+        bitmap = DocBitmap.from_sorted(doc_ids) if doc_ids is not None else _EMPTY
+        _TERM_BITMAPS[token] = bitmap
+    return bitmap
+
+def _doc_universe():
+    """
+    Semua Doc_ID yang punya minimal satu term, dihitung sekali lalu
+    di-cache. Definisi ini sama untuk index.bin, segmen, maupun boolean_index.pkl.
+    """
+    global _DOC_UNIVERSE
+    if _DOC_UNIVERSE is None:
+        if hasattr(BOOLEAN_INDEX, 'mapped_index'):
+            indexes = [BOOLEAN_INDEX.mapped_index]
+        elif hasattr(BOOLEAN_INDEX, 'segmented_index'):
+            indexes = BOOLEAN_INDEX.segmented_index.indexes
+        else:
+            indexes = None
+        if indexes is not None:
+            doc_ids = np.unique(np.concatenate([index.csr_arrays()[1] for index in indexes]))
+            _DOC_UNIVERSE = DocBitmap.from_sorted(doc_ids)
+        else:
+            _DOC_UNIVERSE = DocBitmap.union_all(BOOLEAN_INDEX.values())
+    return _DOC_UNIVERSE
+
 def _get_postings(raw_term):
     """
-    Mengambil postings list (set doc_ids) untuk satu term mentah.
+    Mengambil postings (DocBitmap) untuk satu term mentah.
     Fungsi ini akan memproses term tersebut terlebih dahulu.
     """
     if BOOLEAN_INDEX is None:
         print("!!! ERROR: Indeks Boolean belum dimuat. Panggil initialize_boolean() dulu.")
-        return set()
+        return _EMPTY
 
     # Preprocessing term (misal: "kamar mandi" -> "kamarmandi")
     # full_preprocessing mengembalikan list, misal: ['kamarmandi']
     processed_tokens = preprocessing.full_preprocessing(raw_term.lower())
     
     if not processed_tokens:
-        return set() # Term diabaikan (mungkin stopword)
+        return _EMPTY # Term diabaikan (mungkin stopword)
         
     # Ambil token pertama hasil proses (asumsi 1 term/frasa)
-    final_token = processed_tokens[0]
-    
-    # Kembalikan set doc_id dari indeks
-    return BOOLEAN_INDEX.get(final_token, set())
+    return _term_bitmap(processed_tokens[0])
 
 # ======================================================================
-# 4. FUNGSI PENCARIAN UTAMA (SOAL 03)
+# 4. PARSER KUERI BOOLEAN (AST)
+# ======================================================================
+# Tata bahasa (prioritas: NOT > AND > OR, tanda kurung didukung):
+#   expr     := and_expr ( OR and_expr )*
+#   and_expr := not_expr ( (AND | NOT | <implisit>) not_expr )*
+#   not_expr := NOT not_expr | atom
+#   atom     := '(' expr ')' | kata+          (kata berurutan = satu term/frasa)
+# 'a NOT b' dibaca sebagai 'a AND NOT b' (sama seperti versi lama).
+# Node AST berupa tuple: ('TERM', teks) | ('AND', [..]) | ('OR', [..]) | ('NOT', node)
+OPERATORS = {'AND', 'OR', 'NOT'}
+_TOKEN_REGEX = re.compile(r'\(|\)|[^\s()]+')
+
+class BooleanQueryError(ValueError):
+    """Kueri Boolean tidak valid (misal tanda kurung tidak seimbang)."""
+
+def parse_boolean_query(query_text):
+    """Mengubah kueri Boolean menjadi AST (lihat tata bahasa di atas)."""
+    tokens = _TOKEN_REGEX.findall(query_text)
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else None
+
+    def is_operator(token, name):
+        return token is not None and token.upper() == name
+
+    def parse_expr():
+        nonlocal pos
+        children = [parse_and()]
+        while is_operator(peek(), 'OR'):
+            pos += 1
+            children.append(parse_and())
+        return children[0] if len(children) == 1 else ('OR', children)
+
+    def parse_and():
+        nonlocal pos
+        children = [parse_not()]
+        while True:
+            token = peek()
+            if is_operator(token, 'AND'):
+                pos += 1
+                children.append(parse_not())
+            elif is_operator(token, 'NOT'):
+                children.append(parse_not()) # 'a NOT b' -> a AND NOT b
+            elif token == '(' or (token not in (None, ')') and token.upper() not in OPERATORS):
+                children.append(parse_not()) # AND implisit
+            else:
+                break
+        return children[0] if len(children) == 1 else ('AND', children)
+
+    def parse_not():
+        nonlocal pos
+        if is_operator(peek(), 'NOT'):
+            pos += 1
+            return ('NOT', parse_not())
+        return parse_atom()
+
+    def parse_atom():
+        nonlocal pos
+        token = peek()
+        if token == '(':
+            pos += 1
+            node = parse_expr()
+            if peek() != ')':
+                raise BooleanQueryError("Tanda kurung ')' tidak ditemukan.")
+            pos += 1
+            return node
+        words = []
+        while peek() not in (None, '(', ')') and peek().upper() not in OPERATORS:
+            words.append(peek())
+            pos += 1
+        if not words:
+            found = 'akhir kueri' if token is None else f"'{token}'"
+            raise BooleanQueryError(f"Term diharapkan, ditemukan {found}.")
+        return ('TERM', ' '.join(words))
+
+    if not tokens:
+        raise BooleanQueryError("Kueri kosong.")
+    tree = parse_expr()
+    if pos != len(tokens):
+        raise BooleanQueryError(f"Token tidak terduga: '{tokens[pos]}'.")
+    return tree
+
+# ======================================================================
+# 5. PLANNER & EVALUATOR
+# ======================================================================
+def plan_boolean_query(node):
+    """
+    Optimasi AST:
+      - AND/OR bersarang diratakan (a AND (b AND c) -> AND[a, b, c])
+      - term di-resolve sekali menjadi bitmap ('POSTINGS', teks, DocBitmap)
+      - operand positif AND diurutkan dari DF terkecil (irisan cepat mengecil),
+        operand NOT ditaruh di akhir dan dievaluasi sebagai selisih (lazy NOT)
+    """
+    kind = node[0]
+    if kind == 'TERM':
+        return ('POSTINGS', node[1], _get_postings(node[1]))
+    if kind == 'NOT':
+        return ('NOT', plan_boolean_query(node[1]))
+
+    children = []
+    for child in node[1]:
+        planned = plan_boolean_query(child)
+        if planned[0] == kind:
+            children.extend(planned[1])
+        else:
+            children.append(planned)
+    if kind == 'AND':
+        positives = sorted((c for c in children if c[0] != 'NOT'), key=_estimate_cardinality)
+        negatives = [c for c in children if c[0] == 'NOT']
+        children = positives + negatives
+    return (kind, children)
+
+def _estimate_cardinality(node):
+    kind = node[0]
+    if kind == 'POSTINGS':
+        return len(node[2])
+    if kind == 'AND':
+        return min((_estimate_cardinality(c) for c in node[1] if c[0] != 'NOT'), default=len(_doc_universe()))
+    if kind == 'OR':
+        return sum(_estimate_cardinality(c) for c in node[1])
+    return len(_doc_universe()) # NOT
+
+def _evaluate(node):
+    """Mengevaluasi AST hasil planner; selalu mengembalikan DocBitmap."""
+    kind = node[0]
+    if kind == 'POSTINGS':
+        return node[2]
+    if kind == 'OR':
+        return DocBitmap.union_all(_evaluate(child) for child in node[1])
+    if kind == 'NOT':
+        # NOT berdiri sendiri: baru di sini dibandingkan dengan semua dokumen
+        return _doc_universe() - _evaluate(node[1])
+
+    # AND: irisan operand positif (DF kecil dulu), lalu kurangi operand NOT
+    positives = [child for child in node[1] if child[0] != 'NOT']
+    negatives = [child[1] for child in node[1] if child[0] == 'NOT']
+    result = _evaluate(positives[0]) if positives else _doc_universe()
+    for child in positives[1:]:
+        if not result:
+            return _EMPTY # Short-circuit
+        result = result & _evaluate(child)
+    for child in negatives:
+        if not result:
+            break
+        result = result - _evaluate(child)
+    return result
+
+# ======================================================================
+# 6. FUNGSI PENCARIAN UTAMA (SOAL 03)
 # ======================================================================
 def search_boolean(query_text):
     """
-    Memproses kueri Boolean sederhana (AND, OR, NOT).
-    Tidak mendukung tanda kurung (sesuai opsional Soal 03).
+    Memproses kueri Boolean (AND, OR, NOT, tanda kurung).
+    Hasil: list Doc_ID terurut naik (deterministik).
     """
     if BOOLEAN_INDEX is None:
         initialize_boolean() # Coba inisialisasi jika belum
         if BOOLEAN_INDEX is None:
              return []
 
-    # 1. Pisahkan kueri berdasarkan operator, sambil menyimpan operatornya
-    # re.split akan menghasilkan list seperti: ['alam', 'AND', 'sejuk', 'NOT', 'wisata']
-    parts = re.split(r'\s+(AND|OR|NOT)\s+', query_text, flags=re.IGNORECASE)
-    
-    if not parts:
-        return []
-
     try:
-        # 2. Ambil hasil untuk term pertama
-        current_result_set = _get_postings(parts[0])
-        
-        # 3. Iterasi sisa kueri (operator + term)
-        i = 1
-        while i < len(parts):
-            operator = parts[i].upper()
-            next_term = parts[i+1]
-            
-            next_set = _get_postings(next_term)
-            
-            # 4. Lakukan operasi set (sesuai Soal 03) [cite: 88]
-            if operator == 'AND':
-                current_result_set = current_result_set.intersection(next_set)
-            elif operator == 'OR':
-                current_result_set = current_result_set.union(next_set)
-            elif operator == 'NOT':
-                current_result_set = current_result_set.difference(next_set)
-            
-            i += 2 # Lompat ke operator berikutnya
-            
-        return list(current_result_set)
+        with instrumentation.span('boolean_parse'):
+            tree = parse_boolean_query(query_text)
+        with instrumentation.span('boolean_eval'):
+            return _evaluate(plan_boolean_query(tree)).tolist()
 
     except Exception as e:
         print(f"Error saat parsing kueri boolean '{query_text}': {e}")
@@ -115,7 +304,9 @@ if __name__ == "__main__":
     test_query_1 = "alam AND sejuk"
     test_query_2 = "kamar mandi OR toilet"
     test_query_3 = "alam AND NOT bayar" # Asumsi 'bayar' ada di preprocessing Anda
+    test_query_4 = "(sejuk OR dingin) AND NOT (ramai OR bising)"
     
     print(f"Hasil '{test_query_1}': {search_boolean(test_query_1)}")
     print(f"Hasil '{test_query_2}': {search_boolean(test_query_2)}")
-    print(f"Hasil '{test_query_3}': {search_boolean(test_query_3)}")
\ No newline at end of file
+    print(f"Hasil '{test_query_3}': {search_boolean(test_query_3)}")
+    print(f"Hasil '{test_query_4}': {search_boolean(test_query_4)}")
\ No newline at end of file
@@ -0,0 +1,173 @@
+import json
+import math
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from . import preprocessing
+from .preprocessing import full_preprocessing
+from .vsm_structures import build_postings
+from .bitmap_postings import DocBitmap
+
+# ======================================================================
+# FUNGSI-FUNGSI INDEXING
+# Dipakai bersama oleh 'build_index.py' (build penuh) dan
+# 'update_index.py' (segmen inkremental).
+# ======================================================================
+
+# --- INDEXING PHASE 1: PREPROCESSING & DF/IDF ---
+def preprocess_corpus(df_corpus):
+    """Menambahkan kolom 'Clean_Tokens' (hasil full_preprocessing) ke korpus."""
+    df_corpus['Teks_Mentah'] = df_corpus['Teks_Mentah'].fillna('')
+    df_corpus['Clean_Tokens'] = df_corpus['Teks_Mentah'].apply(full_preprocessing)
+    return df_corpus
+
+def count_document_frequencies(token_lists):
+    """dict(term -> jumlah dokumen yang mengandung term)."""
+    df_counts = {} # Document Frequency
+    for tokens in token_lists:
+        for word in set(tokens):
+            df_counts[word] = df_counts.get(word, 0) + 1
+    return df_counts
+
+def compute_idf(df_counts, n_docs):
+    """IDF = log10(N / df)."""
+    return {term: math.log10(n_docs / count) for term, count in df_counts.items()}
+
+# --- INDEXING PHASE 2: BOOLEAN INVERTED INDEX ---
+def build_boolean_index(doc_ids, token_lists):
+    """dict(term -> DocBitmap): postings Boolean terkompresi (gaya Roaring)."""
+    boolean_inverted_index = {}
+    for doc_id, tokens in zip(doc_ids, token_lists):
+        for term in set(tokens): # Hanya term unik per dokumen
+            boolean_inverted_index.setdefault(term, []).append(int(doc_id))
+    return {term: DocBitmap.from_iterable(ids) for term, ids in boolean_inverted_index.items()}
+
+# --- INDEXING PHASE 3: VSM INVERTED INDEX (POSTINGS ARRAY) ---
+def build_vsm_index(doc_ids, token_lists):
+    """dict(term -> Postings) berisi RAW TF, dibangun dalam satu lintasan."""
+    postings_pairs = {} # term -> list[(doc_id, tf)]
+    for doc_id, tokens in zip(doc_ids, token_lists):
+        tf_in_doc = {word: tokens.count(word) for word in set(tokens)}
+        for term, tf in tf_in_doc.items():
+            postings_pairs.setdefault(term, []).append((int(doc_id), tf))
+
+    # Ubah list pasangan menjadi array doc_ids/tfs yang terurut per term
+    return {term: build_postings(pairs) for term, pairs in postings_pairs.items()}
+
+# --- BUILD PARALEL (PHASE 1 + 3 per shard, lalu digabung) ---
+def _index_shard(shard):
+    """
+    Dijalankan di proses worker: preprocessing + postings parsial + DF
+    parsial untuk satu potongan korpus (Doc_ID berurutan).
+    """
+    doc_ids, texts = shard
+    token_lists = [full_preprocessing(text) for text in texts]
+    postings_pairs = {} # term -> list[(doc_id, tf)]
+    for doc_id, tokens in zip(doc_ids, token_lists):
+        for term in set(tokens):
+            postings_pairs.setdefault(term, []).append((doc_id, tokens.count(term)))
+    df_counts = {term: len(pairs) for term, pairs in postings_pairs.items()}
+    # Kata baru yang di-stem worker ikut dikirim agar bisa dipersist proses utama
+    return token_lists, df_counts, postings_pairs, preprocessing.STEM_CACHE.learned_entries()
+
+def build_index_parallel(df_corpus, workers):
+    """
+    Preprocessing & indexing paralel: korpus dibagi menjadi 'workers' shard
+    berurutan, tiap shard diproses di process pool, lalu hasil parsial
+    digabung dalam satu lintasan linear (urutan shard dipertahankan).
+    Hasilnya identik dengan build serial.
+
+    Mengembalikan: (df_corpus + 'Clean_Tokens', df_counts, vsm_index)
+    """
+    df_corpus['Teks_Mentah'] = df_corpus['Teks_Mentah'].fillna('')
+    doc_ids = [int(doc_id) for doc_id in df_corpus['Doc_ID']]
+    texts = df_corpus['Teks_Mentah'].tolist()
+
+    n_shards = max(1, min(workers, len(doc_ids)))
+    bounds = [len(doc_ids) * i // n_shards for i in range(n_shards + 1)]
+    shards = [(doc_ids[lo:hi], texts[lo:hi]) for lo, hi in zip(bounds, bounds[1:])]
+
+    if n_shards == 1:
+        results = [_index_shard(shards[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=n_shards) as pool:
+            results = list(pool.map(_index_shard, shards)) # map menjaga urutan shard
+
+    # Gabungkan hasil parsial (linear terhadap jumlah postings)
+    token_lists, df_counts, postings_pairs = [], {}, {}
+    for shard_tokens, shard_df, shard_pairs, shard_stems in results:
+        token_lists.extend(shard_tokens)
+        preprocessing.STEM_CACHE.update(shard_stems)
+        for term, count in shard_df.items():
+            df_counts[term] = df_counts.get(term, 0) + count
+        for term, pairs in shard_pairs.items():
+            postings_pairs.setdefault(term, []).extend(pairs)
+
+    df_corpus['Clean_Tokens'] = token_lists
+    vsm_index = {term: build_postings(pairs) for term, pairs in postings_pairs.items()}
+    return df_corpus, df_counts, vsm_index
+
+# --- METADATA: Doc_ID -> Nama, Lokasi, Rating + data statis ---
+def parse_price_json(json_str):
+    """Parser JSON yang aman HANYA UNTUK HARGA."""
+    if pd.isna(json_str) or not isinstance(json_str, str) or not json_str.startswith('['):
+        return [] # Fallback: list kosong
+    try:
+        # Membaca string JSON dari CSV
+        return json.loads(json_str)
+    except (json.JSONDecodeError, TypeError):
+        return [] # Fallback jika JSON rusak
+
+def build_metadata(df_corpus, info_statis_path, rating_history=None):
+    """
+    Membangun df_metadata (index Doc_ID) dari korpus + info_tempat.csv.
+    'rating_history' (opsional): DataFrame [Nama_Tempat, Rating] dari dokumen
+    yang sudah terindeks, agar Avg_Rating segmen baru dihitung dari semua ulasan.
+    """
+    df_metadata = df_corpus[['Doc_ID', 'Nama_Tempat', 'Lokasi', 'Rating']].copy()
+    ratings = df_metadata[['Nama_Tempat', 'Rating']]
+    if rating_history is not None and not rating_history.empty:
+        ratings = pd.concat([rating_history[['Nama_Tempat', 'Rating']], ratings], ignore_index=True)
+    avg_rating_per_place = ratings.groupby('Nama_Tempat')['Rating'].mean().reset_index()
+    avg_rating_per_place.rename(columns={'Rating': 'Avg_Rating'}, inplace=True)
+    df_metadata = df_metadata.merge(avg_rating_per_place, on='Nama_Tempat', how='left')
+
+    # Kita gabungkan data statis (foto, harga, dll) dari info_tempat.csv
+    try:
+        print("🔄 Memuat data statis (foto, harga, dll)...")
+        df_info_statis = pd.read_csv(info_statis_path)
+        print(f"✅ Berhasil memuat data statis dari: {info_statis_path}")
+
+        # 1. Proses Price_Items (HARUSNYA Tipe List) -> BENAR
+        df_info_statis['Price_Items'] = df_info_statis['Price_Items'].apply(parse_price_json)
+
+        # 2. Proses Facilities (HARUSNYA Tipe String) -> BENAR
+        df_info_statis['Facilities'] = df_info_statis['Facilities'].fillna("").astype(str)
+
+        # 3. Proses kolom lain (Jaga-jaga) -> BENAR
+        df_info_statis['Photo_URL'] = df_info_statis['Photo_URL'].fillna("")
+        df_info_statis['Gmaps_Link'] = df_info_statis['Gmaps_Link'].fillna("")
+
+        # Gabungkan data statis ke metadata utama berdasarkan 'Nama_Tempat'
+        df_metadata = df_metadata.merge(df_info_statis, on='Nama_Tempat', how='left')
+        print("✅ Berhasil menggabungkan data statis (foto, harga, dll).")
+
+        # 4. FINAL FALLBACK -> BENAR
+        df_metadata['Price_Items'] = df_metadata['Price_Items'].apply(lambda x: [] if isinstance(x, float) and pd.isna(x) else x)
+        df_metadata['Facilities'] = df_metadata['Facilities'].fillna("")
+        df_metadata['Waktu_Buka'] = df_metadata['Waktu_Buka'].fillna("Info tidak tersedia")
+        df_metadata['Photo_URL'] = df_metadata['Photo_URL'].fillna("")
+        df_metadata['Gmaps_Link'] = df_metadata['Gmaps_Link'].fillna("")
+
+    except FileNotFoundError:
+        print(f"⚠️ PERINGATAN: {info_statis_path} tidak ditemukan.")
+        print("   Melanjutkan tanpa data foto/harga/fasilitas.")
+        # Buat kolom placeholder KONSISTEN
+        df_metadata['Price_Items'] = [[] for _ in range(len(df_metadata))] # Tipe List
+        df_metadata['Facilities'] = "" # Tipe String
+        df_metadata['Waktu_Buka'] = "Info tidak tersedia"
+        df_metadata['Photo_URL'] = ""
+        df_metadata['Gmaps_Link'] = ""
+
+    # Jadikan Doc_ID sebagai index
+    df_metadata.set_index('Doc_ID', inplace=True)
+    return df_metadata
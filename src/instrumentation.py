@@ -0,0 +1,288 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# ======================================================================
+# INSTRUMENTASI LATENSI PER TAHAP (SPAN + HISTOGRAM) & PROFILING
+# ======================================================================
+# Pemakaian di jalur pencarian:
+#     with instrumentation.span('full_preprocessing'):
+#         ...
+# Saat nonaktif (default), span() mengembalikan satu objek no-op bersama:
+# biayanya hanya satu pemanggilan fungsi + cek flag.
+# Saat aktif (STKI_TRACE=1 atau enable()):
+#   - durasi tiap span masuk histogram per tahap (bucket logaritmik),
+#   - di dalam trace(query), durasi per tahap dikumpulkan dan satu baris
+#     log JSON ditulis per kueri (stderr, atau file STKI_TRACE_LOG).
+# Span boleh bersarang (misal 'stemming' di dalam 'full_preprocessing'),
+# jadi jumlah semua tahap bisa melebihi total.
+#
+# Profiling opsional (STKI_PROFILE=cprofile|tracemalloc|all atau
+# search.py --profile): lihat profiled().
+ENABLED = os.environ.get('STKI_TRACE', '').lower() in ('1', 'true', 'yes', 'on')
+TRACE_LOG_PATH = os.environ.get('STKI_TRACE_LOG') or None # None = stderr
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+RECENT_TRACE_LIMIT = 50
+# Batas atas bucket histogram (ms): 0.01 ms x 2^i, sampai ~84 detik
+BUCKET_BOUNDS_MS = tuple(0.01 * 2 ** i for i in range(24))
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+# ======================================================================
+# 1. HISTOGRAM LATENSI
+# ======================================================================
+class LatencyHistogram:
+    """Histogram bucket tetap (logaritmik): record O(log bucket), memori konstan."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1) # Bucket terakhir: > batas tertinggi
+        self.n = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, ms):
+        lo, hi = 0, len(BUCKET_BOUNDS_MS)
+        while lo < hi: # Bucket pertama yang batas atasnya >= ms
+            mid = (lo + hi) // 2
+            if BUCKET_BOUNDS_MS[mid] < ms:
+                lo = mid + 1
+            else:
+                hi = mid
+        with self._lock:
+            self.counts[lo] += 1
+            self.n += 1
+            self.total_ms += ms
+            if ms > self.max_ms:
+                self.max_ms = ms
+
+    def percentile(self, p):
+        """Perkiraan persentil (batas atas bucket, dibatasi nilai maksimum)."""
+        if not self.n:
+            return 0.0
+        rank = p / 100 * self.n
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank and count:
+                bound = BUCKET_BOUNDS_MS[i] if i < len(BUCKET_BOUNDS_MS) else self.max_ms
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def summary(self):
+        return {
+            'n': self.n,
+            'mean_ms': self.total_ms / self.n if self.n else 0.0,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': self.max_ms,
+        }
+
+HISTOGRAMS = {} # nama tahap -> LatencyHistogram
+RECENT_TRACES = deque(maxlen=RECENT_TRACE_LIMIT) # Record trace terbaru (panel admin)
+_HISTOGRAM_LOCK = threading.Lock()
+_LOCAL = threading.local() # Trace aktif per thread (sesi Streamlit / request)
+_LOG_LOCK = threading.Lock()
+
+def _histogram(name):
+    histogram = HISTOGRAMS.get(name)
+    if histogram is None:
+        with _HISTOGRAM_LOCK:
+            histogram = HISTOGRAMS.setdefault(name, LatencyHistogram())
+    return histogram
+
+def histogram_summaries():
+    """{tahap: ringkasan histogram}, urut dari total waktu terbesar."""
+    items = sorted(HISTOGRAMS.items(), key=lambda item: item[1].total_ms, reverse=True)
+    return {name: histogram.summary() for name, histogram in items}
+
+def reset():
+    """Mengosongkan histogram & trace terbaru."""
+    with _HISTOGRAM_LOCK:
+        HISTOGRAMS.clear()
+    RECENT_TRACES.clear()
+
+# ======================================================================
+# 2. SPAN & TRACE
+# ======================================================================
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        ms = (time.perf_counter() - self.start) * 1000
+        _histogram(self.name).record(ms)
+        stages = getattr(_LOCAL, 'stages', None)
+        if stages is not None:
+            stages[self.name] = stages.get(self.name, 0.0) + ms
+        return False
+
+def span(name):
+    """Context manager pengukur satu tahap (no-op bersama jika instrumentasi nonaktif)."""
+    if not ENABLED:
+        return _NULL_SPAN
+    return _Span(name)
+
+class _NullTrace:
+    __slots__ = ()
+
+    def __enter__(self):
+        return {} # Field tambahan dari pemanggil dibuang
+
+    def __exit__(self, *exc):
+        return False
+
+class _Trace:
+    """Satu kueri: mengumpulkan durasi per tahap lalu menulis satu baris log JSON."""
+
+    def __init__(self, query, event, fields):
+        self.record = {'event': event, 'query': query, **fields}
+
+    def __enter__(self):
+        self._outer = getattr(_LOCAL, 'stages', None) # Trace bersarang: yang dalam tetap ikut dihitung luar
+        _LOCAL.stages = {}
+        self.start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, exc_type, *exc):
+        total_ms = (time.perf_counter() - self.start) * 1000
+        stages = _LOCAL.stages
+        _LOCAL.stages = self._outer
+        if self._outer is not None:
+            for name, ms in stages.items():
+                self._outer[name] = self._outer.get(name, 0.0) + ms
+        _histogram(f"total:{self.record['event']}").record(total_ms)
+        record = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            **self.record,
+            'total_ms': round(total_ms, 3),
+            'stages_ms': {name: round(ms, 3) for name, ms in stages.items()},
+        }
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        RECENT_TRACES.append(record)
+        _write_log_line(record)
+        return False
+
+def trace(query, event='search', **fields):
+    """
+    Context manager untuk satu kueri. Mengembalikan dict yang boleh diisi
+    field tambahan (misal n_hasil) sebelum baris log ditulis.
+    """
+    if not ENABLED:
+        return _NullTrace()
+    return _Trace(query, event, fields)
+
+def _write_log_line(record):
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    try:
+        with _LOG_LOCK:
+            if TRACE_LOG_PATH:
+                with open(TRACE_LOG_PATH, 'a', encoding='utf-8') as f:
+                    f.write(line + "\n")
+            else:
+                print(line, file=sys.stderr)
+    except OSError as e:
+        print(f"⚠️ GAGAL menulis log trace: {e}", file=sys.stderr)
+
+# ======================================================================
+# 3. PROFILING OPSIONAL (cProfile / tracemalloc)
+# ======================================================================
+def profile_modes_from_env():
+    """STKI_PROFILE=cprofile,tracemalloc | all -> tuple mode."""
+    return parse_profile_modes(os.environ.get('STKI_PROFILE', ''))
+
+def parse_profile_modes(value):
+    modes = {mode.strip().lower() for mode in str(value or '').split(',') if mode.strip()}
+    if 'all' in modes:
+        return PROFILE_MODES
+    unknown = modes - set(PROFILE_MODES)
+    if unknown:
+        raise ValueError(f"Mode profiling tidak dikenal: {', '.join(sorted(unknown))}. Pilihan: {', '.join(PROFILE_MODES)}, all")
+    return tuple(mode for mode in PROFILE_MODES if mode in modes)
+
+class profiled:
+    """
+    Context manager profiling: cProfile (fungsi teratas menurut waktu
+    kumulatif) dan/atau tracemalloc (alokasi terbesar + puncak memori).
+    Laporan dicetak ke 'out' saat blok selesai. modes kosong = no-op.
+    """
+
+    def __init__(self, modes, label='', top=20, out=None):
+        self.modes = tuple(modes)
+        self.label = label
+        self.top = top
+        self.out = out or sys.stdout
+        self._profiler = None
+        self._started_tracemalloc = False
+
+    def __enter__(self):
+        if 'tracemalloc' in self.modes:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            tracemalloc.reset_peak()
+            self._snapshot_before = tracemalloc.take_snapshot()
+        if 'cprofile' in self.modes:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        title = f" ({self.label})" if self.label else ""
+        if self._profiler is not None:
+            import io
+            import pstats
+            self._profiler.disable()
+            buffer = io.StringIO()
+            pstats.Stats(self._profiler, stream=buffer).sort_stats('cumulative').print_stats(self.top)
+            print(f"\n--- 🔬 cProfile{title}: {self.top} fungsi teratas (waktu kumulatif) ---", file=self.out)
+            print(buffer.getvalue().strip(), file=self.out)
+        if 'tracemalloc' in self.modes:
+            import tracemalloc
+            current, peak = tracemalloc.get_traced_memory()
+            stats = tracemalloc.take_snapshot().compare_to(self._snapshot_before, 'lineno')
+            print(f"\n--- 🔬 tracemalloc{title}: puncak {peak / 2**20:.2f} MB, saat ini {current / 2**20:.2f} MB ---", file=self.out)
+            for stat in stats[:min(self.top, 10)]:
+                print(f"  {stat}", file=self.out)
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+        return False
+
+def format_summaries(summaries=None):
+    """Tabel teks ringkasan histogram (untuk CLI)."""
+    summaries = histogram_summaries() if summaries is None else summaries
+    lines = [f"{'tahap':<24} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+    for name, s in summaries.items():
+        lines.append(f"{name:<24} {s['n']:>6} {s['p50_ms']:>9.3f} {s['p95_ms']:>9.3f} {s['p99_ms']:>9.3f} {s['max_ms']:>9.3f}")
+    return "\n".join(lines)
@@ -1,12 +1,19 @@
+import heapq
 import math
+import time
+from bisect import bisect_left
+from itertools import accumulate
 import os
-import joblib
-import pandas as pd
-import urllib.parse
+import numpy as np
 import json
 from . import utils
 from . import preprocessing
-from .vsm_structures import Node, SlinkedList
+from .vsm_structures import query_term_weight
+from .mmap_index import MappedPostings
+from .posting_weights import PostingWeights, check_scheme
+from .query_cache import QueryCache
+from .places import DEFAULT_FUSION, FUSION_METHODS
+from . import instrumentation
 
 # ======================================================================
 # 1. VARIABEL GLOBAL ASET VSM
@@ -14,30 +21,92 @@ from .vsm_structures import Node, SlinkedList
 IDF_SCORES = None
 VSM_INDEX_TF = None
 DF_METADATA = None
+PLACE_TABLE = None # Kartu hasil per tempat + Doc_ID -> Place_ID (src/places.py)
+POSTING_WEIGHTS = None # Bobot W_d per posting per skema (src/posting_weights.py), dibuat saat pertama dipakai
+SPARSE_VSM = None # Mesin cosine (matriks sparse), dibuat saat pertama dipakai
+ASSET_VERSION = None # Sidik jari aset yang sedang dimuat (utils.asset_version)
+
+# Cache query dua level (lihat src/query_cache.py), terikat ASSET_VERSION
+ANALYSIS_CACHE = QueryCache('analisis', max_size=4096)
+RESULT_CACHE = QueryCache('hasil', max_size=1024)
+ASSET_CHECK_INTERVAL = 5.0 # Detik antar pengecekan perubahan aset di disk
+DEFAULT_PAGE_SIZE = 12 # Kartu per halaman (search_page / iter_search_results)
+_LAST_ASSET_CHECK = 0.0
 
 # ======================================================================
 # 2. FUNGSI INISIALISASI (Dipanggil oleh app.py)
 # ======================================================================
 def initialize_mesin():
     """Memuat semua aset VSM (.pkl) ke dalam variabel global."""
-    global IDF_SCORES, VSM_INDEX_TF, DF_METADATA 
+    global IDF_SCORES, VSM_INDEX_TF, DF_METADATA, PLACE_TABLE, POSTING_WEIGHTS, SPARSE_VSM, ASSET_VERSION, _LAST_ASSET_CHECK
     
     print("--- Memuat Aset VSM (Indeks, IDF, Metadata)... ---")
-    IDF_SCORES, VSM_INDEX_TF, DF_METADATA = utils.load_assets()
+    ASSET_VERSION = utils.asset_version()
+    _LAST_ASSET_CHECK = time.monotonic()
+    IDF_SCORES, VSM_INDEX_TF, DF_METADATA, PLACE_TABLE = utils.load_assets()
+    POSTING_WEIGHTS = None
+    SPARSE_VSM = None
+    clear_query_cache()
     
-    if IDF_SCORES is None or VSM_INDEX_TF is None or DF_METADATA is None:
+    if IDF_SCORES is None or VSM_INDEX_TF is None or DF_METADATA is None or PLACE_TABLE is None:
         print("❌ FATAL ERROR: Gagal memuat aset VSM. Mesin pencari tidak akan berfungsi.")
     else:
+        if PLACE_TABLE.place_regions is None: # Aset lama tanpa region -> partisi & listing dihitung di sini
+            PLACE_TABLE.assign_regions(preprocessing.classify_location)
         print("✅ Mesin Pencari (VSM) Siap.")
 
+def _refresh_if_assets_changed():
+    """
+    Maksimal sekali per ASSET_CHECK_INTERVAL: jika aset di disk berubah
+    (build_index.py / update_index.py), aset dimuat ulang dan cache query
+    otomatis tidak berlaku lagi karena ASSET_VERSION berganti.
+    """
+    global _LAST_ASSET_CHECK
+    if ASSET_VERSION is None:
+        return # Aset belum pernah dimuat
+    now = time.monotonic()
+    if now - _LAST_ASSET_CHECK < ASSET_CHECK_INTERVAL:
+        return
+    _LAST_ASSET_CHECK = now
+    if utils.asset_version() != ASSET_VERSION:
+        print("🔄 Aset di disk berubah, memuat ulang mesin pencari...")
+        initialize_mesin()
+
+def clear_query_cache():
+    ANALYSIS_CACHE.clear()
+    RESULT_CACHE.clear()
+
+def query_cache_stats():
+    """Metrik cache query (hit/miss/hit rate) untuk dua level."""
+    return [ANALYSIS_CACHE.stats(), RESULT_CACHE.stats()]
+
 # ======================================================================
 # 3. FUNGSI ANALISIS KASTEM (Wrapper untuk preprocessing)
 # ======================================================================
 def analyze_full_query(query_text):
-    """Fungsi "Otak" (dari Sel 8) yang memanggil semua fungsi preprocessing."""
-    query_after_intent, special_intent = preprocessing.detect_intent(query_text)
-    final_vsm_text, region_filter = preprocessing.detect_region_and_filter_query(query_after_intent)
-    vsm_tokens = preprocessing.full_preprocessing(final_vsm_text)
+    """
+    Fungsi "Otak" (dari Sel 8) yang memanggil semua fungsi preprocessing.
+    Hasil analisis di-cache per query (level 1, kunci: query huruf kecil
+    dengan spasi dinormalisasi).
+    """
+    _refresh_if_assets_changed()
+    cache_key = " ".join(str(query_text).lower().split())
+    found, cached = ANALYSIS_CACHE.get(cache_key, ASSET_VERSION)
+    if found:
+        vsm_tokens, special_intent, region_filter = cached
+        return list(vsm_tokens), special_intent, region_filter
+
+    vsm_tokens, special_intent, region_filter = _analyze_full_query(query_text)
+    ANALYSIS_CACHE.put(cache_key, (tuple(vsm_tokens), special_intent, region_filter), ASSET_VERSION)
+    return vsm_tokens, special_intent, region_filter
+
+def _analyze_full_query(query_text):
+    with instrumentation.span('detect_intent'):
+        query_after_intent, special_intent = preprocessing.detect_intent(query_text)
+    with instrumentation.span('detect_region'):
+        final_vsm_text, region_filter = preprocessing.detect_region_and_filter_query(query_after_intent)
+    with instrumentation.span('full_preprocessing'):
+        vsm_tokens = preprocessing.full_preprocessing(final_vsm_text)
 
     if region_filter:
         generic_fluff_words = {'cari', 'tampil', 'lihat', 'berikan', 'saran', 'rekomendasikan'} 
@@ -54,173 +123,328 @@ def analyze_full_query(query_text):
 # ======================================================================
 # 4. FUNGSI INTI VSM (DOT PRODUCT)
 # ======================================================================
-def _calculate_vsm_scores(query_tokens, weighting_scheme='tfidf'):
+def _region_slices(doc_ids, ranges):
+    """Potongan postings (slice) yang Doc_ID-nya jatuh di rentang region (binary search)."""
+    starts, ends = ranges
+    lo = np.searchsorted(doc_ids, starts).tolist()
+    hi = np.searchsorted(doc_ids, ends).tolist()
+    return [slice(a, b) for a, b in zip(lo, hi) if b > a]
+
+def _calculate_vsm_scores(query_tokens, weighting_scheme='tfidf', region=None):
     """
     Fungsi inti VSM yang MURNI menghitung skor dot product.
     Fungsi ini akan digunakan oleh 'eval.py'.
-    
-    CATATAN: 'weighting_scheme' saat ini belum diimplementasikan penuh
-    karena 'build_index.py' Anda menyimpan TF-IDF yang sudah jadi.
-    Ini akan kita modifikasi di Bagian 3 checklist.
+    Jika 'region' diisi (kode region), hanya postings di rentang Doc_ID
+    region itu yang disentuh (partisi region dari PLACE_TABLE).
+    'weighting_scheme': 'tfidf', 'sublinear' atau 'bm25'; bobot dokumen
+    W_d tiap skema sudah dihitung saat build (lihat src/posting_weights.py).
     
     Mengembalikan: list[(doc_id, score)]
     """
     if DF_METADATA is None or IDF_SCORES is None or VSM_INDEX_TF is None:
         print("!!! ERROR: Aset VSM tidak dimuat. Perhitungan skor dibatalkan.")
         return []
+    check_scheme(weighting_scheme)
         
     if not query_tokens: 
         return [] 
 
+    posting_weights = _get_posting_weights()
     query_tf = {word: query_tokens.count(word) for word in set(query_tokens)}
-    query_weights = {} # Ini adalah W_q (bobot query)
-    involved_docs = set() 
+    doc_scores = {}
+    region_ranges = PLACE_TABLE.region_doc_ranges(region) if region and PLACE_TABLE is not None else None
 
-    # === Langkah 1: Hitung bobot query & kumpulkan dokumen terlibat ===
+    # Satu kali lintasan per term: postings berupa array (doc_ids, W_d)
+    # yang sudah terurut, jadi skoring hanya perkalian-akumulasi.
     for term, tf in query_tf.items():
-        if term in IDF_SCORES: 
-            idf = IDF_SCORES[term]
-            
-            if weighting_scheme == 'sublinear' and tf > 0:
-                W_q = (1 + math.log10(tf)) * idf
-            else: # Default ke 'tfidf' standar
-                W_q = tf * idf
-                
-            query_weights[term] = W_q
-            
-            # Kumpulkan semua dokumen yang mengandung term ini
-            current_node = VSM_INDEX_TF[term].head.nextval
-            while current_node is not None:
-                involved_docs.add(current_node.doc)
-                current_node = current_node.nextval
+        entry = posting_weights.term_postings(term, weighting_scheme)
+        if entry is None:
+            continue
+        doc_ids, W_d, _, idf = entry
+
+        # === Langkah 1: Hitung bobot query (W_q) ===
+        W_q = query_term_weight(tf, idf, weighting_scheme)
+
+        # === Langkah 2: Ambil bobot dokumen (W_d) tersimpan & akumulasi dot product ===
+        if region_ranges is not None:
+            slices = _region_slices(doc_ids, region_ranges)
+            if not slices:
+                continue
+            doc_ids = np.concatenate([doc_ids[part] for part in slices])
+            W_d = np.concatenate([W_d[part] for part in slices])
+
+        # Sesuai Soal 04: Cosine Similarity (dot product)
+        for doc_id, contribution in zip(doc_ids.tolist(), (W_d * W_q).tolist()):
+            doc_scores[doc_id] = doc_scores.get(doc_id, 0.0) + contribution
+
+    if not doc_scores: 
+        return []
+
+    # Urutkan skor menurun; Doc_ID menaik sebagai pemecah seri agar deterministik
+    ranked_results_by_doc = sorted(doc_scores.items(), key=lambda item: (-item[1], item[0]))
+    return ranked_results_by_doc
+
+def _calculate_vsm_top_k(query_tokens, k=10, weighting_scheme='tfidf'):
+    """
+    Versi top-k dari '_calculate_vsm_scores' (skor dot product yang sama),
+    tanpa menghitung & mengurutkan semua dokumen.
+
+    Memakai heap berukuran k dan pemangkasan MaxScore: tiap term punya skor
+    batas-atas (W_q x W_d maksimum term yang disimpan di indeks). Term
+    dengan jumlah batas-atas kumulatif di bawah ambang heap menjadi
+    "non-esensial": dokumen yang hanya muncul di term tersebut dilewati,
+    dan postings-nya hanya diloncati (binary search) untuk dokumen kandidat.
     
-    if not involved_docs: 
+    Mengembalikan: list[(doc_id, score)] maksimal k, terurut menurun.
+    """
+    if IDF_SCORES is None or VSM_INDEX_TF is None:
+        print("!!! ERROR: Aset VSM tidak dimuat. Perhitungan skor dibatalkan.")
+        return []
+    check_scheme(weighting_scheme)
+    if not query_tokens or k <= 0:
         return []
 
-    # === Langkah 2: Hitung skor dot product untuk dokumen terlibat ===
-    doc_scores = {doc_id: 0 for doc_id in involved_docs}
-    for term, W_q in query_weights.items():
-        current_node = VSM_INDEX_TF[term].head.nextval 
-        while current_node is not None:
-            doc_id = current_node.doc
-            if doc_id in doc_scores: 
-                
-                raw_tf_doc = current_node.freq
-                idf = IDF_SCORES[term]
-                
-                if weighting_scheme == 'sublinear' and raw_tf_doc > 0:
-                    W_d = (1 + math.log10(raw_tf_doc)) * idf
-                else: # Default ke 'tfidf' standar
-                    W_d = raw_tf_doc * idf
-                
-                # Sesuai Soal 04: Cosine Similarity (dot product)
-                doc_scores[doc_id] += W_d * W_q 
-            
-            current_node = current_node.nextval
+    # --- Siapkan kursor per term: (batas_atas, W_q, doc_ids, W_d) ---
+    posting_weights = _get_posting_weights()
+    query_tf = {word: query_tokens.count(word) for word in set(query_tokens)}
+    cursors = []
+    for term, tf in query_tf.items():
+        entry = posting_weights.term_postings(term, weighting_scheme)
+        if entry is None or len(entry[0]) == 0:
+            continue
+        doc_ids, W_d, max_weight, idf = entry
+        W_q = query_term_weight(tf, idf, weighting_scheme)
+        cursors.append((W_q * max_weight, W_q, doc_ids.tolist(), W_d.tolist()))
 
-    ranked_results_by_doc = sorted(doc_scores.items(), key=lambda item: item[1], reverse=True)
-    return ranked_results_by_doc
+    if not cursors:
+        return []
+
+    # Urutkan term dari batas-atas terkecil; prefix[i] = total batas-atas term 0..i
+    cursors.sort(key=lambda cursor: cursor[0])
+    prefix_bounds = list(accumulate(cursor[0] for cursor in cursors))
+    n_terms = len(cursors)
+    positions = [0] * n_terms
+    heap = [] # min-heap (skor, -doc_id): elemen terlemah di heap[0]
+    threshold = -math.inf
+    first_essential = 0
+
+    while True:
+        # 1. Dokumen kandidat berikutnya = Doc_ID terkecil di list esensial
+        doc_id = None
+        for i in range(first_essential, n_terms):
+            docs, pos = cursors[i][2], positions[i]
+            if pos < len(docs) and (doc_id is None or docs[pos] < doc_id):
+                doc_id = docs[pos]
+        if doc_id is None:
+            break
+
+        # 2. Skor penuh dari term esensial
+        score = 0.0
+        for i in range(first_essential, n_terms):
+            _, W_q, docs, weights = cursors[i]
+            pos = positions[i]
+            if pos < len(docs) and docs[pos] == doc_id:
+                score += weights[pos] * W_q
+                positions[i] = pos + 1
+
+        # 3. Term non-esensial (batas-atas terbesar dulu), berhenti jika mustahil masuk top-k
+        for i in range(first_essential - 1, -1, -1):
+            if score + prefix_bounds[i] < threshold:
+                break
+            _, W_q, docs, weights = cursors[i]
+            pos = bisect_left(docs, doc_id, positions[i])
+            positions[i] = pos
+            if pos < len(docs) and docs[pos] == doc_id:
+                score += weights[pos] * W_q
+                positions[i] = pos + 1
+
+        # 4. Perbarui heap & ambang; Doc_ID kecil menang saat skor seri
+        entry = (score, -doc_id)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+        if len(heap) == k:
+            threshold = heap[0][0]
+            while first_essential < n_terms and prefix_bounds[first_essential] < threshold:
+                first_essential += 1
+
+    ranked = sorted(heap, key=lambda entry: (-entry[0], -entry[1]))
+    return [(-neg_doc_id, score) for score, neg_doc_id in ranked]
+
+def _get_posting_weights():
+    """
+    Bobot posting per skema (lazy): view ke index.bin, atau dihitung sekali
+    dari postings untuk aset .pkl/bersegmen (bobot segmen memakai IDF lokal).
+    """
+    global POSTING_WEIGHTS
+    if POSTING_WEIGHTS is None:
+        if isinstance(VSM_INDEX_TF, MappedPostings):
+            POSTING_WEIGHTS = PostingWeights.from_mapped(VSM_INDEX_TF.mapped_index)
+        else:
+            POSTING_WEIGHTS = PostingWeights.from_dicts(IDF_SCORES, VSM_INDEX_TF, n_docs=len(DF_METADATA))
+    return POSTING_WEIGHTS
+
+def _get_sparse_vsm():
+    """Membuat mesin cosine sekali (lazy) di atas bobot posting yang sama."""
+    global SPARSE_VSM
+    if SPARSE_VSM is None:
+        from .vsm_sparse import SparseVSM
+        SPARSE_VSM = SparseVSM(_get_posting_weights())
+    return SPARSE_VSM
+
+def _calculate_cosine_scores(query_tokens, weighting_scheme='tfidf', k=None):
+    """
+    Alternatif '_calculate_vsm_scores': Cosine Similarity sungguhan
+    (dinormalisasi panjang dokumen & query) lewat matriks sparse.
+    Bobot & norma dokumen per skema sudah dihitung saat build_index.py.
+    Jika 'k' diisi, hanya top-k yang diurutkan (seleksi parsial).
+    
+    Mengembalikan: list[(doc_id, score)]
+    """
+    if IDF_SCORES is None or VSM_INDEX_TF is None:
+        print("!!! ERROR: Aset VSM tidak dimuat. Perhitungan skor dibatalkan.")
+        return []
+    with instrumentation.span('cosine_scores'):
+        return _get_sparse_vsm().score(query_tokens, weighting_scheme, k)
+
+def search_many(queries, k=10, weighting='tfidf', scoring='dot'):
+    """
+    API batch untuk evaluasi & job offline: semua query dianalisis dulu
+    (lewat cache analisis), token identik (multiset yang sama) dihitung
+    sekali, lalu semua query diskor bersama dengan satu perkalian matriks
+    sparse (lihat SparseVSM.score_many).
+    scoring: 'dot' (skor sama dengan _calculate_vsm_scores) atau 'cosine'.
+
+    Mengembalikan list (sejajar 'queries') of dict:
+      {'query', 'tokens', 'intent', 'region', 'results': list[(doc_id, score)] top-k}
+    """
+    if scoring not in ('dot', 'cosine'):
+        raise ValueError(f"Skor '{scoring}' tidak dikenal. Pilihan: dot, cosine")
+    if IDF_SCORES is None or VSM_INDEX_TF is None:
+        print("!!! ERROR: Aset VSM tidak dimuat. Perhitungan skor dibatalkan.")
+        return []
+
+    analyses, unique_keys, key_index = [], [], {}
+    for query_text in queries:
+        vsm_tokens, special_intent, region_filter = analyze_full_query(query_text)
+        key = tuple(sorted(vsm_tokens))
+        if key not in key_index:
+            key_index[key] = len(unique_keys)
+            unique_keys.append(key)
+        analyses.append((query_text, vsm_tokens, special_intent, region_filter, key_index[key]))
+
+    with instrumentation.span('batch_scoring'):
+        scored = _get_sparse_vsm().score_many([list(key) for key in unique_keys], weighting, k,
+                                              normalize=scoring == 'cosine')
+    return [
+        {'query': query_text, 'tokens': vsm_tokens, 'intent': special_intent, 'region': region_filter,
+         'results': list(scored[unique_id])}
+        for query_text, vsm_tokens, special_intent, region_filter, unique_id in analyses
+    ]
 
 # ======================================================================
 # 5. FUNGSI PENCARIAN UTAMA (diperbarui dengan fallback kuat)
 # ======================================================================
-def search_by_keyword(query_tokens, special_intent, region_filter):
+def search_by_keyword(query_tokens, special_intent, region_filter, fusion=DEFAULT_FUSION):
     """
     Melakukan pencarian VSM atau bypass jika intent 'ALL'.
-    Menggunakan ASET GLOBAL (IDF_SCORES, VSM_INDEX_TF, DF_METADATA).
+    Menggunakan ASET GLOBAL (IDF_SCORES, VSM_INDEX_TF, PLACE_TABLE).
+    'fusion' memilih cara skor ulasan digabung per tempat (FUSION_METHODS:
+    'max', 'sum', 'mean_top_n', 'rating_blend'), bisa berbeda tiap query.
+    Mengembalikan SEMUA hasil; untuk tampilan per halaman pakai search_page
+    atau iter_search_results (kartu hanya dibuat untuk halaman yang diminta).
     """
-    if DF_METADATA is None or IDF_SCORES is None or VSM_INDEX_TF is None:
+    return search_page(query_tokens, special_intent, region_filter, offset=0, limit=None, fusion=fusion)['results']
+
+def search_page(query_tokens, special_intent, region_filter, offset=0, limit=DEFAULT_PAGE_SIZE, fusion=DEFAULT_FUSION):
+    """
+    Satu halaman hasil (offset/limit). Peringkat tempat (Place_ID + skor)
+    di-cache per (tokens, intent, region, fusion) (level 2) dan hanya
+    dihitung sedalam yang dibutuhkan (top-k parsial); kartu hasil dibuat
+    hanya untuk tempat di halaman ini, selalu salinan baru.
+    limit=None -> semua hasil mulai 'offset'.
+
+    Mengembalikan: {'results', 'total', 'offset', 'limit', 'has_more'}
+    """
+    offset = max(int(offset), 0)
+    page = {'results': [], 'total': 0, 'offset': offset, 'limit': limit, 'has_more': False}
+    _refresh_if_assets_changed()
+    if PLACE_TABLE is None or IDF_SCORES is None or VSM_INDEX_TF is None:
         print("!!! ERROR: Aset VSM tidak dimuat. Pencarian dibatalkan.")
-        return []
+        return page
 
-    # --- Jalur 1: Logika 'ALL' (Tanpa VSM) ---
-    if special_intent == 'ALL':
-        df_unique_places = DF_METADATA.drop_duplicates(subset='Nama_Tempat').copy()
-        
-        if region_filter:
-            df_unique_places = df_unique_places[df_unique_places['Lokasi'].str.lower().str.contains(region_filter, na=False)]
-        
-        df_unique_places = df_unique_places.sort_values(by='Avg_Rating', ascending=False)
-        
-        final_recommendations = []
-        for _, row in df_unique_places.iterrows():
-            
-            photo_url = row.get('Photo_URL') 
-            if not photo_url or pd.isna(photo_url): # pd.isna() aman di sini
-                photo_url = f"https://placehold.co/400x200/556B2F/FFFFFF?text={urllib.parse.quote(str(row['Nama_Tempat']))}&font=poppins"
-
-            gmaps_link = row.get('Gmaps_Link')
-            if not gmaps_link or pd.isna(gmaps_link):
-                gmaps_link = f"https://www.google.com/maps/search/?api=1&query={urllib.parse.quote(str(row['Nama_Tempat']) + ' ' + str(row['Lokasi']))}"
-
-            facilities = row.get('Facilities')
-            if pd.isna(facilities) or not isinstance(facilities, str):
-                facilities = "" # Fallback ke string kosong 
-
-            price_items = row.get('Price_Items')
-            if not isinstance(price_items, list): # Cek jika bukan list
-                price_items = []
-
-            final_recommendations.append({
-                'name': row['Nama_Tempat'],
-                'location': row['Lokasi'],
-                'avg_rating': row['Avg_Rating'],
-                'top_vsm_score': 0.0,
-                'photo_url': photo_url,
-                'gmaps_link': gmaps_link,
-                'price_items': price_items, 
-                'facilities': facilities,
-                'waktu_buka': row.get('Waktu_Buka', 'Info tidak tersedia')
-            })
-        return final_recommendations
+    depth = None if limit is None else offset + max(int(limit), 0)
+    place_ids, place_scores, total = _cached_ranking(query_tokens, special_intent, region_filter, fusion, depth)
+    end = len(place_ids) if depth is None else min(depth, len(place_ids))
+    with instrumentation.span('result_cards'):
+        page['results'] = [
+            PLACE_TABLE.result_card(place_id, score)
+            for place_id, score in zip(place_ids[offset:end].tolist(), place_scores[offset:end].tolist())
+        ]
+    page['total'] = total
+    page['has_more'] = offset + len(page['results']) < total
+    return page
 
-    # --- Jalur 2: Logika VSM (Jika bukan 'ALL') ---
-    ranked_results_by_doc = _calculate_vsm_scores(query_tokens, 'tfidf')
-    if not ranked_results_by_doc: return []
+def iter_search_results(query_tokens, special_intent, region_filter, fusion=DEFAULT_FUSION, page_size=DEFAULT_PAGE_SIZE):
+    """Generator kartu hasil, diambil halaman demi halaman (lazy) lewat search_page."""
+    offset = 0
+    while True:
+        page = search_page(query_tokens, special_intent, region_filter, offset, page_size, fusion)
+        yield from page['results']
+        if not page['has_more'] or not page['results']:
+            return
+        offset += page_size
 
-    final_recommendations, unique_names = [], set()
-    for doc_id, vsm_score in ranked_results_by_doc:
-        try:
-            meta = DF_METADATA.loc[doc_id] 
-        except KeyError: continue 
+def _cached_ranking(query_tokens, special_intent, region_filter, fusion, depth):
+    """
+    Peringkat dari cache jika cukup dalam untuk 'depth' (None = semua);
+    jika tidak, dihitung ulang 2x lebih dalam agar halaman berikutnya
+    tidak perlu menghitung lagi.
+    """
+    cache_key = (tuple(query_tokens), special_intent, region_filter, fusion)
+    found, cached = RESULT_CACHE.get(cache_key, ASSET_VERSION)
+    if found:
+        place_ids, _, total = cached
+        if len(place_ids) == total or (depth is not None and len(place_ids) >= depth):
+            return cached
+    fetch_depth = None if depth is None else max(depth, 2 * len(cached[0]) if found else depth)
+    with instrumentation.span('rank_places'):
+        ranking = _rank_places(query_tokens, special_intent, region_filter, fusion, fetch_depth)
+    RESULT_CACHE.put(cache_key, ranking, ASSET_VERSION)
+    return ranking
 
-        if region_filter and region_filter not in meta['Lokasi'].lower(): continue
+def _rank_places(query_tokens, special_intent, region_filter, fusion=DEFAULT_FUSION, depth=None):
+    """
+    Peringkat tempat tanpa kartu (isi dari search_by_keyword lama).
+    Mengembalikan (Place_ID int32, skor float64, total) maksimal 'depth' tempat.
+    """
+    # --- Jalur 1: Logika 'ALL' (Tanpa VSM) ---
+    # Listing urut Avg_Rating sudah dimaterialisasi saat build (PlaceTable.build_listings)
+    if special_intent == 'ALL':
+        listing = PLACE_TABLE.listing(region_filter)
+        return listing[:depth], np.zeros(len(listing[:depth])), len(listing)
 
-        name = meta['Nama_Tempat']
-        if name not in unique_names:
-            unique_names.add(name)
-            
-            photo_url = meta.get('Photo_URL') 
-            if not photo_url or pd.isna(photo_url):
-                photo_url = f"https://placehold.co/400x200/556B2F/FFFFFF?text={urllib.parse.quote(str(name))}&font=poppins"
+    # --- Jalur 2: Logika VSM (Jika bukan 'ALL') ---
+    # Filter region dipangkas sebelum skoring: hanya postings region itu yang dihitung
+    with instrumentation.span('vsm_scores'):
+        ranked_results_by_doc = _calculate_vsm_scores(query_tokens, 'tfidf', region=region_filter)
+    if not ranked_results_by_doc:
+        return np.zeros(0, dtype=np.int32), np.zeros(0), 0
 
-            gmaps_link = meta.get('Gmaps_Link')
-            if not gmaps_link or pd.isna(gmaps_link):
-                gmaps_link = f"https://www.google.com/maps/search/?api=1&query={urllib.parse.quote(str(name) + ' ' + str(meta['Lokasi']))}"
+    # Skor ulasan -> skor tempat (operasi grup NumPy, biaya sebanding jumlah tempat)
+    n_hits = len(ranked_results_by_doc)
+    doc_ids = np.fromiter((doc_id for doc_id, _ in ranked_results_by_doc), dtype=np.int64, count=n_hits)
+    scores = np.fromiter((score for _, score in ranked_results_by_doc), dtype=np.float64, count=n_hits)
 
-            facilities = meta.get('Facilities')
-            if pd.isna(facilities) or not isinstance(facilities, str):
-                facilities = "" # Fallback ke string kosong
+    # RATING_TOP/RATING_BOTTOM: saring listing rating yang sudah terurut, tanpa sort per query
+    if special_intent in ('RATING_TOP', 'RATING_BOTTOM'):
+        place_ids, place_scores, total = PLACE_TABLE.aggregate(doc_ids, scores, fusion)
+        score_of = np.zeros(len(PLACE_TABLE))
+        score_of[place_ids] = place_scores
+        ordered = PLACE_TABLE.rank_by_rating(place_ids, region_filter, special_intent == 'RATING_BOTTOM', depth)
+        return ordered, score_of[ordered], total
 
-            price_items = meta.get('Price_Items')
-            if not isinstance(price_items, list): # Cek jika bukan list
-                price_items = []
-            
-            final_recommendations.append({
-                'name': name,
-                'location': meta['Lokasi'],
-                'avg_rating': meta['Avg_Rating'],
-                'top_vsm_score': vsm_score,
-                'photo_url': photo_url,
-                'gmaps_link': gmaps_link,
-                'price_items': price_items, 
-                'facilities': facilities,
-                'waktu_buka': meta.get('Waktu_Buka', 'Info tidak tersedia')
-            })
-
-    if special_intent == 'RATING_TOP':
-        final_recommendations.sort(key=lambda x: x['avg_rating'], reverse=True)
-    elif special_intent == 'RATING_BOTTOM':
-        final_recommendations.sort(key=lambda x: x['avg_rating'], reverse=False)
-
-    return final_recommendations
\ No newline at end of file
+    # Urutan relevansi: top-k parsial sedalam 'depth'
+    return PLACE_TABLE.aggregate(doc_ids, scores, fusion, limit=depth)
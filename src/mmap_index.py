@@ -0,0 +1,395 @@
+import json
+import math
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+import numpy as np
+from .vsm_structures import Postings, WEIGHTING_SCHEMES, BM25_K1, BM25_B, compute_posting_weights
+from .bitmap_postings import DocBitmap
+from .places import PlaceTable, slim_metadata
+
+# ======================================================================
+# 1. SPESIFIKASI FORMAT 'index.bin' (little-endian)
+# ======================================================================
+# Header  : MAGIC(8s) | VERSION(I) | N_DOCS(I) | N_TERMS(I) | N_SECTIONS(I)
+# Direktori: N_SECTIONS x [NAMA(16s) | OFFSET(Q) | NBYTES(Q)]
+# Setiap section diratakan (align) ke 8 byte agar bisa langsung dibaca
+# sebagai array NumPy tanpa copy (np.frombuffer di atas mmap).
+#
+# Section:
+#   terms_blob   -> semua term (UTF-8) disambung, terurut leksikografis
+#   terms_off    -> uint64[N_TERMS+1], offset tiap term di terms_blob
+#   post_ptr     -> uint64[N_TERMS+1], rentang postings tiap term (gaya CSR)
+#   post_docs    -> int32[NNZ], Doc_ID semua postings
+#   post_tfs     -> int32[NNZ], raw TF semua postings
+#   idf          -> float64[N_TERMS]
+#   meta_docs    -> int32[N_DOCS], Doc_ID terurut
+#   meta_off     -> uint64[N_DOCS+1], offset record metadata di meta_blob
+#   meta_blob    -> record metadata per dokumen (JSON UTF-8)
+#   w_<skema>    -> float64[NNZ], bobot W_d tiap posting per skema pembobotan
+#                   (tfidf, sublinear, bm25; lihat vsm_structures.WEIGHTING_SCHEMES)
+#   norm_<skema> -> float64[N_DOCS], panjang vektor dokumen |d| per skema
+#   maxw_<skema> -> float64[N_TERMS], W_d maksimum per term (skor batas-atas)
+#   term_maxtf   -> int32[N_TERMS], TF maksimum per term
+#   doc_len      -> int32[N_DOCS], jumlah token per dokumen (BM25)
+#   bm25         -> parameter BM25 {k1, b, avgdl, n_docs} (JSON UTF-8)
+#   meta_place   -> int32[N_DOCS], Place_ID tiap dokumen (-1 = tanpa tempat)
+#   place_off    -> uint64[N_PLACES+1], offset kartu tempat di place_blob
+#   place_blob   -> kartu hasil per tempat (JSON UTF-8), lihat src/places.py
+#   place_lists  -> (opsional) listing tempat urut Avg_Rating, global & per
+#                   kode region (JSON UTF-8); tidak ada -> dihitung saat load
+#   place_regions -> (opsional) kode region per tempat, level terhalus dulu
+#                   (JSON UTF-8); dasar partisi Doc_ID per region
+#
+# Riwayat versi:
+#   1 -> kamus, postings, IDF, metadata
+#   2 -> + bobot & norma dokumen per skema (untuk cosine similarity)
+#   3 -> + TF maksimum per term (untuk top-k MaxScore)
+#   4 -> + tabel tempat; record metadata hanya berisi kolom per ulasan
+#   5 -> + skema bm25 & panjang dokumen, W_d maksimum per term per skema
+MAGIC = b'STKIIDX\x00'
+FORMAT_VERSION = 5
+INDEX_FILENAME = 'index.bin'
+
+_HEADER = struct.Struct('<8sIIII')
+_SECTION = struct.Struct('<16sQQ')
+_ALIGN = 8
+
+def _pad(nbytes):
+    return (-nbytes) % _ALIGN
+
+def _json_default(value):
+    """Konversi tipe NumPy/pandas ke tipe JSON standar."""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Tipe {type(value)} tidak bisa disimpan ke JSON")
+
+def _clean_record(record):
+    """NaN tidak valid di JSON; ganti dengan None."""
+    return {
+        key: (None if isinstance(value, float) and math.isnan(value) else value)
+        for key, value in record.items()
+    }
+
+# ======================================================================
+# 2. WRITER (Dipanggil oleh build_index.py)
+# ======================================================================
+def _encode_json_records(records):
+    encoded = [
+        json.dumps(_clean_record(record), ensure_ascii=False, default=_json_default).encode('utf-8')
+        for record in records
+    ]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(m) for m in encoded], dtype=np.uint64)
+    return encoded, offsets
+
+def write_index(path, idf_scores, vsm_index, df_metadata, places=None):
+    """
+    Menulis indeks VSM + metadata ke satu file biner berversi.
+    vsm_index   : dict(term -> Postings)
+    df_metadata : DataFrame dengan index Doc_ID
+    places      : PlaceTable; jika None dibangun dari df_metadata
+                  (yang harus masih memuat kolom per-tempat)
+    """
+    if places is None:
+        places = PlaceTable.from_metadata(df_metadata)
+    terms = sorted(vsm_index.keys())
+    encoded_terms = [term.encode('utf-8') for term in terms]
+    terms_off = np.zeros(len(terms) + 1, dtype=np.uint64)
+    terms_off[1:] = np.cumsum([len(t) for t in encoded_terms], dtype=np.uint64)
+
+    post_ptr = np.zeros(len(terms) + 1, dtype=np.uint64)
+    post_ptr[1:] = np.cumsum([len(vsm_index[t]) for t in terms], dtype=np.uint64)
+    post_docs = np.concatenate([vsm_index[t].doc_ids for t in terms] or [[]]).astype(np.int32)
+    post_tfs = np.concatenate([vsm_index[t].tfs for t in terms] or [[]]).astype(np.int32)
+    idf = np.array([idf_scores.get(t, 0.0) for t in terms], dtype=np.float64)
+    term_maxtf = np.array([vsm_index[t].max_tf for t in terms], dtype=np.int32)
+
+    df_sorted = slim_metadata(df_metadata).sort_index()
+    meta_docs = df_sorted.index.to_numpy(dtype=np.int32)
+    encoded_meta, meta_off = _encode_json_records(df_sorted.to_dict('records'))
+    meta_place = places.place_ids(meta_docs)
+    encoded_places, place_off = _encode_json_records(places.cards)
+
+    # Bobot per posting, norma dokumen & bobot maksimum per term, dihitung sekali per skema
+    computed = compute_posting_weights(post_ptr, post_docs, post_tfs, idf, meta_docs)
+    weight_sections = [
+        ('doc_len', computed['doc_lens'].astype(np.int32).tobytes()),
+        ('bm25', json.dumps({'k1': BM25_K1, 'b': BM25_B, 'avgdl': computed['avgdl'],
+                             'n_docs': computed['n_docs']}).encode('utf-8')),
+    ]
+    for scheme in WEIGHTING_SCHEMES:
+        weight_sections.append((f'w_{scheme}', computed['weights'][scheme].astype(np.float64).tobytes()))
+        weight_sections.append((f'norm_{scheme}', computed['norms'][scheme].astype(np.float64).tobytes()))
+        weight_sections.append((f'maxw_{scheme}', computed['max_weights'][scheme].astype(np.float64).tobytes()))
+
+    sections = [
+        ('terms_blob', b''.join(encoded_terms)),
+        ('terms_off', terms_off.tobytes()),
+        ('post_ptr', post_ptr.tobytes()),
+        ('post_docs', post_docs.tobytes()),
+        ('post_tfs', post_tfs.tobytes()),
+        ('idf', idf.tobytes()),
+        ('term_maxtf', term_maxtf.tobytes()),
+        ('meta_docs', meta_docs.tobytes()),
+        ('meta_off', meta_off.tobytes()),
+        ('meta_blob', b''.join(encoded_meta)),
+        ('meta_place', meta_place.tobytes()),
+        ('place_off', place_off.tobytes()),
+        ('place_blob', b''.join(encoded_places)),
+    ] + weight_sections
+    listings = places.listings_state()
+    if listings is not None:
+        sections.append(('place_lists', json.dumps(listings).encode('utf-8')))
+    if places.place_regions is not None:
+        sections.append(('place_regions', json.dumps(places.place_regions).encode('utf-8')))
+
+    # Hitung offset tiap section setelah header + direktori
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    offset += _pad(offset)
+    directory = []
+    for name, payload in sections:
+        directory.append((name, offset, len(payload)))
+        offset += len(payload) + _pad(len(payload))
+
+    # Tulis ke file sementara lalu rename (atomik): pembaca lama yang
+    # sedang mmap file lama tidak ikut rusak.
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(meta_docs), len(terms), len(sections)))
+        for name, sec_offset, nbytes in directory:
+            f.write(_SECTION.pack(name.encode('ascii'), sec_offset, nbytes))
+        for (name, sec_offset, nbytes), (_, payload) in zip(directory, sections):
+            f.write(b'\x00' * (sec_offset - f.tell()))
+            f.write(payload)
+    os.replace(tmp_path, path)
+
+# ======================================================================
+# 3. READER (mmap, lazy)
+# ======================================================================
+class MappedIndex:
+    """
+    Membuka 'index.bin' dengan mmap. Saat dibuka hanya header yang dibaca;
+    array postings/IDF/metadata adalah view NumPy di atas mmap sehingga
+    halaman baru dimuat saat disentuh, dan dipakai bersama antar-proses
+    lewat page cache OS.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+        magic, version, n_docs, n_terms, n_sections = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"'{path}' bukan file indeks STKI (magic salah).")
+        if version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Versi indeks {version} tidak didukung (butuh {FORMAT_VERSION}). Jalankan ulang build_index.py.")
+
+        self.version = version
+        self.n_docs = n_docs
+        self.n_terms = n_terms
+        self._sections = {}
+        for i in range(n_sections):
+            raw_name, offset, nbytes = _SECTION.unpack_from(self._mm, _HEADER.size + i * _SECTION.size)
+            self._sections[raw_name.rstrip(b'\x00').decode('ascii')] = (offset, nbytes)
+
+        self._terms_off = self._array('terms_off', np.uint64)
+        self._post_ptr = self._array('post_ptr', np.uint64)
+        self._post_docs = self._array('post_docs', np.int32)
+        self._post_tfs = self._array('post_tfs', np.int32)
+        self._idf = self._array('idf', np.float64)
+        self._term_maxtf = self._array('term_maxtf', np.int32)
+        self._meta_docs = self._array('meta_docs', np.int32)
+        self._meta_off = self._array('meta_off', np.uint64)
+        self._terms_base = self._sections['terms_blob'][0]
+        self._meta_base = self._sections['meta_blob'][0]
+        self._place_table = None
+
+    def _array(self, name, dtype):
+        offset, nbytes = self._sections[name]
+        return np.frombuffer(self._mm, dtype=dtype, count=nbytes // np.dtype(dtype).itemsize, offset=offset)
+
+    def close(self):
+        # View NumPy yang masih hidup menahan buffer; biarkan GC yang menutup mmap.
+        try:
+            self._mm.close()
+        except (BufferError, AttributeError):
+            pass
+        self._file.close()
+
+    # --- Kamus term (pencarian biner, decode on-demand) ---
+    def _term_at(self, i):
+        start = self._terms_base + int(self._terms_off[i])
+        end = self._terms_base + int(self._terms_off[i + 1])
+        return self._mm[start:end].decode('utf-8')
+
+    def term_id(self, term):
+        """Mengembalikan posisi term di kamus, atau -1 jika tidak ada."""
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term_at(mid) < term:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n_terms and self._term_at(lo) == term:
+            return lo
+        return -1
+
+    def terms(self):
+        for i in range(self.n_terms):
+            yield self._term_at(i)
+
+    # --- Postings & IDF ---
+    def postings_at(self, term_id):
+        start, end = int(self._post_ptr[term_id]), int(self._post_ptr[term_id + 1])
+        return Postings(self._post_docs[start:end], self._post_tfs[start:end], int(self._term_maxtf[term_id]))
+
+    def idf_at(self, term_id):
+        return float(self._idf[term_id])
+
+    # --- Array mentah (untuk mesin sparse/vektorisasi) ---
+    def csr_arrays(self):
+        """(post_ptr, post_docs, post_tfs, idf) sebagai view tanpa copy."""
+        return self._post_ptr, self._post_docs, self._post_tfs, self._idf
+
+    def weights(self, weighting_scheme):
+        """Bobot W_d per posting (sejajar post_docs) untuk skema tertentu."""
+        return self._array(f'w_{weighting_scheme}', np.float64)
+
+    def doc_norms(self, weighting_scheme):
+        """Norma |d| per dokumen (sejajar meta_docs) untuk skema tertentu."""
+        return self._array(f'norm_{weighting_scheme}', np.float64)
+
+    def max_weights(self, weighting_scheme):
+        """W_d maksimum per term (sejajar kamus term) untuk skema tertentu."""
+        return self._array(f'maxw_{weighting_scheme}', np.float64)
+
+    def doc_lengths(self):
+        """Jumlah token per dokumen (sejajar meta_docs)."""
+        return self._array('doc_len', np.int32)
+
+    def bm25_params(self):
+        """Parameter BM25 saat build: {'k1', 'b', 'avgdl', 'n_docs'}."""
+        return self._json_section('bm25')
+
+    # --- Metadata dokumen ---
+    def doc_metadata(self, doc_id):
+        """Mengembalikan dict metadata untuk satu Doc_ID (KeyError jika tidak ada)."""
+        pos = int(np.searchsorted(self._meta_docs, doc_id))
+        if pos >= self.n_docs or self._meta_docs[pos] != doc_id:
+            raise KeyError(doc_id)
+        start = self._meta_base + int(self._meta_off[pos])
+        end = self._meta_base + int(self._meta_off[pos + 1])
+        return json.loads(self._mm[start:end].decode('utf-8'))
+
+    def doc_ids(self):
+        return self._meta_docs.tolist()
+
+    def place_table(self):
+        """PlaceTable (kartu hasil + Doc_ID -> Place_ID), dibaca sekali lalu di-cache."""
+        if self._place_table is None:
+            place_off = self._array('place_off', np.uint64)
+            base = self._sections['place_blob'][0]
+            cards = [
+                json.loads(self._mm[base + int(start):base + int(end)].decode('utf-8'))
+                for start, end in zip(place_off[:-1], place_off[1:])
+            ]
+            self._place_table = PlaceTable(cards, self._meta_docs, self._array('meta_place', np.int32),
+                                           self._json_section('place_lists'), self._json_section('place_regions'))
+        return self._place_table
+
+    def doc_id_array(self):
+        return self._meta_docs
+
+    def _json_section(self, name):
+        """Isi section JSON opsional, atau None jika tidak ada (file versi lama)."""
+        if name not in self._sections:
+            return None
+        offset, nbytes = self._sections[name]
+        return json.loads(self._mm[offset:offset + nbytes].decode('utf-8'))
+
+# ======================================================================
+# 4. ADAPTER DICT-LIKE (agar mesin_pencari/boolean_ir tidak perlu berubah)
+# ======================================================================
+class _TermMapping(Mapping):
+    def __init__(self, index):
+        self._index = index
+
+    @property
+    def mapped_index(self):
+        return self._index
+
+    def __len__(self):
+        return self._index.n_terms
+
+    def __iter__(self):
+        return self._index.terms()
+
+    def __contains__(self, term):
+        return isinstance(term, str) and self._index.term_id(term) >= 0
+
+    def __getitem__(self, term):
+        term_id = self._index.term_id(term) if isinstance(term, str) else -1
+        if term_id < 0:
+            raise KeyError(term)
+        return self._value(term_id)
+
+class MappedIdf(_TermMapping):
+    """dict(term -> idf) di atas MappedIndex."""
+    def _value(self, term_id):
+        return self._index.idf_at(term_id)
+
+class MappedPostings(_TermMapping):
+    """dict(term -> Postings) di atas MappedIndex (view tanpa copy)."""
+    def _value(self, term_id):
+        return self._index.postings_at(term_id)
+
+class MappedBooleanIndex(_TermMapping):
+    """dict(term -> DocBitmap) di atas MappedIndex, untuk boolean_ir."""
+    def _value(self, term_id):
+        return DocBitmap.from_sorted(self._index.postings_at(term_id).doc_ids)
+
+class _MetadataLocator:
+    def __init__(self, index):
+        self._index = index
+
+    def __getitem__(self, doc_id):
+        return self._index.doc_metadata(int(doc_id))
+
+class MappedMetadata:
+    """
+    Pengganti ringan DF_METADATA: 'meta.loc[doc_id]' mengembalikan dict
+    yang dibaca langsung dari mmap. DataFrame utuh hanya dibangun (sekali)
+    jika benar-benar diminta lewat to_dataframe().
+    """
+    def __init__(self, index):
+        self._index = index
+        self.loc = _MetadataLocator(index)
+        self._frame = None
+
+    def __len__(self):
+        return self._index.n_docs
+
+    def to_dataframe(self):
+        if self._frame is None:
+            import pandas as pd
+            doc_ids = self._index.doc_ids()
+            records = [self._index.doc_metadata(doc_id) for doc_id in doc_ids]
+            self._frame = pd.DataFrame(records, index=pd.Index(doc_ids, name='Doc_ID'))
+        return self._frame
+
+def open_index(assets_dir):
+    """Membuka Assets/index.bin jika ada; mengembalikan MappedIndex atau None."""
+    path = os.path.join(assets_dir, INDEX_FILENAME)
+    if not os.path.exists(path):
+        return None
+    return MappedIndex(path)
@@ -0,0 +1,72 @@
+import re
+import string
+
+# ======================================================================
+# TRIE BERBASIS TOKEN UNTUK DETEKSI REGION & INTENT
+# ======================================================================
+# Kamus (misal REGION_MAP) dikompilasi SEKALI menjadi trie per token:
+#   "kabupaten semarang" -> ('kabupaten', 'semarang')
+# Pencocokan hanya terjadi pada batas token, jadi kode pendek seperti
+# 'yk' atau 'diy' tidak lagi cocok di tengah kata lain. Satu kali scan
+# menghasilkan kecocokan terpanjang beserta span karakternya.
+_TOKEN_REGEX = re.compile(r'\S+')
+_EDGE_PUNCTUATION = string.punctuation
+
+def _normalize_token(token):
+    """Token untuk pencocokan: huruf kecil, tanda baca di ujung dibuang ('kab.' -> 'kab')."""
+    return token.lower().strip(_EDGE_PUNCTUATION)
+
+class PhraseTrie:
+    """Trie token -> nilai kamus (misal kode region / intent)."""
+    _VALUE = object() # Penanda node akhir frasa
+
+    def __init__(self, phrase_map=None):
+        self._root = {}
+        self.size = 0
+        for phrase, value in (phrase_map or {}).items():
+            self.add(phrase, value)
+
+    def add(self, phrase, value):
+        keys = [_normalize_token(token) for token in str(phrase).split()]
+        keys = [key for key in keys if key]
+        if not keys:
+            return
+        node = self._root
+        for key in keys:
+            node = node.setdefault(key, {})
+        if self._VALUE not in node: # Frasa duplikat: entri pertama yang menang
+            node[self._VALUE] = value
+            self.size += 1
+
+    def find_longest(self, text):
+        """
+        Mencari frasa terpanjang (jumlah karakter) di 'text' dalam satu scan.
+        Jika sama panjang, yang paling kiri menang.
+        Mengembalikan (start, end, value) atau None.
+        """
+        tokens = [(m.start(), m.end(), _normalize_token(m.group(0))) for m in _TOKEN_REGEX.finditer(text)]
+        best = None
+        for i in range(len(tokens)):
+            node = self._root
+            for j in range(i, len(tokens)):
+                node = node.get(tokens[j][2])
+                if node is None:
+                    break
+                if self._VALUE in node:
+                    start, end = tokens[i][0], tokens[j][1]
+                    if best is None or end - start > best[1] - best[0]:
+                        best = (start, end, node[self._VALUE])
+        return best
+
+    def extract(self, text):
+        """
+        Mendeteksi frasa terpanjang lalu membuangnya dari teks (berdasarkan span).
+        Mengembalikan (teks tanpa frasa, dinormalisasi spasi & huruf kecil; nilai atau None).
+        """
+        text_lower = text.lower()
+        match = self.find_longest(text_lower)
+        value = None
+        if match is not None:
+            start, end, value = match
+            text_lower = text_lower[:start] + ' ' + text_lower[end:]
+        return " ".join(text_lower.split()), value
@@ -0,0 +1,381 @@
+import math
+import urllib.parse
+import numpy as np
+
+# ======================================================================
+# TABEL TEMPAT (PLACE TABLE) & KARTU HASIL SIAP PAKAI
+# ======================================================================
+# Metadata dipisah saat build:
+#   - per ulasan (df_metadata)  : Nama_Tempat, Lokasi, Rating, Avg_Rating
+#   - per tempat (PlaceTable)   : kartu hasil (foto, link, harga, fasilitas,
+#                                 jam buka) yang sudah lengkap dengan fallback
+# ditambah array int Doc_ID -> Place_ID. Merakit hasil pencarian cukup
+# lookup array + salin dict, tanpa DataFrame/pd.isna/URL-encode per hit.
+#
+# Daftar tempat urut Avg_Rating (intent 'ALL', RATING_TOP/RATING_BOTTOM)
+# juga dimaterialisasi saat build: satu untuk semua tempat + satu per kode
+# region (Kamus/config_region_map.csv), jadi query "jelajah" cukup slice.
+#
+# Partisi region: tiap tempat diberi kode region dari hierarki kamus
+# (Kabupaten/Kota -> Provinsi), tiap Doc_ID mewarisi Region_ID tempatnya.
+# Per kode region disimpan rentang Doc_ID, jadi query ber-region cukup
+# memotong postings (binary search) sebelum skoring.
+DOC_COLUMNS = ['Nama_Tempat', 'Lokasi', 'Rating', 'Avg_Rating']
+PLACE_COLUMNS = ['Photo_URL', 'Gmaps_Link', 'Waktu_Buka', 'Price_Items', 'Facilities']
+NO_PLACE = -1 # Doc_ID tanpa Nama_Tempat
+NO_REGION = -1 # Tempat/Doc_ID tanpa region yang dikenal kamus
+
+# Fusi skor ulasan -> skor tempat (lihat fuse_place_scores)
+FUSION_METHODS = ('max', 'sum', 'mean_top_n', 'rating_blend')
+DEFAULT_FUSION = 'max' # Sama seperti perilaku lama: peringkat = ulasan terbaik
+DEFAULT_TOP_N = 3 # Jumlah ulasan teratas untuk 'mean_top_n'
+DEFAULT_RATING_WEIGHT = 0.3 # Porsi Avg_Rating (skala 0-1) untuk 'rating_blend'
+MAX_RATING = 5.0
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+def make_card(name, location, avg_rating, info):
+    """
+    Kartu hasil satu tempat (format yang dipakai streamlit_app & search.py),
+    dengan fallback yang sama seperti search_by_keyword versi lama.
+    'info' : dict kolom PLACE_COLUMNS (boleh tidak lengkap).
+    """
+    photo_url = info.get('Photo_URL')
+    if not photo_url or _is_missing(photo_url):
+        photo_url = f"https://placehold.co/400x200/556B2F/FFFFFF?text={urllib.parse.quote(str(name))}&font=poppins"
+
+    gmaps_link = info.get('Gmaps_Link')
+    if not gmaps_link or _is_missing(gmaps_link):
+        gmaps_link = f"https://www.google.com/maps/search/?api=1&query={urllib.parse.quote(str(name) + ' ' + str(location))}"
+
+    facilities = info.get('Facilities')
+    if _is_missing(facilities) or not isinstance(facilities, str):
+        facilities = "" # Fallback ke string kosong
+
+    price_items = info.get('Price_Items')
+    if not isinstance(price_items, list): # Cek jika bukan list
+        price_items = []
+
+    waktu_buka = info.get('Waktu_Buka', 'Info tidak tersedia')
+    if _is_missing(waktu_buka):
+        waktu_buka = 'Info tidak tersedia'
+
+    return {
+        'name': name,
+        'location': location,
+        'avg_rating': None if _is_missing(avg_rating) else float(avg_rating),
+        'top_vsm_score': 0.0,
+        'photo_url': photo_url,
+        'gmaps_link': gmaps_link,
+        'price_items': price_items,
+        'facilities': facilities,
+        'waktu_buka': waktu_buka,
+    }
+
+def fuse_place_scores(place_ids, scores, n_places, fusion=DEFAULT_FUSION, top_n=DEFAULT_TOP_N,
+                      ratings=None, rating_weight=DEFAULT_RATING_WEIGHT, limit=None):
+    """
+    Mereduksi skor per ulasan menjadi skor per tempat dengan operasi grup
+    NumPy (tanpa loop dedup per hit). 'place_ids' & 'scores' sejajar, urut
+    skor menurun seperti hasil _calculate_vsm_scores; Place_ID < 0 diabaikan.
+
+    fusion:
+      'max'          -> skor ulasan terbaik
+      'sum'          -> jumlah skor semua ulasan
+      'mean_top_n'   -> rata-rata 'top_n' skor ulasan teratas
+      'rating_blend' -> (1 - w) x (max / max tertinggi) + w x (Avg_Rating / 5)
+
+    Mengembalikan (Place_ID, skor, total) terurut menurun; seri -> tempat
+    yang hit pertamanya lebih awal (sama seperti dedup lama untuk 'max').
+    'limit' = hanya top-N tempat (seleksi parsial, bukan sort semua);
+    'total' tetap jumlah semua tempat yang punya hit.
+    """
+    if fusion not in FUSION_METHODS:
+        raise ValueError(f"Fusi '{fusion}' tidak dikenal. Pilihan: {', '.join(FUSION_METHODS)}")
+    place_ids = np.asarray(place_ids, dtype=np.int64)
+    scores = np.asarray(scores, dtype=np.float64)
+    positions = np.flatnonzero(place_ids >= 0)
+    place_ids, scores = place_ids[positions], scores[positions]
+    if len(place_ids) == 0:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float64), 0
+
+    first_hit = np.full(n_places, len(positions), dtype=np.int64)
+    np.minimum.at(first_hit, place_ids, np.arange(len(place_ids)))
+    candidates = np.flatnonzero(first_hit < len(positions))
+
+    if fusion == 'sum':
+        fused = np.bincount(place_ids, weights=scores, minlength=n_places)
+    elif fusion == 'mean_top_n':
+        # Kelompokkan per tempat (skor menurun di dalam grup), ambil peringkat < top_n
+        order = np.lexsort((-scores, place_ids))
+        grouped = place_ids[order]
+        starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+        rank_in_group = np.arange(len(grouped)) - np.repeat(starts, np.diff(np.r_[starts, len(grouped)]))
+        keep = order[rank_in_group < top_n]
+        totals = np.bincount(place_ids[keep], weights=scores[keep], minlength=n_places)
+        fused = totals / np.maximum(np.bincount(place_ids[keep], minlength=n_places), 1)
+    else: # 'max' & 'rating_blend'
+        fused = np.full(n_places, -np.inf)
+        np.maximum.at(fused, place_ids, scores)
+        if fusion == 'rating_blend':
+            best = fused[candidates].max()
+            relevance = fused / best if best > 0 else np.zeros(n_places)
+            rating = np.zeros(n_places) if ratings is None else np.asarray(ratings, dtype=np.float64) / MAX_RATING
+            fused = (1.0 - rating_weight) * relevance + rating_weight * rating
+
+    total = len(candidates)
+    if limit is not None and limit < total:
+        if limit <= 0:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float64), total
+        # Semua kandidat >= skor ke-limit (seri di batas tetap dipecah oleh hit pertama)
+        kth_score = -np.partition(-fused[candidates], limit - 1)[limit - 1]
+        candidates = candidates[fused[candidates] >= kth_score]
+    ranked = candidates[np.lexsort((first_hit[candidates], -fused[candidates]))][:limit]
+    return ranked.astype(np.int32), fused[ranked], total
+
+class PlaceTable:
+    """
+    cards      -> list kartu hasil, index = Place_ID
+    doc_ids    -> int32[N], Doc_ID terurut
+    doc_places -> int32[N], Place_ID tiap Doc_ID (NO_PLACE jika tanpa tempat)
+    listings   -> dict {'order': [...], 'regions': {kode: [...]}} hasil
+                  build_listings (opsional; None = dihitung saat dibutuhkan)
+    place_regions -> list kode region per tempat, level terhalus dulu
+                  (hasil assign_regions; None = belum ditetapkan)
+    """
+
+    def __init__(self, cards, doc_ids, doc_places, listings=None, place_regions=None):
+        self.cards = list(cards)
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        self.doc_places = np.asarray(doc_places, dtype=np.int32)
+        self.name_to_id = {card['name']: place_id for place_id, card in enumerate(self.cards)}
+        # Lookup padat Doc_ID -> Place_ID (Doc_ID berupa int kecil berurutan)
+        size = int(self.doc_ids.max()) + 1 if len(self.doc_ids) else 0
+        self._doc_to_place = np.full(size, NO_PLACE, dtype=np.int32)
+        self._doc_to_place[self.doc_ids] = self.doc_places
+        self.rating_order = None # int32[P], Place_ID urut Avg_Rating menurun
+        self.region_listings = {} # kode region -> int32, subset rating_order
+        self._ascending_listings = {} # region (None = semua) -> int32, urut Avg_Rating menaik
+        if listings is not None:
+            self.rating_order = np.asarray(listings['order'], dtype=np.int32)
+            self.region_listings = {
+                code: np.asarray(place_ids, dtype=np.int32) for code, place_ids in listings['regions'].items()
+            }
+        self.place_regions = None
+        self._index_regions(place_regions)
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __getstate__(self):
+        return (self.cards, self.doc_ids.tobytes(), self.doc_places.tobytes(), self.listings_state(),
+                self.place_regions)
+
+    def __setstate__(self, state):
+        cards, doc_ids, doc_places = state[:3]
+        # places.pkl lama: tanpa listing / region
+        listings = state[3] if len(state) > 3 else None
+        place_regions = state[4] if len(state) > 4 else None
+        self.__init__(cards, np.frombuffer(doc_ids, dtype=np.int32), np.frombuffer(doc_places, dtype=np.int32),
+                      listings, place_regions)
+
+    @classmethod
+    def from_metadata(cls, df_metadata):
+        """
+        Membangun tabel dari df_metadata (index Doc_ID). Kolom PLACE_COLUMNS
+        diambil dari baris pertama tiap tempat (nilainya sama untuk satu tempat).
+        """
+        df_sorted = df_metadata.sort_index()
+        cards, name_to_id, doc_places = [], {}, []
+        for record in df_sorted.to_dict('records'):
+            name = record.get('Nama_Tempat')
+            if _is_missing(name):
+                doc_places.append(NO_PLACE)
+                continue
+            place_id = name_to_id.get(name)
+            if place_id is None:
+                place_id = name_to_id[name] = len(cards)
+                cards.append(make_card(name, record.get('Lokasi'), record.get('Avg_Rating'), record))
+            doc_places.append(place_id)
+        return cls(cards, df_sorted.index.to_numpy(dtype=np.int32), doc_places)
+
+    @classmethod
+    def merge(cls, tables):
+        """
+        Menggabungkan tabel beberapa segmen (urut Doc_ID naik). Tempat dengan
+        nama sama disatukan; kartu dari segmen terbaru yang dipakai karena
+        Avg_Rating-nya dihitung dari semua ulasan sampai segmen itu.
+        """
+        cards, name_to_id, doc_ids, doc_places, place_regions = [], {}, [], [], []
+        has_regions = all(table.place_regions is not None for table in tables)
+        for table in tables:
+            remap = np.empty(len(table.cards) + 1, dtype=np.int32)
+            remap[-1] = NO_PLACE # index -1 -> NO_PLACE
+            for local_id, card in enumerate(table.cards):
+                regions = table.place_regions[local_id] if has_regions else ()
+                place_id = name_to_id.get(card['name'])
+                if place_id is None:
+                    place_id = name_to_id[card['name']] = len(cards)
+                    cards.append(card)
+                    place_regions.append(regions)
+                else:
+                    cards[place_id] = card
+                    place_regions[place_id] = regions
+                remap[local_id] = place_id
+            doc_ids.append(table.doc_ids)
+            doc_places.append(remap[table.doc_places])
+        if not doc_ids:
+            return cls([], [], [])
+        merged = cls(cards, np.concatenate(doc_ids), np.concatenate(doc_places),
+                     place_regions=place_regions if has_regions else None)
+        if has_regions: # Avg_Rating berubah antar segmen -> urutan dihitung ulang
+            merged.build_listings()
+        return merged
+
+    def place_ids(self, doc_ids):
+        """Vektorisasi: array Doc_ID -> array Place_ID (NO_PLACE jika tidak dikenal)."""
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        result = np.full(len(doc_ids), NO_PLACE, dtype=np.int32)
+        known = (doc_ids >= 0) & (doc_ids < len(self._doc_to_place))
+        result[known] = self._doc_to_place[doc_ids[known]]
+        return result
+
+    def place_of(self, doc_id):
+        doc_id = int(doc_id)
+        if 0 <= doc_id < len(self._doc_to_place):
+            return int(self._doc_to_place[doc_id])
+        return NO_PLACE
+
+    def result_card(self, place_id, score=0.0):
+        """Salinan kartu hasil (aman diubah pemanggil) dengan skor VSM."""
+        card = dict(self.cards[place_id])
+        card['top_vsm_score'] = score
+        card['price_items'] = [dict(item) if isinstance(item, dict) else item for item in card['price_items']]
+        return card
+
+    # --- Partisi region (hierarki Kamus/config_region_map.csv) ---
+    def assign_regions(self, classify_location):
+        """
+        Menetapkan kode region tiap tempat dari Lokasi (dipanggil saat build),
+        misal classify_location = preprocessing.classify_location, lalu
+        membangun ulang partisi Doc_ID & listing rating per region.
+        """
+        self._index_regions([classify_location(card['location']) for card in self.cards])
+        self.build_listings()
+
+    def _index_regions(self, place_regions):
+        self.region_codes = [] # index = Region_ID
+        self.doc_regions = None # int32[N], Region_ID level terhalus tiap Doc_ID (sejajar doc_ids)
+        self._region_places = {} # kode -> Place_ID yang termasuk region (semua level)
+        self._region_ranges = {} # kode -> (awal, akhir) rentang Doc_ID, dihitung saat dibutuhkan
+        if place_regions is None:
+            return
+        self.place_regions = [tuple(regions) for regions in place_regions]
+        self.region_codes = sorted({code for regions in self.place_regions for code in regions})
+        region_ids = {code: region_id for region_id, code in enumerate(self.region_codes)}
+        leaf_regions = np.array(
+            [region_ids[regions[0]] if regions else NO_REGION for regions in self.place_regions] + [NO_REGION],
+            dtype=np.int32,
+        ) # index -1 (NO_PLACE) -> NO_REGION
+        self.doc_regions = leaf_regions[self.doc_places]
+        for code in self.region_codes:
+            self._region_places[code] = np.array(
+                [place_id for place_id, regions in enumerate(self.place_regions) if code in regions], dtype=np.int32
+            )
+
+    def region_places(self, code):
+        """Place_ID dalam region 'code' (Provinsi mencakup semua Kabupaten/Kota di bawahnya)."""
+        return self._region_places.get(code, np.zeros(0, dtype=np.int32))
+
+    def region_doc_ranges(self, code):
+        """
+        Rentang Doc_ID [awal, akhir) yang seluruhnya milik region 'code'.
+        Doc_ID satu tempat umumnya berurutan, jadi jumlah rentang ~ jumlah tempat.
+        """
+        ranges = self._region_ranges.get(code)
+        if ranges is None:
+            in_region = np.isin(self.doc_places, self.region_places(code)).astype(np.int8)
+            edges = np.flatnonzero(np.diff(np.r_[0, in_region, 0]))
+            starts, ends = edges[0::2], edges[1::2]
+            ranges = self._region_ranges[code] = (
+                self.doc_ids[starts].astype(np.int64), self.doc_ids[ends - 1].astype(np.int64) + 1
+            )
+        return ranges
+
+    # --- Agregasi skor ulasan -> tempat ---
+    def ratings(self):
+        """float64[P], Avg_Rating tiap tempat (kosong -> 0.0)."""
+        return np.array([card['avg_rating'] or 0.0 for card in self.cards], dtype=np.float64)
+
+    def aggregate(self, doc_ids, scores, fusion=DEFAULT_FUSION, limit=None, **options):
+        """
+        Doc_ID + skor ulasan -> (Place_ID, skor tempat, total) terurut menurun,
+        lewat fuse_place_scores. 'limit' = hanya top-N tempat (top-k parsial).
+        """
+        ratings = self.ratings() if fusion == 'rating_blend' else None
+        return fuse_place_scores(self.place_ids(doc_ids), scores, len(self.cards), fusion,
+                                 ratings=ratings, limit=limit, **options)
+
+    # --- Listing tempat urut Avg_Rating (materialisasi saat build) ---
+    def build_listings(self):
+        """
+        Mengurutkan semua tempat berdasarkan Avg_Rating menurun (seri: Place_ID
+        kecil dulu, Avg_Rating kosong dianggap 0.0), lalu menyimpan subset
+        terurut untuk tiap kode region hasil assign_regions.
+        """
+        ratings = self.ratings()
+        self.rating_order = np.lexsort((np.arange(len(ratings)), -ratings)).astype(np.int32)
+        self.region_listings = {}
+        for code in self.region_codes:
+            in_region = np.isin(self.rating_order, self.region_places(code))
+            self.region_listings[code] = self.rating_order[in_region]
+        self._ascending_listings = {}
+
+    def listings_state(self):
+        """Listing dalam bentuk list biasa (untuk pickle & section JSON index.bin)."""
+        if self.rating_order is None:
+            return None
+        return {
+            'order': self.rating_order.tolist(),
+            'regions': {code: place_ids.tolist() for code, place_ids in self.region_listings.items()},
+        }
+
+    def listing(self, region=None, ascending=False):
+        """
+        Place_ID urut Avg_Rating menurun, atau menaik jika 'ascending' (semua
+        tempat atau satu region). Seri selalu Place_ID kecil dulu. Jangan diubah.
+        """
+        if self.rating_order is None:
+            self.build_listings()
+        if not ascending:
+            if not region:
+                return self.rating_order
+            return self.region_listings.get(region, self.rating_order[:0]) # Kode tak dikenal -> kosong
+        region = region or None
+        listing = self._ascending_listings.get(region)
+        if listing is None:
+            # Dibuat sekali saat pertama diminta (tidak disimpan di aset), lexsort yang sama
+            order = self._ascending_listings.get(None)
+            if order is None:
+                ratings = self.ratings()
+                order = self._ascending_listings[None] = np.lexsort((np.arange(len(ratings)), ratings)).astype(np.int32)
+            listing = order
+            if region is not None:
+                members = self.region_listings.get(region, self.rating_order[:0])
+                listing = self._ascending_listings[region] = order[np.isin(order, members)]
+        return listing
+
+    def rank_by_rating(self, place_ids, region=None, ascending=False, limit=None):
+        """
+        Mengurutkan sekumpulan Place_ID (misal hasil VSM) memakai listing yang
+        sudah terurut: cukup saring listing dengan mask, tanpa sort per query.
+        """
+        listing = self.listing(region, ascending)
+        selected = np.zeros(len(self.cards), dtype=bool)
+        selected[np.asarray(place_ids, dtype=np.int64)] = True
+        return listing[selected[listing]][:limit]
+
+def slim_metadata(df_metadata):
+    """df_metadata per ulasan tanpa kolom per-tempat (yang sudah ada di PlaceTable)."""
+    return df_metadata[[col for col in DOC_COLUMNS if col in df_metadata.columns]].copy()
@@ -0,0 +1,91 @@
+import numpy as np
+from .vsm_structures import WEIGHTING_SCHEMES, compute_posting_weights
+
+# ======================================================================
+# BOBOT POSTING PER SKEMA (IMPACT) UNTUK SKORING DOT PRODUCT
+# ======================================================================
+# W_d tiap posting untuk semua skema (tfidf, sublinear, bm25) sudah
+# dihitung build_index.py dan disimpan di index.bin, jadi skoring query
+# cukup perkalian-akumulasi W_q x W_d atas float tersimpan (tanpa log10
+# atau normalisasi panjang di loop dalam). Aset .pkl dan indeks bersegmen
+# (IDF & avgdl global baru diketahui saat load) dihitung sekali saat dimuat.
+
+def check_scheme(weighting_scheme):
+    if weighting_scheme not in WEIGHTING_SCHEMES:
+        raise ValueError(f"Skema pembobotan '{weighting_scheme}' tidak dikenal. Pilihan: {', '.join(WEIGHTING_SCHEMES)}")
+
+class PostingWeights:
+    """
+    Postings gaya CSR (post_ptr, post_docs) + bobot per skema yang sejajar.
+    Dipakai mesin_pencari (dot product, top-k MaxScore) dan SparseVSM (cosine).
+    """
+
+    def __init__(self, term_id_fn, idf, post_ptr, post_docs, doc_ids, weights_fn, norms_fn, max_weights_fn):
+        self.term_id = term_id_fn
+        self.idf = idf
+        self.post_ptr = post_ptr
+        self.post_docs = post_docs
+        self.doc_ids = doc_ids
+        self._weights_fn = weights_fn
+        self._norms_fn = norms_fn
+        self._max_weights_fn = max_weights_fn
+        self._weights = {}
+        self._max_weights = {}
+
+    @classmethod
+    def from_mapped(cls, mapped_index):
+        """View langsung ke bobot yang disimpan di index.bin (tanpa hitung ulang)."""
+        post_ptr, post_docs, _, idf = mapped_index.csr_arrays()
+        return cls(mapped_index.term_id, idf, post_ptr, post_docs, mapped_index.doc_id_array(),
+                   mapped_index.weights, mapped_index.doc_norms, mapped_index.max_weights)
+
+    @classmethod
+    def from_dicts(cls, idf_scores, vsm_index, n_docs=None):
+        """
+        Fallback untuk aset .pkl & indeks bersegmen: bobot dihitung sekali
+        dari dict(term -> Postings) dengan IDF global 'idf_scores'.
+        'n_docs' = jumlah dokumen korpus (BM25); default dokumen yang punya token.
+        """
+        terms = sorted(vsm_index.keys())
+        term_ids = {term: i for i, term in enumerate(terms)}
+        postings = [vsm_index[t] for t in terms]
+        idf = np.array([idf_scores.get(t, 0.0) for t in terms], dtype=np.float64)
+        post_ptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        post_ptr[1:] = np.cumsum([len(p) for p in postings])
+        post_docs = np.concatenate([p.doc_ids for p in postings] or [[]]).astype(np.int32)
+        post_tfs = np.concatenate([p.tfs for p in postings] or [[]]).astype(np.int32)
+        doc_ids = np.unique(post_docs)
+        computed = compute_posting_weights(post_ptr, post_docs, post_tfs, idf, doc_ids, n_docs)
+        return cls(lambda term: term_ids.get(term, -1), idf, post_ptr, post_docs, doc_ids,
+                   computed['weights'].__getitem__, computed['norms'].__getitem__,
+                   computed['max_weights'].__getitem__)
+
+    def weights(self, weighting_scheme):
+        """W_d semua posting (sejajar post_docs) untuk satu skema."""
+        if weighting_scheme not in self._weights:
+            check_scheme(weighting_scheme)
+            self._weights[weighting_scheme] = self._weights_fn(weighting_scheme)
+        return self._weights[weighting_scheme]
+
+    def doc_norms(self, weighting_scheme):
+        """Norma |d| per dokumen (sejajar doc_ids) untuk satu skema."""
+        check_scheme(weighting_scheme)
+        return self._norms_fn(weighting_scheme)
+
+    def _term_max_weights(self, weighting_scheme):
+        if weighting_scheme not in self._max_weights:
+            check_scheme(weighting_scheme)
+            self._max_weights[weighting_scheme] = self._max_weights_fn(weighting_scheme)
+        return self._max_weights[weighting_scheme]
+
+    def term_postings(self, term, weighting_scheme='tfidf'):
+        """
+        (doc_ids, W_d, W_d maksimum, idf) untuk satu term, berupa view
+        array tanpa copy; None jika term tidak ada.
+        """
+        term_id = self.term_id(term)
+        if term_id < 0:
+            return None
+        start, end = int(self.post_ptr[term_id]), int(self.post_ptr[term_id + 1])
+        return (self.post_docs[start:end], self.weights(weighting_scheme)[start:end],
+                float(self._term_max_weights(weighting_scheme)[term_id]), float(self.idf[term_id]))
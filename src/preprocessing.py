@@ -1,47 +1,288 @@
 import re
 import os
+import hashlib
+import pickle
+import tempfile
+import threading
+import time
 from . import utils
-from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
-from nltk.corpus import stopwords
+from .stem_cache import StemCache, STEM_DICT_FILENAME
+from .phrase_trie import PhraseTrie
+from . import instrumentation
 
 # ======================================================================
-# 1. INISIALISASI ALAT BANTU NLP
+# 1. INISIALISASI ALAT BANTU NLP (LAZY)
 # ======================================================================
+# Import modul ini murah: NLTK, Sastrawi dan pandas TIDAK dimuat di sini.
+#   - Stopwords, kamus (Phrase/Region/Intent) & matcher dimuat saat pertama
+#     kali dipakai (get_analyzer), dari snapshot 'Assets/analyzer.pkl'.
+#     Snapshot dibuat ulang otomatis jika file Kamus/ berubah, dan tidak
+#     disimpan/dipakai jika stopwords NLTK gagal dimuat (set fallback).
+#   - Stemmer Sastrawi baru dibuat saat kamus stem tidak mengenal sebuah kata.
+# Nama lama (stopwords_id, PHRASE_MAP, REGION_TRIE, stemmer, ...) tetap bisa
+# diakses sebagai atribut modul (lihat __getattr__ di bawah).
+ANALYZER_FILENAME = 'analyzer.pkl'
+ANALYZER_VERSION = 2
+ANALYZER_PATH = os.path.join(utils.BASE_DIR, 'Assets', ANALYZER_FILENAME)
+KAMUS_FILES = ('config_phrase_map.csv', 'config_region_map.csv', 'config_special_intent.csv')
+NEGATION_WORDS = ['tidak', 'kurang', 'jangan', 'bukan', 'tanpa', 'enggak', 'gak', 'nggak', 'ndak', 'tak', 'kecuali']
+FALLBACK_STOPWORDS = {"yang", "dan", "di", "ke", "ini"}
+REGION_LEVEL_ORDER = {'Tempat': 0, 'Kabupaten/Kota': 1, 'Provinsi': 2} # Halus -> kasar
 
-try:
-    stopwords_id = set(stopwords.words('indonesian')) 
-    negation_words = ['tidak', 'kurang', 'jangan', 'bukan', 'tanpa', 'enggak', 'gak', 'nggak', 'ndak', 'tak', 'kecuali']
-    for word in negation_words:
-        if word in stopwords_id:
-            stopwords_id.remove(word)
-    print("✅ Stopwords (termasuk kustomisasi negasi) siap.")
-except LookupError:
-    print("⚠️ Gagal memuat stopwords NLTK. Harap download dulu: nltk.download('stopwords')")
-    stopwords_id = {"yang", "dan", "di", "ke", "ini"}
-
-# Inisialisasi Stemmer Sastrawi
-try:
-    factory = StemmerFactory()
-    stemmer = factory.create_stemmer()
-    print("✅ Stemmer Sastrawi siap.")
-except:
-    print("⚠️ Gagal memuat Stemmer Sastrawi.")
-    # Fallback ke dummy stemmer jika Sastrawi gagal
-    class DummyStemmer:
-        def stem(self, text):
-            return text
-    stemmer = DummyStemmer()
+_ANALYZER = None # dict: stopwords_id, *_MAP, REGION_LEVELS, PHRASE_REGEX, *_TRIE, ...
+_ANALYZER_LOCK = threading.Lock() # Sesi Streamlit / thread server bisa memanggil bersamaan
+_ANALYZER_STATS = {'source': None, 'load_seconds': 0.0, 'stemmer_seconds': 0.0}
+_LAZY_NAMES = {
+    'stopwords_id', 'PHRASE_MAP', 'REGION_MAP', 'SPECIAL_INTENT_MAP', 'REGION_LEVELS',
+    'PHRASE_REGEX', 'PHRASE_REPLACEMENTS', 'REGION_TRIE', 'SPECIAL_INTENT_TRIE',
+}
+
+def _load_stopwords():
+    """
+    Stopwords NLTK tanpa kata negasi (import NLTK hanya di sini).
+    Mengembalikan (set stopwords, sumber): sumber 'nltk' atau 'fallback'.
+    """
+    try:
+        from nltk.corpus import stopwords
+        stopwords_id = set(stopwords.words('indonesian')) 
+        for word in NEGATION_WORDS:
+            if word in stopwords_id:
+                stopwords_id.remove(word)
+        print("✅ Stopwords (termasuk kustomisasi negasi) siap.")
+        return stopwords_id, 'nltk'
+    except (ImportError, LookupError):
+        print("⚠️ Gagal memuat stopwords NLTK. Harap download dulu: nltk.download('stopwords')")
+        return set(FALLBACK_STOPWORDS), 'fallback'
+
+def _create_stemmer():
+    """Stemmer Sastrawi (atau dummy jika gagal). Dipanggil sekali, saat dibutuhkan."""
+    start = time.perf_counter()
+    try:
+        from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+        factory = StemmerFactory()
+        stemmer = factory.create_stemmer()
+        print("✅ Stemmer Sastrawi siap.")
+    except Exception:
+        print("⚠️ Gagal memuat Stemmer Sastrawi.")
+        # Fallback ke dummy stemmer jika Sastrawi gagal
+        class DummyStemmer:
+            def stem(self, text):
+                return text
+        stemmer = DummyStemmer()
+    _ANALYZER_STATS['stemmer_seconds'] = time.perf_counter() - start
+    return stemmer
+
+class _LazyStemmer:
+    """Pembungkus yang membuat Sastrawi pada panggilan stem() pertama."""
+
+    def __init__(self):
+        self.stemmer = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self.stemmer is None:
+                self.stemmer = _create_stemmer()
+        return self.stemmer
+
+    def stem(self, word):
+        stemmer = self.stemmer or self.load()
+        # Cache bawaan Sastrawi (tanpa batas, hanya di memori) dilewati: kita memanggil stemmer intinya.
+        return getattr(stemmer, 'delegatedStemmer', stemmer).stem(word)
+
+# Kamus stem persisten (LRU) di depan Sastrawi.
+STEM_DICT_PATH = os.path.join(utils.BASE_DIR, 'Assets', STEM_DICT_FILENAME)
+_STEMMER = _LazyStemmer()
+STEM_CACHE = StemCache(_STEMMER)
+if STEM_CACHE.load(STEM_DICT_PATH):
+    print(f"✅ Kamus stem dimuat ({len(STEM_CACHE)} kata).")
+
+def save_stem_cache():
+    """Menyimpan kamus stem ke Assets/ jika ada kata baru yang dipelajari."""
+    if STEM_CACHE.has_unsaved_entries():
+        STEM_CACHE.save(STEM_DICT_PATH)
+        print(f"✅ Kamus stem disimpan ({len(STEM_CACHE)} kata) ke: {STEM_DICT_PATH}")
+
+def stem_cache_stats():
+    """Metrik kamus stem: hit rate, stem/detik, dll."""
+    return STEM_CACHE.stats()
 
 # ======================================================================
-# 2. MEMUAT SEMUA KAMUS (Kode Anda sudah benar)
+# 2. MEMUAT SEMUA KAMUS (snapshot analyzer atau CSV di folder Kamus/)
 # ======================================================================
-# Memanggil fungsi 'load_map_from_csv' dari file 'utils.py'
+def compile_phrase_map(phrase_map):
+    """
+    Mengompilasi PHRASE_MAP SEKALI menjadi satu regex alternasi
+    (frasa terpanjang dulu, dibatasi word boundary) + tabel pengganti.
+    Semua substitusi lalu dilakukan dalam satu lintasan teks.
+
+    Versi lama menjalankan re.sub berurutan (panjang -> pendek), sehingga
+    hasil substitusi bisa disubstitusi lagi oleh frasa yang lebih pendek
+    (misal 'view' -> 'pemandangan' -> ...). Rantai seperti itu diselesaikan
+    di sini, saat kompilasi, pada tabel pengganti.
+    """
+    # Urutkan kamus dari frasa TERPANJANG ke TERPENDEK (sama seperti versi lama)
+    rules = [(str(phrase), str(token)) for phrase, token in phrase_map.items() if str(phrase)]
+    rules.sort(key=lambda rule: len(rule[0]), reverse=True)
+    if not rules:
+        return None, {}
+
+    # Gunakan regex \b (word boundary) agar "ga" tidak merusak "dengan"
+    patterns = [re.compile(r'\b' + re.escape(phrase) + r'\b') for phrase, _ in rules]
+    replacements = {}
+    for i, (phrase, token) in enumerate(rules):
+        for pattern, (_, later_token) in zip(patterns[i + 1:], rules[i + 1:]):
+            token = pattern.sub(later_token, token)
+        replacements[phrase] = token
+
+    regex = re.compile(r'\b(?:' + '|'.join(re.escape(phrase) for phrase, _ in rules) + r')\b')
+    return regex, replacements
+
+def _kamus_signature():
+    """Sidik jari isi file Kamus/ (SHA-1, tidak terpengaruh mtime): snapshot basi jika berubah."""
+    signature = []
+    for filename in KAMUS_FILES:
+        try:
+            with open(os.path.join(utils.BASE_DIR, 'Kamus', filename), 'rb') as f:
+                signature.append((filename, hashlib.sha1(f.read()).hexdigest()))
+        except OSError:
+            signature.append((filename, None))
+    return tuple(signature)
+
+def build_analyzer_state():
+    """
+    Membaca stopwords NLTK & kamus CSV (lewat pandas) lalu mengompilasi
+    matcher frasa. Hasilnya bisa dipickle (snapshot analyzer).
+    """
+    stopwords_id, stopwords_source = _load_stopwords()
+
+    # Memanggil fungsi 'load_map_from_csv' dari file 'utils.py'
+    print("--- Memuat Kamus dari folder 'Kamus/' ---")
+    phrase_map = utils.load_map_from_csv('config_phrase_map.csv')
+    region_map = utils.load_map_from_csv('config_region_map.csv')
+    special_intent_map = utils.load_map_from_csv('config_special_intent.csv')
+    # Level hierarki tiap kode region (kolom 'Level': Tempat / Kabupaten/Kota / Provinsi)
+    region_levels = {
+        region_map[term]: level
+        for term, level in utils.load_map_from_csv('config_region_map.csv', value_column=2).items()
+        if term in region_map
+    }
+    print("✅ Semua kamus (Phrase, Region, Intent) berhasil dimuat.")
+
+    phrase_regex, phrase_replacements = compile_phrase_map(phrase_map)
+    return {
+        'version': ANALYZER_VERSION,
+        'kamus_signature': _kamus_signature(),
+        'stopwords_id': stopwords_id,
+        'stopwords_source': stopwords_source, # 'fallback' = snapshot tidak boleh dipakai ulang
+        'PHRASE_MAP': phrase_map,
+        'REGION_MAP': region_map,
+        'SPECIAL_INTENT_MAP': special_intent_map,
+        'REGION_LEVELS': region_levels,
+        # Regex disimpan sebagai pola (rantai pengganti sudah diselesaikan)
+        'PHRASE_PATTERN': phrase_regex.pattern if phrase_regex is not None else None,
+        'PHRASE_REPLACEMENTS': phrase_replacements,
+    }
+
+def save_analyzer_snapshot(state=None, path=ANALYZER_PATH):
+    """Menyimpan snapshot analyzer (atomik: tulis file sementara lalu rename)."""
+    if state is None:
+        state = build_analyzer_state()
+    # Nama sementara unik: beberapa proses (build_index, server, Streamlit) bisa menulis bersamaan
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return state
+
+def _read_analyzer_snapshot(path=ANALYZER_PATH):
+    """Snapshot yang masih valid, atau None (tidak ada / versi lama / Kamus berubah / stopwords fallback)."""
+    try:
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(state, dict) or state.get('version') != ANALYZER_VERSION:
+        return None
+    if state.get('kamus_signature') != _kamus_signature():
+        return None
+    if state.get('stopwords_source') != 'nltk': # Dibuat tanpa NLTK: coba muat ulang stopwords
+        return None
+    return state
+
+def _activate(state):
+    """State snapshot -> analyzer siap pakai (regex & trie dibangun di memori)."""
+    pattern = state['PHRASE_PATTERN']
+    analyzer = dict(state)
+    analyzer['PHRASE_REGEX'] = re.compile(pattern) if pattern is not None else None
+    # Trie dibangun dari map (murah) karena penanda node-nya tidak bisa dipickle
+    analyzer['REGION_TRIE'] = PhraseTrie(state['REGION_MAP'])
+    analyzer['SPECIAL_INTENT_TRIE'] = PhraseTrie(state['SPECIAL_INTENT_MAP'])
+    return analyzer
+
+def get_analyzer():
+    """Analyzer (stopwords, kamus, matcher) -- dimuat sekali, saat pertama dipakai."""
+    global _ANALYZER
+    if _ANALYZER is not None:
+        return _ANALYZER
+    with _ANALYZER_LOCK:
+        if _ANALYZER is None:
+            start = time.perf_counter()
+            with instrumentation.span('analyzer_load'):
+                state = _read_analyzer_snapshot()
+                source = 'snapshot'
+                if state is None:
+                    state = build_analyzer_state()
+                    source = 'kamus'
+                    if state['stopwords_source'] != 'nltk':
+                        print("⚠️ Snapshot analyzer tidak disimpan (stopwords fallback).")
+                    else:
+                        try:
+                            save_analyzer_snapshot(state)
+                            print(f"✅ Snapshot analyzer disimpan ke: {ANALYZER_PATH}")
+                        except OSError as e:
+                            print(f"⚠️ Gagal menyimpan snapshot analyzer: {e}")
+                _ANALYZER = _activate(state)
+            _ANALYZER_STATS['source'] = source
+            _ANALYZER_STATS['load_seconds'] = time.perf_counter() - start
+    return _ANALYZER
+
+def rebuild_analyzer():
+    """Membaca ulang NLTK & Kamus/, menyimpan snapshot baru (kecuali stopwords fallback), lalu memakainya (dipanggil build_index.py)."""
+    global _ANALYZER
+    with _ANALYZER_LOCK:
+        start = time.perf_counter()
+        state = build_analyzer_state()
+        saved = state['stopwords_source'] == 'nltk'
+        if saved:
+            save_analyzer_snapshot(state)
+        _ANALYZER = _activate(state)
+        _ANALYZER_STATS['source'] = 'kamus'
+        _ANALYZER_STATS['load_seconds'] = time.perf_counter() - start
+    if saved:
+        print(f"✅ Snapshot analyzer disimpan ke: {ANALYZER_PATH}")
+    else:
+        print("⚠️ Snapshot analyzer tidak disimpan (stopwords fallback).")
+    return _ANALYZER
+
+def analyzer_stats():
+    """Biaya inisialisasi: asal analyzer (snapshot/kamus), detik muat, detik buat stemmer."""
+    return dict(_ANALYZER_STATS)
 
-print("--- Memuat Kamus dari folder 'Kamus/' ---")
-PHRASE_MAP = utils.load_map_from_csv('config_phrase_map.csv')
-REGION_MAP = utils.load_map_from_csv('config_region_map.csv')
-SPECIAL_INTENT_MAP = utils.load_map_from_csv('config_special_intent.csv')
-print("✅ Semua kamus (Phrase, Region, Intent) berhasil dimuat.")
+def __getattr__(name):
+    """Akses lama ke global modul (preprocessing.REGION_MAP, dll.) memicu lazy load."""
+    if name in _LAZY_NAMES:
+        return get_analyzer()[name]
+    if name == 'stemmer':
+        return _STEMMER.stemmer or _STEMMER.load()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ======================================================================
 # 3. SEMUA FUNGSI PREPROCESSING
@@ -58,23 +299,15 @@ def remove_special_characters(text):
 def substitute_complex_phrases(text):
     """
     Fungsi dari Sel 5 (Versi aman dengan Regex & Word Boundary).
-    Fungsi ini sekarang otomatis menggunakan PHRASE_MAP global.
+    Memakai matcher PHRASE_MAP yang sudah dikompilasi (snapshot analyzer):
+    satu lintasan, frasa terpanjang yang menang di setiap posisi.
     """
+    analyzer = get_analyzer()
     text_lower = text.lower()
-    
-    # Urutkan kamus dari frasa TERPANJANG ke TERPENDEK
-    sorted_phrases = sorted(PHRASE_MAP.items(), key=lambda item: len(str(item[0])), reverse=True)
-    
-    for phrase, token in sorted_phrases:
-        try:
-            # Gunakan regex \b (word boundary) agar "ga" tidak merusak "dengan"
-            regex_phrase = r'\b' + re.escape(str(phrase)) + r'\b'
-            text_lower = re.sub(regex_phrase, str(token), text_lower)
-        except re.error:
-            # Fallback jika regex error
-            text_lower = text_lower.replace(str(phrase), str(token))
-        
-    return text_lower
+    if analyzer['PHRASE_REGEX'] is None:
+        return text_lower
+    replacements = analyzer['PHRASE_REPLACEMENTS']
+    return analyzer['PHRASE_REGEX'].sub(lambda match: replacements[match.group(0)], text_lower)
 
 def full_preprocessing(text):
     """Fungsi utama preprocessing dari Sel 9."""
@@ -91,10 +324,12 @@ def full_preprocessing(text):
     words = text_with_phrases.lower().split()
     
     # 3. Hapus Stopwords (yang sudah dikustomisasi)
+    stopwords_id = get_analyzer()['stopwords_id']
     words = [w for w in words if w not in stopwords_id]
     
-    # 4. Stemming
-    stemmed_words = [stemmer.stem(w) for w in words]
+    # 4. Stemming (lewat kamus stem; Sastrawi hanya untuk kata baru)
+    with instrumentation.span('stemming'):
+        stemmed_words = STEM_CACHE.stem_tokens(words)
     
     # 5. Hapus token sisa yang terlalu pendek
     final_words = [w for w in stemmed_words if len(w) > 1]
@@ -105,39 +340,30 @@ def full_preprocessing(text):
 def detect_region_and_filter_query(query_text):
     """
     Menganalisis query untuk region.
-    Otomatis menggunakan REGION_MAP global.
+    Memakai REGION_TRIE (dari REGION_MAP): region terpanjang yang cocok pada
+    batas token (misal "jawa tengah" sebelum "jawa"), lalu span-nya dibuang.
     """
-    query_text_lower = query_text.lower()
-    detected_region = None
-    
-    # Urutkan dari region terpanjang (misal: "jawa tengah" sebelum "jawa")
-    sorted_regions = sorted(REGION_MAP.items(), key=lambda item: len(str(item[0])), reverse=True)
-    
-    for term, region in sorted_regions:
-        if term in query_text_lower:
-            detected_region = region
-            query_text_lower = query_text_lower.replace(term, '') 
-            break 
-            
-    filtered_query_text = " ".join([word for word in query_text_lower.split() if word])
-    return filtered_query_text, detected_region
+    return get_analyzer()['REGION_TRIE'].extract(query_text)
+
+def classify_location(location):
+    """
+    Kode region dari kolom Lokasi memakai hierarki config_region_map.csv,
+    urut dari level paling halus (dipakai build_index.py untuk partisi region):
+    "Kab. Semarang, Jawa Tengah" -> ('semarang', 'jawa tengah').
+    """
+    analyzer = get_analyzer()
+    region_levels = analyzer['REGION_LEVELS']
+    codes = []
+    for part in str(location).split(','):
+        match = analyzer['REGION_TRIE'].find_longest(part.lower())
+        if match is not None and match[2] not in codes:
+            codes.append(match[2])
+    codes.sort(key=lambda code: REGION_LEVEL_ORDER.get(region_levels.get(code), len(REGION_LEVEL_ORDER)))
+    return tuple(codes)
 
 def detect_intent(query_text):
     """
     Menganalisis query untuk intent khusus.
-    Otomatis menggunakan SPECIAL_INTENT_MAP global.
+    Memakai SPECIAL_INTENT_TRIE (dari SPECIAL_INTENT_MAP), intent terpanjang menang.
     """
-    query_text_lower = query_text.lower()
-    special_intent = None
-    
-    # Urutkan dari intent terpanjang
-    sorted_intents = sorted(SPECIAL_INTENT_MAP.items(), key=lambda item: len(str(item[0])), reverse=True)
-
-    for term, intent in sorted_intents:
-        if term in query_text_lower:
-            special_intent = intent
-            query_text_lower = query_text_lower.replace(term, '')
-            break
-            
-    filtered_query_text = " ".join([word for word in query_text_lower.split() if word])
-    return filtered_query_text, special_intent
\ No newline at end of file
+    return get_analyzer()['SPECIAL_INTENT_TRIE'].extract(query_text)
@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import OrderedDict
+
+# ======================================================================
+# CACHE QUERY (LRU + TTL) YANG TERIKAT VERSI ASET
+# ======================================================================
+# Dipakai mesin_pencari untuk dua level cache:
+#   1. query mentah          -> (tokens, intent, region)
+#   2. (tokens, intent, region, fusion) -> peringkat tempat (Place_ID + skor)
+# Setiap entri menyimpan versi aset saat dibuat; jika versi aset berubah
+# (build ulang / segmen baru), entri lama otomatis dianggap miss.
+# Operasi OrderedDict dijaga lock: sesi Streamlit / thread server berbagi cache.
+DEFAULT_MAX_SIZE = 1024
+DEFAULT_TTL = 3600.0 # Detik; None = tanpa kedaluwarsa
+
+class QueryCache:
+    def __init__(self, name, max_size=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict() # key -> (version, expires_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version):
+        """Mengembalikan (True, value) jika ada entri valid, selain itu (False, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, expires_at, value = entry
+                if entry_version == version and (expires_at is None or time.monotonic() < expires_at):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key] # Versi aset lama / kedaluwarsa
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value, version):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (version, expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False) # Buang entri yang paling lama tidak dipakai
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            hits, misses, evictions, entries = self.hits, self.misses, self.evictions, len(self._entries)
+        lookups = hits + misses
+        return {
+            'name': self.name,
+            'entries': entries,
+            'hits': hits,
+            'misses': misses,
+            'evictions': evictions,
+            'hit_rate': hits / lookups if lookups else 0.0,
+        }
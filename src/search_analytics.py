@@ -0,0 +1,277 @@
+import csv
+import os
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import closing
+from datetime import datetime
+
+# ======================================================================
+# PENYIMPANAN ANALITIK PENCARIAN (SQLITE + ROLLUP INKREMENTAL)
+# ======================================================================
+# Tabel mentah 'riwayat_pencarian' (indeks: timestamp, query, region)
+# dan tabel rollup yang diperbarui dalam transaksi yang sama dengan
+# INSERT-nya. Panel admin hanya membaca rollup (beberapa baris), jadi
+# biayanya tidak tumbuh dengan jumlah log.
+#
+#   rollup_query  -> per kueri: jumlah pencarian, jumlah tanpa hasil, terakhir dicari
+#   rollup_region -> per region: jumlah pencarian
+#   rollup_total  -> satu baris: total pencarian, yang jumlah hasilnya diketahui, tanpa hasil
+#
+# Objek ini juga sebuah sink untuk SearchLogWriter (write_batch/close),
+# sehingga penulisan tetap terjadi di thread latar belakang.
+#
+# Migrasi log CSV lama juga berjalan di thread penulis (write_batch pertama)
+# atau di panel admin, tidak pernah di jalur pencarian. Seluruh migrasi +
+# penandanya (tabel 'migrasi') ada dalam SATU transaksi: jika terputus,
+# tidak ada baris yang tersimpan dan migrasi diulang pada kesempatan berikutnya.
+ANALYTICS_COLS = ['timestamp', 'query_mentah', 'vsm_tokens', 'intent', 'region', 'n_hasil']
+EMPTY_REGIONS = ('', 'None') # Nilai region yang berarti "tidak ada region"
+LEGACY_CSV_MIGRATION = 'csv_lama' # Nama penanda migrasi log CSV lama
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS riwayat_pencarian (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT, query_mentah TEXT, vsm_tokens TEXT, intent TEXT, region TEXT, n_hasil INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_riwayat_timestamp ON riwayat_pencarian (timestamp);
+CREATE INDEX IF NOT EXISTS idx_riwayat_query ON riwayat_pencarian (query_mentah);
+CREATE INDEX IF NOT EXISTS idx_riwayat_region ON riwayat_pencarian (region);
+
+CREATE TABLE IF NOT EXISTS rollup_query (
+    query_mentah TEXT PRIMARY KEY, searches INTEGER NOT NULL, zero_results INTEGER NOT NULL, last_seen TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_rollup_query_searches ON rollup_query (searches DESC);
+CREATE TABLE IF NOT EXISTS rollup_region (
+    region TEXT PRIMARY KEY, searches INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rollup_total (
+    id INTEGER PRIMARY KEY CHECK (id = 1), searches INTEGER NOT NULL, counted INTEGER NOT NULL, zero_results INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO rollup_total VALUES (1, 0, 0, 0);
+
+CREATE TABLE IF NOT EXISTS migrasi (
+    nama TEXT PRIMARY KEY, baris INTEGER NOT NULL, selesai TEXT
+);
+"""
+
+def _as_count(value):
+    """n_hasil -> int, atau None jika tidak diketahui (mis. log CSV lama)."""
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+class AnalyticsStore:
+    """
+    Satu file SQLite (mode WAL: pembaca tidak memblokir penulis).
+    Penulisan memakai satu koneksi bersama yang diserialisasi self._lock;
+    pembacaan (panel admin, jarang) membuka koneksi berumur pendek, jadi
+    jumlah koneksi tidak menumpuk seiring banyaknya thread sesi Streamlit.
+    File & skema baru dibuat saat pertama dipakai (tidak di konstruktor).
+
+    'legacy_csv_paths': fungsi tanpa argumen -> list path CSV lama (terlama
+    dulu) yang dipindahkan sekali ke store sebelum batch pertama ditulis.
+    """
+
+    def __init__(self, path, legacy_csv_paths=None):
+        self.path = path
+        self.legacy_csv_paths = legacy_csv_paths
+        self._conn = None
+        self._migrated = False
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+
+    def _writer(self):
+        """Koneksi penulis bersama (dibuat ulang jika sudah ditutup); pemanggil memegang self._lock."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = self._connect()
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _read(self, sql, params=()):
+        """Satu query baca lewat koneksi sementara (ditutup setelah fetchall)."""
+        if self._conn is None:
+            with self._lock:
+                self._writer() # Pastikan skema ada sebelum dibaca
+        with closing(self._connect()) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    # ==================================================================
+    # 1. PENULISAN (sink SearchLogWriter)
+    # ==================================================================
+    def write_batch(self, records):
+        """Menyisipkan satu batch log & memperbarui rollup dalam satu transaksi."""
+        with self._lock:
+            self._migrate_legacy_csv() # Batch baru baru ditulis setelah log lama masuk
+            if not records:
+                return
+            with self._writer() as conn: # Satu transaksi: log mentah & rollup selalu konsisten
+                self._insert(conn, records)
+
+    def _insert(self, conn, records):
+        """INSERT log mentah + upsert rollup (tanpa commit; pemanggil mengatur transaksi)."""
+        rows = []
+        query_counts, query_zero, query_last = Counter(), Counter(), {}
+        region_counts = Counter()
+        counted = zero = 0
+        for record in records:
+            row = tuple(record.get(col) for col in ANALYTICS_COLS[:-1]) + (_as_count(record.get('n_hasil')),)
+            rows.append(row)
+            timestamp, query, _, _, region, n_hasil = row
+            query_counts[query] += 1
+            query_last[query] = max(query_last.get(query) or '', timestamp or '')
+            region_counts[region] += 1
+            if n_hasil is not None:
+                counted += 1
+                if n_hasil == 0:
+                    zero += 1
+                    query_zero[query] += 1
+        if not rows:
+            return
+
+        conn.executemany(
+            f"INSERT INTO riwayat_pencarian ({', '.join(ANALYTICS_COLS)}) VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+        # Satu upsert per kueri/region unik di batch, bukan per baris
+        conn.executemany(
+            """INSERT INTO rollup_query VALUES (?, ?, ?, ?)
+               ON CONFLICT(query_mentah) DO UPDATE SET
+                   searches = searches + excluded.searches,
+                   zero_results = zero_results + excluded.zero_results,
+                   last_seen = MAX(COALESCE(last_seen, ''), excluded.last_seen)""",
+            [(query, count, query_zero[query], query_last[query]) for query, count in query_counts.items()]
+        )
+        conn.executemany(
+            """INSERT INTO rollup_region VALUES (?, ?)
+               ON CONFLICT(region) DO UPDATE SET searches = searches + excluded.searches""",
+            list(region_counts.items())
+        )
+        conn.execute(
+            "UPDATE rollup_total SET searches = searches + ?, counted = counted + ?, zero_results = zero_results + ? WHERE id = 1",
+            (len(rows), counted, zero)
+        )
+
+    def _import_csv(self, conn, path, batch_size):
+        total = 0
+        with open(path, encoding='utf-8', newline='') as f:
+            batch = []
+            for record in csv.DictReader(f):
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    self._insert(conn, batch)
+                    total += len(batch)
+                    batch = []
+            self._insert(conn, batch)
+            total += len(batch)
+        return total
+
+    def import_csv(self, path, batch_size=5000):
+        """Memindahkan satu log CSV (kolom LOG_COLS) ke store dalam satu transaksi. Mengembalikan jumlah baris."""
+        with self._lock, self._writer() as conn:
+            return self._import_csv(conn, path, batch_size)
+
+    def migrate_legacy_csv(self):
+        """Menjalankan migrasi log CSV lama sekarang (idempoten; mis. dari panel admin)."""
+        with self._lock:
+            self._migrate_legacy_csv()
+
+    def _migrate_legacy_csv(self):
+        """Pemanggil memegang self._lock. Gagal -> rollback, diulang di panggilan berikutnya."""
+        if self._migrated:
+            return
+        conn = self._writer()
+        done = conn.execute("SELECT 1 FROM migrasi WHERE nama = ?", (LEGACY_CSV_MIGRATION,)).fetchone()
+        if done is None:
+            paths = [path for path in (self.legacy_csv_paths() if self.legacy_csv_paths else []) if os.path.exists(path)]
+            with conn:
+                # Store dari versi sebelum ada tabel penanda sudah berisi log lama: jangan impor ulang
+                legacy_store = conn.execute("SELECT 1 FROM riwayat_pencarian LIMIT 1").fetchone() is not None
+                total = 0
+                for path in ([] if legacy_store else paths):
+                    count = self._import_csv(conn, path, 5000)
+                    print(f"🔄 Memindahkan {count} log dari {os.path.basename(path)} ke store analitik")
+                    total += count
+                conn.execute(
+                    "INSERT INTO migrasi VALUES (?, ?, ?)",
+                    (LEGACY_CSV_MIGRATION, total, datetime.now().isoformat(timespec='seconds'))
+                )
+        self._migrated = True
+
+    def rebuild_rollups(self):
+        """Menghitung ulang semua rollup dari tabel mentah (perbaikan/migrasi)."""
+        with self._lock, self._writer() as conn:
+            conn.execute("DELETE FROM rollup_query")
+            conn.execute("DELETE FROM rollup_region")
+            conn.execute(
+                """INSERT INTO rollup_query
+                   SELECT query_mentah, COUNT(*), COUNT(CASE WHEN n_hasil = 0 THEN 1 END), MAX(timestamp)
+                   FROM riwayat_pencarian GROUP BY query_mentah"""
+            )
+            conn.execute(
+                "INSERT INTO rollup_region SELECT region, COUNT(*) FROM riwayat_pencarian GROUP BY region"
+            )
+            conn.execute(
+                """UPDATE rollup_total SET
+                       searches = (SELECT COUNT(*) FROM riwayat_pencarian),
+                       counted = (SELECT COUNT(n_hasil) FROM riwayat_pencarian),
+                       zero_results = (SELECT COUNT(*) FROM riwayat_pencarian WHERE n_hasil = 0)
+                   WHERE id = 1"""
+            )
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except sqlite3.Error:
+                    pass
+                self._conn = None
+
+    # ==================================================================
+    # 2. PEMBACAAN (panel admin) -- hanya membaca rollup / LIMIT kecil
+    # ==================================================================
+    def summary(self):
+        (searches, counted, zero), = self._read(
+            "SELECT searches, counted, zero_results FROM rollup_total WHERE id = 1"
+        )
+        return {
+            'searches': searches,
+            'zero_results': zero,
+            'zero_result_rate': zero / counted if counted else 0.0,
+        }
+
+    def top_queries(self, n=5):
+        """[(kueri, jumlah pencarian), ...] terbanyak dulu."""
+        return self._read(
+            "SELECT query_mentah, searches FROM rollup_query ORDER BY searches DESC, query_mentah LIMIT ?", (n,)
+        )
+
+    def top_zero_result_queries(self, n=5):
+        """Kueri yang paling sering tidak menemukan tempat."""
+        return self._read(
+            """SELECT query_mentah, zero_results FROM rollup_query
+               WHERE zero_results > 0 ORDER BY zero_results DESC, query_mentah LIMIT ?""", (n,)
+        )
+
+    def top_regions(self, n=3):
+        placeholders = ', '.join('?' for _ in EMPTY_REGIONS)
+        return self._read(
+            f"""SELECT region, searches FROM rollup_region
+                WHERE region IS NOT NULL AND region NOT IN ({placeholders})
+                ORDER BY searches DESC, region LIMIT ?""", (*EMPTY_REGIONS, n)
+        )
+
+    def recent(self, limit=50):
+        """Log terbaru dulu (sebagai list of dict)."""
+        rows = self._read(
+            f"SELECT {', '.join(ANALYTICS_COLS)} FROM riwayat_pencarian ORDER BY id DESC LIMIT ?", (limit,)
+        )
+        return [dict(zip(ANALYTICS_COLS, row)) for row in rows]
@@ -0,0 +1,299 @@
+import atexit
+import csv
+import io
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# ======================================================================
+# PENULIS LOG PENCARIAN NON-BLOCKING (ANTREAN + THREAD LATAR BELAKANG)
+# ======================================================================
+# Jalur pencarian hanya memasukkan record ke antrean memori berukuran
+# tetap (O(1), tanpa I/O). Satu thread latar belakang mengambil record
+# dan menulis per batch (batas jumlah ATAU batas waktu) ke satu atau
+# lebih sink: CSV (dengan rotasi), SQLite, Google Sheets, atau memori.
+# Karena hanya ada satu penulis per proses, append tidak saling tumpang
+# tindih meski banyak request berjalan bersamaan.
+#
+# Kebijakan saat antrean penuh (backpressure):
+#   'drop_newest' -> record baru dibuang (default, pencarian tidak pernah menunggu)
+#   'drop_oldest' -> record tertua dibuang, record baru masuk
+#   'block'       -> tunggu maksimal block_timeout detik, lalu buang
+LOG_COLS = ['timestamp', 'query_mentah', 'vsm_tokens', 'intent', 'region']
+DROP_POLICIES = ('drop_newest', 'drop_oldest', 'block')
+DEFAULT_MAX_QUEUE = 10_000
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 2.0 # Detik
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024 # Rotasi CSV setelah 5 MB
+DEFAULT_BACKUP_COUNT = 5
+
+def make_record(query, tokens, intent, region, n_hasil=None):
+    """
+    Satu baris log, dibuat di thread pemanggil agar timestamp akurat.
+    'n_hasil' (jumlah tempat ditemukan) hanya dipakai store analitik;
+    sink CSV tetap menulis kolom LOG_COLS saja.
+    """
+    return {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'query_mentah': query,
+        'vsm_tokens': ' '.join(tokens),
+        'intent': str(intent),
+        'region': str(region),
+        'n_hasil': n_hasil,
+    }
+
+# ======================================================================
+# 1. SINK (tujuan tulis). Antarmuka: write_batch(records) & close()
+# ======================================================================
+class MemorySink:
+    """Sink di memori (pengganti lokal untuk pengujian / dashboard sementara)."""
+
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    def write_batch(self, records):
+        with self._lock:
+            self.records.extend(records)
+
+    def close(self):
+        pass
+
+class CsvSink:
+    """
+    Append ke CSV dengan header otomatis. Jika ukuran file >= max_bytes,
+    file diputar: x.csv -> x.csv.1 -> ... -> x.csv.<backup_count> (terlama dibuang).
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT, columns=LOG_COLS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.columns = list(columns)
+
+    def _rotate(self):
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def write_batch(self, records):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self._rotate()
+        write_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+
+        # Satu kali write() per batch: baris dari batch yang sama tidak terpotong
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.columns, extrasaction='ignore', lineterminator='\n')
+        if write_header:
+            writer.writeheader()
+        writer.writerows(records)
+        with open(self.path, 'a', encoding='utf-8', newline='') as f:
+            f.write(buffer.getvalue())
+
+    def close(self):
+        pass
+
+class SqliteSink:
+    """
+    Tabel 'riwayat_pencarian' di file SQLite. Koneksi dibuat di thread
+    penulis (SQLite mengikat koneksi ke thread pembuatnya).
+    """
+
+    def __init__(self, path, table='riwayat_pencarian', columns=LOG_COLS):
+        self.path = path
+        self.table = table
+        self.columns = list(columns)
+        self._conn = None
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        conn.execute('PRAGMA journal_mode=WAL') # Pembaca (dashboard) tidak memblokir penulis
+        column_defs = ', '.join(f'{col} TEXT' for col in self.columns)
+        conn.execute(f'CREATE TABLE IF NOT EXISTS {self.table} ({column_defs})')
+        conn.commit()
+        return conn
+
+    def write_batch(self, records):
+        if self._conn is None:
+            self._conn = self._connect()
+        placeholders = ', '.join('?' for _ in self.columns)
+        rows = [tuple(record.get(col) for col in self.columns) for record in records]
+        with self._conn: # Satu transaksi per batch
+            self._conn.executemany(
+                f'INSERT INTO {self.table} ({", ".join(self.columns)}) VALUES ({placeholders})', rows
+            )
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+class GSheetsSink:
+    """
+    Google Sheets lewat koneksi st.connection("gsheets") (atau objek lain
+    dengan append_rows(worksheet=..., data=DataFrame)). 'connection_factory'
+    dipanggil sekali di thread penulis, jadi panggilan jaringan tidak pernah
+    terjadi di jalur pencarian.
+    """
+    SHEET_COLUMNS = {
+        'timestamp': 'timestamp',
+        'query_mentah': 'queri_mentah',
+        'vsm_tokens': 'vsm_tokens_final',
+        'intent': 'intent_terdeteksi',
+        'region': 'region_terdeteksi',
+    }
+
+    def __init__(self, connection_factory, worksheet='LogData'):
+        self.connection_factory = connection_factory
+        self.worksheet = worksheet
+        self._conn = None
+
+    def write_batch(self, records):
+        import pandas as pd
+        if self._conn is None:
+            self._conn = self.connection_factory()
+        data = pd.DataFrame([{sheet_col: record.get(col) for col, sheet_col in self.SHEET_COLUMNS.items()}
+                             for record in records])
+        self._conn.append_rows(worksheet=self.worksheet, data=data)
+
+    def close(self):
+        self._conn = None
+
+# ======================================================================
+# 2. PENULIS BATCH DI THREAD LATAR BELAKANG
+# ======================================================================
+class SearchLogWriter:
+    def __init__(self, sinks, max_queue=DEFAULT_MAX_QUEUE, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, policy='drop_newest', block_timeout=0.05):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Kebijakan '{policy}' tidak dikenal. Pilihan: {', '.join(DROP_POLICIES)}")
+        self.sinks = list(sinks)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._flush_requested = threading.Event()
+        self._stop = threading.Event()
+        self._idle = threading.Condition()
+        self._pending = 0 # Record yang sudah masuk antrean tapi belum selesai ditulis
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.sink_errors = 0
+        self._thread = threading.Thread(target=self._run, name='search-log-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # --- Dipanggil dari jalur pencarian (tidak pernah melakukan I/O) ---
+    def log(self, record):
+        """Memasukkan record ke antrean. Mengembalikan False jika record dibuang."""
+        if self._stop.is_set():
+            self.dropped += 1
+            return False
+        with self._idle:
+            self._pending += 1
+        try:
+            if self.policy == 'block':
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            if self.policy == 'drop_oldest':
+                try:
+                    self._queue.get_nowait() # Buang record tertua
+                    self._mark_done(1)
+                    self.dropped += 1
+                    self._queue.put_nowait(record)
+                    self.enqueued += 1
+                    return True
+                except (queue.Empty, queue.Full):
+                    pass
+            self._mark_done(1)
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    # --- Thread penulis ---
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch:
+                self._write(batch)
+                self._mark_done(len(batch))
+            elif self._stop.is_set():
+                return
+
+    def _collect_batch(self):
+        """Mengumpulkan record sampai batch_size, flush_interval habis, atau flush diminta."""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if self._flush_requested.is_set() or self._stop.is_set():
+                timeout = 0.0 # Kuras antrean tanpa menunggu
+            else:
+                timeout = min(deadline - time.monotonic(), 0.1) # Cek permintaan flush tiap 100 ms
+            try:
+                batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                if timeout <= 0 or time.monotonic() >= deadline:
+                    break
+        if not batch:
+            self._flush_requested.clear()
+        return batch
+
+    def _write(self, batch):
+        for sink in self.sinks:
+            try:
+                sink.write_batch(batch)
+            except Exception as e:
+                # Sink gagal tidak boleh menghentikan sink lain / thread penulis
+                self.sink_errors += 1
+                print(f"⚠️ GAGAL menulis {len(batch)} log ke {type(sink).__name__}: {e}")
+        self.written += len(batch)
+
+    def _mark_done(self, count):
+        with self._idle:
+            self._pending -= count
+            if self._pending <= 0:
+                self._idle.notify_all()
+
+    # --- Kontrol ---
+    def flush(self, timeout=5.0):
+        """Menulis semua record yang sedang antre (menunggu maksimal 'timeout' detik)."""
+        self._flush_requested.set()
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending <= 0, timeout=timeout)
+
+    def close(self, timeout=5.0):
+        """Flush terakhir lalu menghentikan thread penulis (dipanggil otomatis saat exit)."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'sink_errors': self.sink_errors,
+            'policy': self.policy,
+        }
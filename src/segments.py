@@ -0,0 +1,332 @@
+import json
+import math
+import os
+import time
+from collections.abc import Mapping
+import numpy as np
+from .mmap_index import MappedIndex, write_index, open_index, INDEX_FILENAME
+from .vsm_structures import Postings
+from .bitmap_postings import DocBitmap
+from .places import PlaceTable
+
+# ======================================================================
+# 1. KONFIGURASI SEGMEN
+# ======================================================================
+# Indeks terdiri dari segmen-segmen immutable:
+#   Assets/index.bin                 -> segmen dasar (hasil build_index.py)
+#   Assets/segments/seg_XXXXXX.bin   -> segmen tambahan (hasil update_index.py)
+#   Assets/segments/manifest.json    -> daftar segmen aktif (urut Doc_ID naik)
+# Setiap segmen memakai format biner yang sama dengan index.bin. Doc_ID
+# segmen baru selalu lebih besar dari segmen sebelumnya, sehingga postings
+# lintas segmen cukup disambung dan tetap terurut.
+SEGMENTS_DIRNAME = 'segments'
+MANIFEST_FILENAME = 'manifest.json'
+LOCK_FILENAME = '.lock'
+DEFAULT_MAX_SEGMENTS = 4 # Lebih dari ini -> segmen tambahan digabung
+
+def segments_dir(assets_dir):
+    return os.path.join(assets_dir, SEGMENTS_DIRNAME)
+
+def read_manifest(assets_dir):
+    """Membaca manifest segmen; manifest kosong jika belum ada segmen."""
+    path = os.path.join(segments_dir(assets_dir), MANIFEST_FILENAME)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'generation': 0, 'segments': []}
+
+def write_manifest(assets_dir, manifest):
+    """Menulis manifest secara atomik (file sementara + rename)."""
+    directory = segments_dir(assets_dir)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, MANIFEST_FILENAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def _clear_manifest(assets_dir):
+    """Mengosongkan manifest; mengembalikan nama file segmen yang dilepas."""
+    if not os.path.exists(os.path.join(segments_dir(assets_dir), MANIFEST_FILENAME)):
+        return []
+    manifest = read_manifest(assets_dir)
+    write_manifest(assets_dir, {'generation': manifest['generation'] + 1, 'segments': []})
+    return [seg['file'] for seg in manifest['segments']]
+
+def install_base_index(assets_dir, staged_path):
+    """
+    Memasang index.bin hasil build penuh (sudah lengkap di 'staged_path')
+    dan membuang segmen tambahan yang kini sudah tercakup. Manifest
+    dikosongkan SEBELUM index.bin diganti: pembaca di antara dua langkah
+    melihat index.bin lama tanpa segmen (dokumen baru sesaat belum tampak),
+    tidak pernah index.bin baru + segmen lama (dokumen ganda). Kunci segmen
+    mencegah update_index menambah segmen di tengah pergantian.
+    """
+    with SegmentLock(assets_dir):
+        old_files = _clear_manifest(assets_dir)
+        os.replace(staged_path, os.path.join(assets_dir, INDEX_FILENAME))
+        _remove_segment_files(assets_dir, old_files)
+
+def _remove_segment_files(assets_dir, filenames):
+    for filename in filenames:
+        try:
+            os.remove(os.path.join(segments_dir(assets_dir), filename))
+        except OSError:
+            # Di Windows file yang masih di-mmap proses lain tidak bisa dihapus;
+            # file yatim seperti ini aman karena tidak tercantum di manifest.
+            pass
+
+class SegmentLock:
+    """Kunci sederhana berbasis file agar hanya satu penulis segmen aktif."""
+
+    def __init__(self, assets_dir, timeout=60.0):
+        self.path = os.path.join(segments_dir(assets_dir), LOCK_FILENAME)
+        self.timeout = timeout
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode('ascii'))
+                os.close(fd)
+                return self
+            except FileExistsError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Segmen sedang dikunci proses lain ({self.path}).")
+                time.sleep(0.2)
+
+    def __exit__(self, *exc):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+# ======================================================================
+# 2. MENULIS & MENGGABUNG SEGMEN
+# ======================================================================
+def indexed_max_doc_id(assets_dir, manifest=None):
+    """Doc_ID terbesar yang sudah terindeks (segmen di manifest, atau index.bin); -1 jika kosong."""
+    manifest = read_manifest(assets_dir) if manifest is None else manifest
+    if manifest['segments']:
+        return max(seg['max_doc_id'] for seg in manifest['segments'])
+    base_index = open_index(assets_dir)
+    if base_index is None:
+        return -1
+    try:
+        return int(base_index.doc_id_array()[-1]) if base_index.n_docs else -1
+    finally:
+        base_index.close()
+
+def add_segment(assets_dir, idf_scores, vsm_index, df_metadata, places=None):
+    """
+    Menulis satu segmen immutable baru lalu mendaftarkannya di manifest.
+    'places' : PlaceTable segmen (dengan region); None = dibangun dari df_metadata.
+    Mengembalikan None (tanpa menulis apa pun) jika Doc_ID segmen tidak lagi
+    lebih besar dari Doc_ID terakhir yang terindeks, misalnya karena
+    update_index lain yang berjalan bersamaan sudah mendaftarkan ulasan itu.
+    """
+    doc_ids = df_metadata.index
+    with SegmentLock(assets_dir):
+        manifest = read_manifest(assets_dir) # Dibaca ulang di dalam kunci
+        if int(doc_ids.min()) <= indexed_max_doc_id(assets_dir, manifest):
+            return None
+        generation = manifest['generation'] + 1
+        filename = f"seg_{generation:06d}.bin"
+        write_index(os.path.join(segments_dir(assets_dir), filename), idf_scores, vsm_index, df_metadata,
+                    places=places)
+
+        manifest['segments'].append({
+            'file': filename,
+            'n_docs': int(len(doc_ids)),
+            'min_doc_id': int(doc_ids.min()),
+            'max_doc_id': int(doc_ids.max()),
+        })
+        manifest['generation'] = generation
+        write_manifest(assets_dir, manifest)
+    return filename
+
+def needs_merge(assets_dir, max_segments=DEFAULT_MAX_SEGMENTS):
+    return len(read_manifest(assets_dir)['segments']) > max_segments
+
+def merge_segments(assets_dir):
+    """
+    Menggabungkan semua segmen tambahan menjadi satu segmen baru.
+    Segmen dasar (index.bin) tidak disentuh; ia hanya diganti oleh build penuh.
+    Pembaca yang masih memakai segmen lama tetap aman karena file baru
+    ditulis terpisah dan manifest diganti secara atomik.
+    """
+    with SegmentLock(assets_dir):
+        manifest = read_manifest(assets_dir)
+        old_segments = manifest['segments']
+        if len(old_segments) < 2:
+            return None
+
+        indexes = [MappedIndex(os.path.join(segments_dir(assets_dir), seg['file'])) for seg in old_segments]
+        merged = SegmentedIndex(indexes)
+        vsm_index = {term: merged.postings(term) for term in merged.terms()}
+        df_counts = {term: len(postings) for term, postings in vsm_index.items()}
+        idf_scores = {term: math.log10(merged.n_docs / count) for term, count in df_counts.items()}
+        df_metadata = merged.metadata_frame()
+
+        generation = manifest['generation'] + 1
+        filename = f"seg_{generation:06d}.bin"
+        write_index(os.path.join(segments_dir(assets_dir), filename), idf_scores, vsm_index, df_metadata,
+                    places=merged.place_table())
+
+        manifest['segments'] = [{
+            'file': filename,
+            'n_docs': int(merged.n_docs),
+            'min_doc_id': min(seg['min_doc_id'] for seg in old_segments),
+            'max_doc_id': max(seg['max_doc_id'] for seg in old_segments),
+        }]
+        manifest['generation'] = generation
+        write_manifest(assets_dir, manifest)
+        for index in indexes:
+            index.close()
+        _remove_segment_files(assets_dir, [seg['file'] for seg in old_segments])
+    return filename
+
+# ======================================================================
+# 3. PEMBACA LINTAS SEGMEN
+# ======================================================================
+class SegmentedIndex:
+    """
+    Gabungan beberapa MappedIndex (urut Doc_ID naik) yang tampak seperti
+    satu indeks. IDF global dihitung on-demand per term dari jumlah DF
+    tiap segmen, jadi menambah segmen tidak perlu menulis ulang IDF.
+    """
+
+    def __init__(self, indexes, generation=0):
+        self.indexes = indexes
+        self.generation = generation
+        self.n_docs = sum(index.n_docs for index in indexes)
+        self._doc_bounds = [int(index.doc_id_array()[-1]) if index.n_docs else -1 for index in indexes]
+        self._place_table = None
+
+    def _term_ids(self, term):
+        return [(index, index.term_id(term)) for index in self.indexes]
+
+    def has_term(self, term):
+        return any(index.term_id(term) >= 0 for index in self.indexes)
+
+    def terms(self):
+        all_terms = set()
+        for index in self.indexes:
+            all_terms.update(index.terms())
+        return sorted(all_terms)
+
+    def document_frequency(self, term):
+        df = 0
+        for index, term_id in self._term_ids(term):
+            if term_id >= 0:
+                df += len(index.postings_at(term_id))
+        return df
+
+    def idf(self, term):
+        df = self.document_frequency(term)
+        if df == 0:
+            raise KeyError(term)
+        return math.log10(self.n_docs / df)
+
+    def postings(self, term):
+        parts = [index.postings_at(term_id) for index, term_id in self._term_ids(term) if term_id >= 0]
+        if not parts:
+            raise KeyError(term)
+        if len(parts) == 1:
+            return parts[0]
+        return Postings(np.concatenate([p.doc_ids for p in parts]),
+                        np.concatenate([p.tfs for p in parts]),
+                        max(p.max_tf for p in parts))
+
+    def doc_metadata(self, doc_id):
+        for index, upper in zip(self.indexes, self._doc_bounds):
+            if doc_id <= upper:
+                return index.doc_metadata(doc_id)
+        raise KeyError(doc_id)
+
+    def doc_ids(self):
+        return [doc_id for index in self.indexes for doc_id in index.doc_ids()]
+
+    def max_doc_id(self):
+        return max(self._doc_bounds) if self._doc_bounds else 0
+
+    def place_table(self):
+        """PlaceTable gabungan semua segmen (dibangun sekali lalu di-cache)."""
+        if self._place_table is None:
+            self._place_table = PlaceTable.merge([index.place_table() for index in self.indexes])
+        return self._place_table
+
+    def metadata_frame(self):
+        import pandas as pd
+        doc_ids = self.doc_ids()
+        records = [self.doc_metadata(doc_id) for doc_id in doc_ids]
+        return pd.DataFrame(records, index=pd.Index(doc_ids, name='Doc_ID'))
+
+def open_segmented_index(assets_dir, base_index):
+    """
+    Membuka segmen tambahan di atas 'base_index' (MappedIndex dari index.bin).
+    Mengembalikan None jika belum ada segmen tambahan.
+    """
+    manifest = read_manifest(assets_dir)
+    if not manifest['segments']:
+        return None
+    indexes = [base_index] + [
+        MappedIndex(os.path.join(segments_dir(assets_dir), seg['file'])) for seg in manifest['segments']
+    ]
+    return SegmentedIndex(indexes, manifest['generation'])
+
+# ======================================================================
+# 4. ADAPTER DICT-LIKE (setara MappedIdf/MappedPostings/MappedMetadata)
+# ======================================================================
+class _SegmentedMapping(Mapping):
+    def __init__(self, index):
+        self._index = index
+
+    @property
+    def segmented_index(self):
+        return self._index
+
+    def __len__(self):
+        return len(self._index.terms())
+
+    def __iter__(self):
+        return iter(self._index.terms())
+
+    def __contains__(self, term):
+        return isinstance(term, str) and self._index.has_term(term)
+
+class SegmentedIdf(_SegmentedMapping):
+    def __getitem__(self, term):
+        return self._index.idf(term)
+
+class SegmentedPostings(_SegmentedMapping):
+    def __getitem__(self, term):
+        return self._index.postings(term)
+
+class SegmentedBooleanIndex(_SegmentedMapping):
+    def __getitem__(self, term):
+        return DocBitmap.from_sorted(self._index.postings(term).doc_ids)
+
+class _SegmentedLocator:
+    def __init__(self, index):
+        self._index = index
+
+    def __getitem__(self, doc_id):
+        return self._index.doc_metadata(int(doc_id))
+
+class SegmentedMetadata:
+    def __init__(self, index):
+        self._index = index
+        self.loc = _SegmentedLocator(index)
+        self._frame = None
+
+    def __len__(self):
+        return self._index.n_docs
+
+    def to_dataframe(self):
+        if self._frame is None:
+            self._frame = self._index.metadata_frame()
+        return self._frame
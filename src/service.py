@@ -0,0 +1,274 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+from . import mesin_pencari
+from . import boolean_ir
+from . import preprocessing
+from . import instrumentation
+
+# ======================================================================
+# LAYANAN HTTP/JSON (ASYNCIO) DENGAN MESIN YANG SELALU "HANGAT"
+# ======================================================================
+# Event loop asyncio hanya menangani koneksi & parsing HTTP (stdlib saja).
+# Skoring (CPU-bound) dijalankan di worker pool; tiap worker memuat aset
+# sekali lewat initializer, jadi tiap request hanya membayar waktu skoring.
+#
+# Endpoint (GET: query string, POST: body JSON):
+#   /search  -> q, k (default 10), offset, fusion : satu halaman rekomendasi tempat (VSM)
+#   /boolean -> q                                 : Doc_ID model Boolean
+#   /health  -> status layanan & worker
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_K = 10
+DEFAULT_MAX_CONCURRENCY = 8
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+REQUEST_TIMEOUT = 30.0 # Detik: batas baca request & tunggu hasil worker
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+# ======================================================================
+# 1. FUNGSI WORKER (dijalankan di dalam pool)
+# ======================================================================
+def _init_worker():
+    """Initializer pool: aset VSM & Boolean (dan analyzer kueri) dimuat sekali per worker."""
+    mesin_pencari.initialize_mesin()
+    boolean_ir.initialize_boolean()
+    preprocessing.get_analyzer()
+
+def _run_search(query, k, fusion, offset=0):
+    start = time.perf_counter()
+    with instrumentation.trace(query, fusion=fusion, offset=offset) as trace:
+        vsm_tokens, intent, region = mesin_pencari.analyze_full_query(query)
+        page = mesin_pencari.search_page(vsm_tokens, intent, region, offset=offset, limit=k, fusion=fusion)
+        trace['n_hasil'] = page['total']
+    return {
+        'query': query,
+        'tokens': vsm_tokens,
+        'intent': intent,
+        'region': region,
+        **page,
+        'took_ms': (time.perf_counter() - start) * 1000,
+    }
+
+def _run_boolean(query):
+    start = time.perf_counter()
+    boolean_ir.parse_boolean_query(query) # Validasi dulu: BooleanQueryError -> HTTP 400
+    with instrumentation.trace(query, event='boolean') as trace:
+        results = boolean_ir.search_boolean(query)
+        trace['n_hasil'] = len(results)
+    return {
+        'query': query,
+        'total': len(results),
+        'results': results,
+        'took_ms': (time.perf_counter() - start) * 1000,
+    }
+
+def _run_health():
+    return {
+        'pid': os.getpid(),
+        'vsm_ready': mesin_pencari.PLACE_TABLE is not None,
+        'boolean_ready': boolean_ir.BOOLEAN_INDEX is not None,
+        'asset_version': mesin_pencari.ASSET_VERSION,
+        'query_cache': mesin_pencari.query_cache_stats(),
+    }
+
+# ======================================================================
+# 2. LAYANAN ASYNCIO
+# ======================================================================
+class SearchService:
+    """
+    workers         -> jumlah proses worker (0 = satu thread di proses ini)
+    max_concurrency -> maksimal request yang diskor bersamaan; sisanya antre
+    """
+
+    def __init__(self, workers=1, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self._pool = None
+        self._slots = None
+        self.started_at = None
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+
+    def _create_pool(self):
+        if self.workers > 0:
+            return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        return ThreadPoolExecutor(max_workers=1, initializer=_init_worker)
+
+    async def start(self):
+        """Membuat pool & memanaskan semua worker sebelum menerima request."""
+        self._pool = self._create_pool()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self.started_at = time.time()
+        await asyncio.gather(*(self._submit(_run_health) for _ in range(max(self.workers, 1))))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def _submit(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(self._pool, fn, *args), REQUEST_TIMEOUT)
+
+    async def _run(self, fn, *args):
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                return await self._submit(fn, *args)
+            finally:
+                self.in_flight -= 1
+
+    # --- Routing ---
+    async def dispatch(self, method, path, params):
+        if path == '/health':
+            worker = await self._submit(_run_health)
+            return {
+                'status': 'ok' if worker['vsm_ready'] and worker['boolean_ready'] else 'degraded',
+                'uptime_s': time.time() - self.started_at,
+                'workers': self.workers,
+                'max_concurrency': self.max_concurrency,
+                'in_flight': self.in_flight,
+                'requests': self.requests,
+                'errors': self.errors,
+                'worker': worker,
+            }
+        if path not in ('/search', '/boolean'):
+            raise HttpError(404, f"Endpoint '{path}' tidak ditemukan.")
+        if method not in ('GET', 'POST'):
+            raise HttpError(405, f"Metode {method} tidak didukung.")
+
+        query = str(params.get('q', params.get('query', ''))).strip()
+        if not query:
+            raise HttpError(400, "Parameter 'q' wajib diisi.")
+        if path == '/boolean':
+            try:
+                return await self._run(_run_boolean, query)
+            except boolean_ir.BooleanQueryError as e:
+                raise HttpError(400, f"Kueri Boolean tidak valid: {e}")
+
+        try:
+            k = int(params.get('k', DEFAULT_K))
+            offset = int(params.get('offset', 0))
+        except (TypeError, ValueError):
+            raise HttpError(400, "Parameter 'k' dan 'offset' harus bilangan bulat.")
+        fusion = params.get('fusion', mesin_pencari.DEFAULT_FUSION)
+        if fusion not in mesin_pencari.FUSION_METHODS:
+            raise HttpError(400, f"Fusi '{fusion}' tidak dikenal. Pilihan: {', '.join(mesin_pencari.FUSION_METHODS)}")
+        return await self._run(_run_search, query, max(k, 0), fusion, max(offset, 0))
+
+    # --- HTTP/1.1 minimal (keep-alive, Content-Length) ---
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), REQUEST_TIMEOUT)
+                except (asyncio.IncompleteReadError, ConnectionError, asyncio.TimeoutError):
+                    break # Klien menutup koneksi / diam terlalu lama
+                except HttpError as e:
+                    self.errors += 1
+                    writer.write(_encode_response(e.status, {'error': e.message}, keep_alive=False))
+                    await writer.drain()
+                    break
+                except Exception as e:
+                    # Request rusak yang tidak terduga: tetap dijawab, jangan putus diam-diam
+                    self.errors += 1
+                    writer.write(_encode_response(400, {'error': f"Request tidak valid ({type(e).__name__})."}, keep_alive=False))
+                    await writer.drain()
+                    break
+
+                method, path, params, keep_alive = request
+                self.requests += 1
+                try:
+                    status, payload = 200, await self.dispatch(method, path, params)
+                except HttpError as e:
+                    status, payload = e.status, {'error': e.message}
+                except asyncio.TimeoutError:
+                    status, payload = 504, {'error': "Worker tidak merespons tepat waktu."}
+                except Exception as e:
+                    status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+                if status >= 400:
+                    self.errors += 1
+
+                writer.write(_encode_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+async def _read_request(reader):
+    """Membaca satu request. Mengembalikan (method, path, params, keep_alive)."""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.LimitOverrunError:
+        raise HttpError(431, "Header request terlalu besar.")
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ', 2)
+    except ValueError:
+        raise HttpError(400, "Baris request tidak valid.")
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    url = urlsplit(target)
+    params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+    try:
+        length = int(headers.get('content-length', '0') or 0)
+    except ValueError:
+        raise HttpError(400, "Header Content-Length tidak valid.")
+    if length < 0:
+        raise HttpError(400, "Header Content-Length tidak valid.")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "Body request terlalu besar.")
+    if length:
+        body = await reader.readexactly(length)
+        try:
+            payload = json.loads(body.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise HttpError(400, "Body harus JSON yang valid.")
+        if not isinstance(payload, dict):
+            raise HttpError(400, "Body JSON harus berupa objek.")
+        params.update(payload)
+
+    connection = headers.get('connection', '').lower()
+    keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+    return method.upper(), url.path.rstrip('/') or '/', params, keep_alive
+
+def _encode_response(status, payload, keep_alive):
+    body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+    head = (
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode('latin-1') + body
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=1, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """Menjalankan layanan sampai dihentikan (Ctrl+C)."""
+    service = SearchService(workers, max_concurrency)
+    print(f"🔄 Memanaskan {max(workers, 1)} worker (memuat aset)...")
+    await service.start()
+    server = await asyncio.start_server(service.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+    print(f"✅ Layanan pencarian siap di http://{host}:{port} (/search, /boolean, /health)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# ======================================================================
+# KAMUS STEM PERSISTEN (LRU) UNTUK SASTRAWI
+# ======================================================================
+# Sastrawi butuh puluhan milidetik per kata baru, padahal kosakata korpus
+# jauh lebih kecil dari jumlah token. Hasil stem (kata -> stem) disimpan di
+# memori dengan batas LRU, lalu dipersist ke 'Assets/stem_dict.json' agar
+# build berikutnya dan proses query tidak perlu memanggil Sastrawi lagi
+# untuk kata yang sudah pernah dilihat.
+# Lookup/insert/evict dijaga lock (thread server / sesi Streamlit berbagi
+# satu cache); pemanggilan Sastrawi sendiri tetap di luar lock.
+STEM_DICT_FILENAME = 'stem_dict.json'
+STEM_DICT_VERSION = 1
+DEFAULT_MAX_SIZE = 200_000 # Jumlah entri maksimum di memori
+
+class StemCache:
+    """
+    Memoization kata -> stem dengan batas LRU + metrik.
+        hits / misses   -> jumlah lookup yang kena / tidak kena cache
+        stem_seconds    -> total waktu di dalam stem_tokens()
+        miss_seconds    -> waktu yang dihabiskan Sastrawi (hanya miss)
+    """
+
+    def __init__(self, stemmer, max_size=DEFAULT_MAX_SIZE):
+        self._stemmer = stemmer
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._learned = {} # Entri baru sejak load/save terakhir
+        self.hits = 0
+        self.misses = 0
+        self.stem_seconds = 0.0
+        self.miss_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, word):
+        return word in self._entries
+
+    def _put(self, word, stem):
+        """Insert + evict LRU; pemanggil wajib memegang self._lock."""
+        self._entries[word] = stem
+        self._entries.move_to_end(word)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False) # Buang entri yang paling lama tidak dipakai
+
+    def stem(self, word):
+        """Stem satu kata; Sastrawi hanya dipanggil jika kata belum dikenal."""
+        with self._lock:
+            stem = self._entries.get(word)
+            if stem is not None:
+                self.hits += 1
+                self._entries.move_to_end(word)
+                return stem
+            self.misses += 1
+
+        start = time.perf_counter()
+        stem = self._stemmer.stem(word) # Di luar lock: lambat, dan hasilnya deterministik
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.miss_seconds += elapsed
+            self._put(word, stem)
+            self._learned[word] = stem
+        return stem
+
+    def stem_tokens(self, words):
+        """Stem list token (dipakai full_preprocessing); waktu diukur per batch."""
+        start = time.perf_counter()
+        stems = [self.stem(word) for word in words]
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.stem_seconds += elapsed
+        return stems
+
+    # --- Sinkronisasi antar proses (build paralel) ---
+    def learned_entries(self):
+        """Entri yang dipelajari sejak load/save terakhir (dikirim worker ke proses utama)."""
+        with self._lock:
+            return dict(self._learned)
+
+    def update(self, entries):
+        """Menambahkan entri hasil proses lain tanpa memanggil Sastrawi."""
+        with self._lock:
+            for word, stem in entries.items():
+                if word not in self._entries:
+                    self._learned[word] = stem
+                self._put(word, stem)
+
+    # --- Persistensi ---
+    def load(self, path):
+        """Memuat kamus stem dari disk. File hilang/rusak -> mulai dari kosong."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"⚠️ Gagal membaca kamus stem {path}: {e}")
+            return 0
+        if payload.get('version') != STEM_DICT_VERSION:
+            print(f"⚠️ Versi kamus stem {path} tidak dikenal, diabaikan.")
+            return 0
+        with self._lock:
+            for word, stem in payload.get('stems', {}).items():
+                self._put(word, stem)
+            return len(self._entries)
+
+    def save(self, path):
+        """Menyimpan kamus stem secara atomik (file sementara + rename)."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': STEM_DICT_VERSION, 'stems': dict(self._entries)}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._learned = {}
+
+    def has_unsaved_entries(self):
+        with self._lock:
+            return bool(self._learned)
+
+    # --- Metrik ---
+    def stats(self):
+        with self._lock:
+            hits, misses, entries = self.hits, self.misses, len(self._entries)
+            stem_seconds, miss_seconds = self.stem_seconds, self.miss_seconds
+        lookups = hits + misses
+        return {
+            'entries': entries,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'stems_per_sec': lookups / stem_seconds if stem_seconds > 0 else 0.0,
+            'sastrawi_stems_per_sec': misses / miss_seconds if miss_seconds > 0 else 0.0,
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"{s['entries']} entri, hit rate {s['hit_rate']:.1%} "
+                f"({s['hits']} hit / {s['misses']} miss), {s['stems_per_sec']:,.0f} stem/detik")
@@ -1,20 +1,24 @@
-import pandas as pd
 import os
-import joblib
-import streamlit as st
-from .vsm_structures import Node, SlinkedList
-from datetime import datetime
+from .vsm_structures import ensure_compact_index
+from .mmap_index import open_index, MappedIdf, MappedPostings, MappedMetadata, INDEX_FILENAME
+from .segments import open_segmented_index, SegmentedIdf, SegmentedPostings, SegmentedMetadata
+from .places import PlaceTable
+from .search_log import SearchLogWriter, CsvSink, GSheetsSink, make_record, LOG_COLS
+from .search_analytics import AnalyticsStore
+from . import instrumentation
+import threading
 
 # Dapatkan path ke folder 'src' saat ini
 SRC_DIR = os.path.dirname(os.path.abspath(__file__))
 # Dapatkan path ke folder ROOT (satu level di atas 'src')
 BASE_DIR = os.path.dirname(SRC_DIR)
 
-def load_map_from_csv(filename):
+def load_map_from_csv(filename, value_column=1):
     """
     Memuat file CSV (kolom A: key, kolom B: value) ke dalam dictionary.
     Fungsi ini mengabaikan baris yang diawali '#' (untuk komentar)
     dan mengabaikan kolom ekstra (seperti kolom 'kategori').
+    'value_column' memilih kolom value lain (misal kolom 'Level' = 2).
     """
 
     # Tentukan path file absolut
@@ -26,12 +30,13 @@ def load_map_from_csv(filename):
              print(f"!!! GAGAL: File Kamus tidak ditemukan di: {filepath}")
              return {}
 
+        import pandas as pd
         # 'comment=#' memberi tahu pandas untuk mengabaikan baris yang diawali #
         df = pd.read_csv(filepath, comment='#', dtype=str).fillna('')
         
         # Ambil nama kolom pertama (A) dan kedua (B)
         key_col = df.columns[0]
-        value_col = df.columns[1]
+        value_col = df.columns[value_column]
         
         # Hapus baris yang mungkin kosong di kolom A atau B
         df = df.dropna(subset=[key_col, value_col])
@@ -49,54 +54,107 @@ def load_map_from_csv(filename):
         print(f"!!! ERROR saat memuat {filepath}: {e}")
         return {}
     
+PLACES_FILENAME = 'places.pkl'
+
 def load_assets():
-    """Memuat aset VSM dari folder assets/ menggunakan path absolut."""
+    """
+    Memuat aset VSM dari folder assets/ menggunakan path absolut.
+    Jika 'index.bin' (format biner mmap) tersedia, aset dibuka lewat mmap
+    (hanya header yang dibaca). Jika tidak, kembali ke file .pkl lama.
+
+    Mengembalikan: (IDF_SCORES, VSM_INDEX_TF, DF_METADATA, PLACE_TABLE)
+    """
     assets_dir = os.path.join(BASE_DIR, 'Assets')
+
+    try:
+        mapped_index = open_index(assets_dir)
+        if mapped_index is not None:
+            # Segmen inkremental (update_index.py) dibaca transparan di atas index.bin
+            segmented = open_segmented_index(assets_dir, mapped_index)
+            if segmented is not None:
+                print(f"✅ Aset VSM dibuka via mmap ({len(segmented.indexes)} segmen, generasi {segmented.generation}).")
+                return (SegmentedIdf(segmented), SegmentedPostings(segmented),
+                        SegmentedMetadata(segmented), segmented.place_table())
+            print(f"✅ Aset VSM dibuka via mmap ({INDEX_FILENAME}, versi {mapped_index.version}).")
+            return (MappedIdf(mapped_index), MappedPostings(mapped_index),
+                    MappedMetadata(mapped_index), mapped_index.place_table())
+    except Exception as e:
+        print(f"⚠️ Gagal membuka {INDEX_FILENAME}: {e}. Memakai file .pkl.")
     
     try:
+        import joblib
         # Memuat tiga aset utama
         IDF_SCORES = joblib.load(os.path.join(assets_dir, 'idf_scores.pkl'))
         VSM_INDEX_TF = joblib.load(os.path.join(assets_dir, 'vsm_index_tf.pkl'))
+        # Adapter: indeks lama (Linked List) dikonversi ke Postings ringkas
+        VSM_INDEX_TF = ensure_compact_index(VSM_INDEX_TF)
         DF_METADATA = joblib.load(os.path.join(assets_dir, 'df_metadata.pkl'))
+        try:
+            PLACE_TABLE = joblib.load(os.path.join(assets_dir, PLACES_FILENAME))
+        except FileNotFoundError:
+            # df_metadata.pkl lama masih memuat kolom per-tempat
+            PLACE_TABLE = PlaceTable.from_metadata(DF_METADATA)
         
         print("✅ Aset VSM berhasil dimuat.")
-        return IDF_SCORES, VSM_INDEX_TF, DF_METADATA
+        return IDF_SCORES, VSM_INDEX_TF, DF_METADATA, PLACE_TABLE
     
     except FileNotFoundError:
         print(f"❌ ERROR: File aset .pkl tidak ditemukan di '{assets_dir}'.")
         print("   Pastikan Anda sudah menjalankan skrip indexing dan menyimpan file .pkl di folder 'assets'.")
-        return None, None, None
+        return None, None, None, None
     except Exception as e:
         print(f"❌ ERROR saat memuat aset VSM: {e}")
-        return None, None, None
+        return None, None, None, None
     
-def log_pencarian_gsheets(query, tokens, intent, region):
-    """Mencatat detail pencarian ke Google Sheets."""
-    try:
-        conn = st.connection("gsheets", type="gsheets")
+# File yang menentukan "versi" aset: berubah jika build ulang / segmen baru
+ASSET_VERSION_FILES = [
+    INDEX_FILENAME,
+    os.path.join('segments', 'manifest.json'),
+    'idf_scores.pkl', 'vsm_index_tf.pkl', 'df_metadata.pkl', PLACES_FILENAME,
+]
 
-        # Buat data baru dalam satu baris (DataFrame)
-        data_baru = pd.DataFrame({
-            "timestamp": [datetime.now()],
-            "queri_mentah": [query],
-            "vsm_tokens_final": [' '.join(tokens)],
-            "intent_terdeteksi": [str(intent)],
-            "region_terdeteksi": [str(region)]
-        })
+def asset_version():
+    """
+    Sidik jari versi aset di folder Assets/ (mtime + ukuran file indeks &
+    manifest segmen). Dipakai untuk meng-invalidasi cache query.
+    """
+    assets_dir = os.path.join(BASE_DIR, 'Assets')
+    version = []
+    for filename in ASSET_VERSION_FILES:
+        try:
+            stat = os.stat(os.path.join(assets_dir, filename))
+            version.append((filename, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            continue
+    return tuple(version)
 
-        # Tambahkan baris baru ke sheet
-        # 'worksheet="Sheet1"' -> Sesuaikan dengan nama sheet Anda
-        conn.append_rows(worksheet="LogData", data=data_baru)
+def _gsheets_connection():
+    """Koneksi Google Sheets Streamlit (streamlit hanya diimpor di sini, bukan oleh CLI/worker)."""
+    import streamlit as st
+    return st.connection("gsheets", type="gsheets")
 
-    except Exception as e:
-        st.warning(f"Gagal mencatat riwayat GSheets: {e}")
+def log_pencarian_gsheets(query, tokens, intent, region):
+    """
+    Mencatat detail pencarian ke Google Sheets lewat antrean non-blocking.
+    Panggilan jaringan terjadi di thread penulis, per batch.
+    """
+    global _GSHEETS_LOG_WRITER
+    with _LOG_WRITER_LOCK:
+        if _GSHEETS_LOG_WRITER is None:
+            _GSHEETS_LOG_WRITER = SearchLogWriter(
+                [GSheetsSink(_gsheets_connection, worksheet="LogData")],
+                flush_interval=10.0 # API Sheets lambat & berkuota: batch lebih jarang
+            )
+    _GSHEETS_LOG_WRITER.log(make_record(query, tokens, intent, region))
 
 def load_logs_gsheets():
     """
     Mengambil data log dari Google Sheets untuk dashboard admin.
     """
+    import pandas as pd
+    import streamlit as st
     try:
-        conn = st.connection("gsheets", type="gsheets")
+        conn = _gsheets_connection()
         # PASTIKAN NAMA "LogData" SAMA DENGAN NAMA TAB DI GOOGLE SHEET ANDA
         # ttl=300 -> Cache data selama 5 menit
         df = conn.read(worksheet="LogData", ttl=300)
@@ -113,45 +171,90 @@ def load_logs_gsheets():
         return pd.DataFrame() # Kembalikan DataFrame kosong
 
 LOG_FILE_PATH = os.path.join(BASE_DIR, 'Riwayat', 'riwayat_pencarian.csv')
-LOG_COLS = ['timestamp', 'query_mentah', 'vsm_tokens', 'intent', 'region']
+ANALYTICS_DB_PATH = os.path.join(BASE_DIR, 'Riwayat', 'analitik_pencarian.db')
 
-def log_pencarian_csv(query, tokens, intent, region):
+# Penulis log & store analitik dibuat sekali per proses (saat dipakai
+# pertama kali) & dipakai ulang di setiap rerun Streamlit.
+# Lihat src/search_log.py & src/search_analytics.py.
+_CSV_LOG_WRITER = None
+_GSHEETS_LOG_WRITER = None
+_ANALYTICS_STORE = None
+_LOG_WRITER_LOCK = threading.Lock() # Sesi Streamlit berjalan di thread berbeda
+
+def _legacy_log_paths():
+    """Log CSV lama, dari yang terlama: x.csv.N, ..., x.csv.1, x.csv."""
+    backups = sorted(
+        (path for path in (f"{LOG_FILE_PATH}.{i}" for i in range(1, 100)) if os.path.exists(path)),
+        key=lambda path: int(path.rsplit('.', 1)[1]), reverse=True
+    )
+    return backups + ([LOG_FILE_PATH] if os.path.exists(LOG_FILE_PATH) else [])
+
+def get_analytics_store():
+    """
+    Store analitik SQLite di folder /Riwayat. Membuat objeknya tidak
+    menyentuh disk: file, skema, dan migrasi sekali log CSV lama terjadi
+    di thread penulis log (atau saat panel admin membaca).
+    """
+    global _ANALYTICS_STORE
+    with _LOG_WRITER_LOCK:
+        if _ANALYTICS_STORE is None:
+            _ANALYTICS_STORE = AnalyticsStore(ANALYTICS_DB_PATH, legacy_csv_paths=_legacy_log_paths)
+    return _ANALYTICS_STORE
+
+def get_log_writer():
+    """Penulis log lokal: store analitik + CSV di folder /Riwayat (dengan rotasi)."""
+    global _CSV_LOG_WRITER
+    store = get_analytics_store()
+    with _LOG_WRITER_LOCK:
+        if _CSV_LOG_WRITER is None:
+            # Store lebih dulu: migrasi CSV lama di batch pertama belum memuat batch itu sendiri
+            _CSV_LOG_WRITER = SearchLogWriter([store, CsvSink(LOG_FILE_PATH)])
+    return _CSV_LOG_WRITER
+
+def log_pencarian_csv(query, tokens, intent, region, n_hasil=None):
     """
-    Mencatat kueri pencarian ke file CSV lokal di folder /Riwayat.
-    Dibuat agar anti-gagal (tidak akan meng-crash aplikasi utama).
+    Mencatat kueri pencarian ke file CSV lokal di folder /Riwayat dan ke
+    store analitik ('n_hasil' = jumlah tempat ditemukan, untuk tingkat
+    pencarian tanpa hasil).
+    Hanya memasukkan record ke antrean memori (tanpa I/O), jadi tidak
+    menambah latensi pencarian & tidak akan meng-crash aplikasi utama.
+    Penulisan ke disk dilakukan thread latar belakang per batch.
     """
     try:
-        # 1. Pastikan folder 'Riwayat' ada
-        os.makedirs(os.path.dirname(LOG_FILE_PATH), exist_ok=True)
-        
-        # 2. Siapkan data baru
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        tokens_str = ' '.join(tokens)
-        data_baru = pd.DataFrame(
-            [[timestamp, query, tokens_str, str(intent), str(region)]], 
-            columns=LOG_COLS
-        )
-        
-        # 3. Cek apakah file ada (untuk menentukan perlu header atau tidak)
-        file_exists = os.path.exists(LOG_FILE_PATH)
-        
-        # 4. Tulis/Append ke CSV
-        data_baru.to_csv(
-            LOG_FILE_PATH, 
-            mode='a', # 'a' = append (menambahkan)
-            header=not file_exists, # Hanya tulis header jika file baru
-            index=False
-        )
+        with instrumentation.span('log_pencarian_csv'):
+            get_log_writer().log(make_record(query, tokens, intent, region, n_hasil))
     except Exception as e:
         # PENTING: Jangan crash aplikasi utama jika logging gagal
         print(f"⚠️ GAGAL mencatat riwayat ke CSV: {e}")
-        # Di Streamlit Cloud, ini hanya akan muncul di log, tidak di UI
-        st.toast(f"Gagal mencatat riwayat: {e}", icon="⚠️")
+
+def baca_analitik(n_top=5, n_recent=50):
+    """
+    Statistik untuk dashboard admin, dibaca dari rollup store analitik
+    (tidak memindai seluruh riwayat).
+    """
+    if _CSV_LOG_WRITER is not None:
+        _CSV_LOG_WRITER.flush(timeout=1.0) # Ikutkan log yang masih antre
+    import pandas as pd
+    store = get_analytics_store()
+    try:
+        store.migrate_legacy_csv() # Tanpa pencarian baru pun, log CSV lama sudah ikut terbaca
+    except Exception as e:
+        print(f"⚠️ GAGAL memindahkan log CSV lama: {e}")
+    return {
+        **store.summary(),
+        'top_queries': store.top_queries(n_top),
+        'top_regions': store.top_regions(3),
+        'top_zero_result_queries': store.top_zero_result_queries(n_top),
+        'recent': pd.DataFrame(store.recent(n_recent)),
+    }
 
 def baca_riwayat_csv(limit=50):
     """
     Membaca file log CSV untuk ditampilkan di dashboard admin.
     """
+    if _CSV_LOG_WRITER is not None:
+        _CSV_LOG_WRITER.flush(timeout=1.0) # Tampilkan juga log yang masih antre
+    import pandas as pd
     try:
         df = pd.read_csv(LOG_FILE_PATH)
         # Urutkan dari terbaru ke terlama dan ambil limit
@@ -0,0 +1,131 @@
+from collections import Counter
+import numpy as np
+from scipy import sparse
+from .vsm_structures import WEIGHTING_SCHEMES, query_term_weight
+from .posting_weights import PostingWeights
+
+# ======================================================================
+# MESIN SKOR VSM BERBASIS MATRIKS SPARSE (COSINE SIMILARITY)
+# ======================================================================
+# Matriks bobot disimpan term x dokumen dalam format CSR: satu baris per
+# term persis sama dengan postings list-nya, sehingga memilih baris term
+# query itu murah. Skor = (q . d) / (|q| |d|) dengan |d| yang sudah
+# dihitung saat build_index.py.
+
+class SparseVSM:
+    def __init__(self, posting_weights):
+        self._weights = posting_weights
+        self._term_id = posting_weights.term_id
+        self._idf = posting_weights.idf
+        self._doc_ids = np.asarray(posting_weights.doc_ids)
+        self._indptr = np.asarray(posting_weights.post_ptr, dtype=np.int64)
+        self._rows = np.searchsorted(self._doc_ids, posting_weights.post_docs).astype(np.int32)
+        self._matrices = {}
+        self._norms = {}
+
+    @classmethod
+    def from_mapped(cls, mapped_index):
+        """Memakai bobot & norma yang sudah disimpan di index.bin (tanpa hitung ulang)."""
+        return cls(PostingWeights.from_mapped(mapped_index))
+
+    @classmethod
+    def from_dicts(cls, idf_scores, vsm_index, n_docs=None):
+        """Fallback untuk aset .pkl: bobot & norma dihitung sekali saat dimuat."""
+        return cls(PostingWeights.from_dicts(idf_scores, vsm_index, n_docs))
+
+    def _matrix(self, weighting_scheme):
+        if weighting_scheme not in self._matrices:
+            data = self._weights.weights(weighting_scheme)
+            shape = (len(self._indptr) - 1, len(self._doc_ids))
+            self._matrices[weighting_scheme] = sparse.csr_matrix((data, self._rows, self._indptr), shape=shape)
+            self._norms[weighting_scheme] = self._weights.doc_norms(weighting_scheme)
+        return self._matrices[weighting_scheme]
+
+    def query_matrix(self, token_lists, weighting_scheme='tfidf'):
+        """Matriks query (N_QUERY x N_TERMS, CSR) beserta norma tiap baris query."""
+        indptr, cols, values = [0], [], []
+        for query_tokens in token_lists:
+            for term, tf in Counter(query_tokens).items():
+                term_id = self._term_id(term)
+                if term_id < 0:
+                    continue
+                cols.append(term_id)
+                values.append(query_term_weight(tf, float(self._idf[term_id]), weighting_scheme))
+            indptr.append(len(cols))
+        n_terms = len(self._indptr) - 1
+        values = np.asarray(values, dtype=np.float64)
+        q_mat = sparse.csr_matrix((values, np.asarray(cols, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+                                  shape=(len(token_lists), n_terms))
+        q_norms = np.sqrt(np.asarray(q_mat.multiply(q_mat).sum(axis=1)).ravel())
+        return q_mat, q_norms
+
+    def query_vector(self, query_tokens, weighting_scheme='tfidf'):
+        """Vektor query (1 x N_TERMS, CSR) beserta normanya."""
+        q_mat, q_norms = self.query_matrix([query_tokens], weighting_scheme)
+        return q_mat, float(q_norms[0])
+
+    def score(self, query_tokens, weighting_scheme='tfidf', k=None):
+        """
+        Cosine similarity query vs semua dokumen dengan satu perkalian
+        matriks sparse, lalu seleksi top-k parsial (argpartition).
+        Mengembalikan: list[(doc_id, score)] terurut menurun.
+        """
+        if weighting_scheme not in WEIGHTING_SCHEMES:
+            raise ValueError(f"Skema pembobotan '{weighting_scheme}' tidak dikenal.")
+        if not query_tokens:
+            return []
+
+        matrix = self._matrix(weighting_scheme)
+        q_vec, q_norm = self.query_vector(query_tokens, weighting_scheme)
+        if q_vec.nnz == 0 or q_norm == 0:
+            return []
+
+        dots = q_vec @ matrix # (1 x N_DOCS), hanya dokumen yang terlibat
+        rows, dot_values = dots.indices, dots.data
+        if len(rows) == 0:
+            return []
+        scores = dot_values / (self._norms[weighting_scheme][rows] * q_norm)
+        return self._top_k(rows, scores, k)
+
+    def score_many(self, token_lists, weighting_scheme='tfidf', k=None, normalize=True):
+        """
+        Skor banyak query sekaligus: satu perkalian matriks sparse
+        (N_QUERY x N_TERMS) @ (N_TERMS x N_DOCS), postings term yang dipakai
+        bersama hanya dilintasi sekali. normalize=False -> dot product murni
+        (sama dengan _calculate_vsm_scores), True -> cosine similarity.
+        Mengembalikan: list (sejajar token_lists) of list[(doc_id, score)].
+        """
+        if weighting_scheme not in WEIGHTING_SCHEMES:
+            raise ValueError(f"Skema pembobotan '{weighting_scheme}' tidak dikenal.")
+        if not token_lists:
+            return []
+
+        matrix = self._matrix(weighting_scheme)
+        q_mat, q_norms = self.query_matrix(token_lists, weighting_scheme)
+        products = (q_mat @ matrix).tocsr() # (N_QUERY x N_DOCS)
+        doc_norms = self._norms[weighting_scheme]
+
+        results = []
+        for i in range(products.shape[0]):
+            start, end = products.indptr[i], products.indptr[i + 1]
+            rows, scores = products.indices[start:end], products.data[start:end]
+            if len(rows) == 0 or (normalize and q_norms[i] == 0):
+                results.append([])
+                continue
+            if normalize:
+                scores = scores / (doc_norms[rows] * q_norms[i])
+            results.append(self._top_k(rows, scores, k))
+        return results
+
+    def _top_k(self, rows, scores, k):
+        doc_ids = self._doc_ids[rows]
+        if k is not None and 0 < k < len(scores):
+            # Ambil semua kandidat >= skor ke-k agar seri di batas tetap dipecah oleh Doc_ID
+            kth_score = -np.partition(-scores, k - 1)[k - 1]
+            selected = scores >= kth_score
+            doc_ids, scores = doc_ids[selected], scores[selected]
+        # Skor menurun; Doc_ID menaik sebagai pemecah seri
+        order = np.lexsort((doc_ids, -scores))
+        if k is not None and k > 0:
+            order = order[:k]
+        return list(zip(doc_ids[order].tolist(), scores[order].tolist()))
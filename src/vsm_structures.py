@@ -1,3 +1,11 @@
+import math
+import numpy as np
+
+# ======================================================================
+# 1. STRUKTUR LAMA (LINKED LIST)
+# Dipertahankan agar file 'vsm_index_tf.pkl' versi lama tetap bisa
+# di-unpickle. Indeks baru TIDAK lagi memakai kelas ini.
+# ======================================================================
 class Node:
     def __init__(self, docId, freq=None):
         self.freq = freq # TF-IDF weight
@@ -6,4 +14,151 @@ class Node:
 
 class SlinkedList:
     def __init__(self, head=None):
-        self.head = head
\ No newline at end of file
+        self.head = head
+
+# ======================================================================
+# 2. STRUKTUR BARU (POSTINGS RINGKAS BERBASIS ARRAY)
+# ======================================================================
+class Postings:
+    """
+    Postings list ringkas untuk satu term: dua array NumPy sejajar yang
+    terurut berdasarkan Doc_ID.
+        doc_ids -> int32, Doc_ID (terurut naik, unik)
+        tfs     -> int32, raw TF term di dokumen tersebut
+        max_tf  -> TF terbesar, dasar skor batas-atas (upper bound) term
+    """
+    __slots__ = ('doc_ids', 'tfs', 'max_tf')
+
+    def __init__(self, doc_ids, tfs, max_tf=None):
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        self.tfs = np.asarray(tfs, dtype=np.int32)
+        if max_tf is None:
+            max_tf = int(self.tfs.max()) if len(self.tfs) else 0
+        self.max_tf = max_tf
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def __iter__(self):
+        """Iterasi (doc_id, tf) sebagai int Python."""
+        return zip(self.doc_ids.tolist(), self.tfs.tolist())
+
+    def __getstate__(self):
+        # Simpan sebagai bytes mentah agar pickle tidak bergantung versi NumPy
+        return (self.doc_ids.tobytes(), self.tfs.tobytes())
+
+    def __setstate__(self, state):
+        doc_ids_bytes, tfs_bytes = state
+        self.doc_ids = np.frombuffer(doc_ids_bytes, dtype=np.int32)
+        self.tfs = np.frombuffer(tfs_bytes, dtype=np.int32)
+        self.max_tf = int(self.tfs.max()) if len(self.tfs) else 0
+
+    def __repr__(self):
+        return f"Postings(df={len(self)})"
+
+def build_postings(pairs):
+    """Membuat Postings dari iterable (doc_id, tf); diurutkan berdasarkan Doc_ID."""
+    pairs = sorted(pairs)
+    doc_ids = [doc_id for doc_id, _ in pairs]
+    tfs = [tf for _, tf in pairs]
+    return Postings(doc_ids, tfs)
+
+# ======================================================================
+# 3. SKEMA PEMBOBOTAN (dipakai saat build & saat query)
+# ======================================================================
+# W_d semua skema dihitung saat build (compute_posting_weights) dan
+# disimpan per posting; saat query skor = sum(W_q x W_d tersimpan).
+#   tfidf     : W_d = tf x idf,                 W_q = tf x idf
+#   sublinear : W_d = (1 + log10 tf) x idf,     W_q = (1 + log10 tf) x idf
+#   bm25      : W_d = idf_bm25 x tf(k1+1) / (tf + k1(1 - b + b dl/avgdl)),
+#               W_q = tf query (term berulang dihitung berulang)
+WEIGHTING_SCHEMES = ('tfidf', 'sublinear', 'bm25')
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+def doc_term_weights(tfs, idf, weighting_scheme='tfidf'):
+    """Bobot dokumen W_d skema tfidf/sublinear untuk array raw TF (> 0) dari postings (vektorisasi NumPy)."""
+    tfs = np.asarray(tfs, dtype=np.float64)
+    if weighting_scheme == 'sublinear':
+        return (1 + np.log10(tfs)) * idf
+    return tfs * idf
+
+def bm25_idf(df, n_docs):
+    """IDF BM25 (varian Lucene, selalu positif): ln(1 + (N - df + 0.5) / (df + 0.5))."""
+    df = np.asarray(df, dtype=np.float64)
+    return np.log1p((n_docs - df + 0.5) / (df + 0.5))
+
+def bm25_weights(tfs, doc_lens, idf, avgdl, k1=BM25_K1, b=BM25_B):
+    """Bobot dokumen W_d BM25 per posting (doc_lens = panjang dokumen tiap posting)."""
+    tfs = np.asarray(tfs, dtype=np.float64)
+    relative_len = np.asarray(doc_lens, dtype=np.float64) / avgdl if avgdl > 0 else 1.0
+    return idf * tfs * (k1 + 1) / (tfs + k1 * (1 - b + b * relative_len))
+
+def query_term_weight(tf, idf, weighting_scheme='tfidf'):
+    """Bobot query W_q untuk satu term."""
+    if weighting_scheme == 'bm25':
+        return float(tf)
+    if weighting_scheme == 'sublinear' and tf > 0:
+        return (1 + math.log10(tf)) * idf
+    return tf * idf
+
+def compute_posting_weights(post_ptr, post_docs, post_tfs, idf, doc_ids, n_docs=None):
+    """
+    Menghitung sekali (vektorisasi NumPy) untuk semua WEIGHTING_SCHEMES:
+    bobot W_d per posting, norma |d| per dokumen, dan W_d maksimum per term
+    (skor batas-atas MaxScore). Postings dalam format CSR (post_ptr per term,
+    post_docs/post_tfs sejajar); 'doc_ids' = Doc_ID terurut (baris norma).
+    Panjang dokumen BM25 = jumlah TF semua term di dokumen (= jumlah token);
+    'n_docs' (default len(doc_ids)) juga menghitung dokumen tanpa token.
+
+    Mengembalikan dict: doc_lens, avgdl, n_docs, weights/norms/max_weights (per skema).
+    """
+    post_ptr = np.asarray(post_ptr, dtype=np.int64)
+    post_tfs = np.asarray(post_tfs)
+    df = np.diff(post_ptr)
+    n_docs = len(doc_ids) if n_docs is None else n_docs
+    rows = np.searchsorted(doc_ids, post_docs)
+    doc_lens = np.bincount(rows, weights=post_tfs, minlength=len(doc_ids)).astype(np.int64)
+    avgdl = float(doc_lens.sum()) / n_docs if n_docs else 0.0
+    starts = post_ptr[:-1][df > 0]
+
+    result = {'doc_lens': doc_lens, 'avgdl': avgdl, 'n_docs': n_docs, 'weights': {}, 'norms': {}, 'max_weights': {}}
+    for scheme in WEIGHTING_SCHEMES:
+        if scheme == 'bm25':
+            weights = bm25_weights(post_tfs, doc_lens[rows], np.repeat(bm25_idf(df, n_docs), df), avgdl)
+        else:
+            weights = doc_term_weights(post_tfs, np.repeat(idf, df), scheme)
+        max_weights = np.zeros(len(df), dtype=np.float64)
+        if len(starts):
+            max_weights[df > 0] = np.maximum.reduceat(weights, starts)
+        result['weights'][scheme] = weights
+        result['norms'][scheme] = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=len(doc_ids)))
+        result['max_weights'][scheme] = max_weights
+    return result
+
+# ======================================================================
+# 4. ADAPTER INDEKS LAMA -> BARU
+# ======================================================================
+def linked_list_to_postings(linked_list):
+    """Mengubah satu SlinkedList (head dummy + node Doc_ID/TF) menjadi Postings."""
+    pairs = []
+    current_node = linked_list.head.nextval if linked_list.head is not None else None
+    while current_node is not None:
+        pairs.append((current_node.doc, current_node.freq))
+        current_node = current_node.nextval
+    return build_postings(pairs)
+
+def ensure_compact_index(vsm_index):
+    """
+    Memastikan indeks VSM berformat dict(term -> Postings).
+    Indeks lama (dict(term -> SlinkedList)) dikonversi sekali saat dimuat,
+    sehingga file .pkl lama tetap bisa dipakai tanpa build ulang.
+    """
+    if not vsm_index:
+        return vsm_index
+    if all(isinstance(postings, Postings) for postings in vsm_index.values()):
+        return vsm_index
+    return {
+        term: postings if isinstance(postings, Postings) else linked_list_to_postings(postings)
+        for term, postings in vsm_index.items()
+    }
@@ -6,6 +6,7 @@ import os
 import re
 from src import utils
 from src import mesin_pencari
+from src import instrumentation
 
 # --- FUNGSI LOGGING (NONAKTIF SEMENTARA) ---
 # ... (tetap nonaktif) ...
@@ -52,42 +53,74 @@ st.sidebar.title("Panel Admin")
 admin_password = st.sidebar.text_input("Masukkan Password Admin", type="password")
 
 admin_pass_rahasia = st.secrets.get("ADMIN_PASSWORD", "1234")
+fusion = mesin_pencari.DEFAULT_FUSION # Cara skor ulasan digabung per tempat (bisa diubah admin)
 
 if admin_password == admin_pass_rahasia:
     st.sidebar.success("Mode Admin Aktif")
+    fusion = st.sidebar.selectbox(
+        "Fusi Skor Tempat",
+        mesin_pencari.FUSION_METHODS,
+        index=mesin_pencari.FUSION_METHODS.index(mesin_pencari.DEFAULT_FUSION),
+        help="max: ulasan terbaik | sum: total skor | mean_top_n: rata-rata 3 ulasan teratas | rating_blend: relevansi + Avg_Rating"
+    )
     st.sidebar.subheader("📊 Wawasan Pencarian")
     
     try:
-        # 1. Panggil fungsi CSV
-        # Baca 500 log terakhir untuk statistik yang baik
-        df_log = utils.baca_riwayat_csv(limit=500) 
+        # 1. Ambil statistik dari rollup store analitik (tidak membaca ulang seluruh log)
+        analitik = utils.baca_analitik(n_top=5, n_recent=50)
         
-        if df_log.empty:
+        if analitik['searches'] == 0:
             st.sidebar.info("Belum ada riwayat pencarian.")
         else:
+            st.sidebar.metric(
+                label="Total Pencarian",
+                value=f"{analitik['searches']}",
+                delta=f"{analitik['zero_result_rate']:.1%} tanpa hasil",
+                delta_color="off"
+            )
+
             st.sidebar.markdown("**Kueri Paling Populer:**")
             
-            # 2. Hitung 5 kueri teratas
-            top_queries = df_log['query_mentah'].value_counts().head(5)
-            
-            # 3. Tampilkan sebagai st.metric yang bersih
-            for query, count in top_queries.items():
+            # 2. Tampilkan 5 kueri teratas sebagai st.metric yang bersih
+            for query, count in analitik['top_queries']:
                 st.sidebar.metric(label=f"'{query}'", value=f"{count} kali")
             
-            # Tampilkan wawasan lain jika kolomnya ada
-            if 'region' in df_log.columns:
+            if analitik['top_regions']:
                 st.sidebar.markdown("**Region Paling Populer:**")
-                # Filter 'None' atau string kosong
-                top_regions = df_log[df_log['region'].notna() & (df_log['region'] != 'None')]['region'].value_counts().head(3)
-                for region, count in top_regions.items():
+                for region, count in analitik['top_regions']:
                     st.sidebar.metric(label=f"'{region}'", value=f"{count} kali")
 
+            if analitik['top_zero_result_queries']:
+                with st.sidebar.expander("Kueri Tanpa Hasil"):
+                    for query, count in analitik['top_zero_result_queries']:
+                        st.write(f"'{query}' — {count} kali")
+
             with st.sidebar.expander("Riwayat Pencarian Lengkap"):
-                st.dataframe(df_log.head(50)) # Tampilkan 50 teratas di sini
+                st.dataframe(analitik['recent']) # 50 log terbaru
             
     except Exception as e:
         st.sidebar.error(f"Gagal mengambil data log: {e}")
 
+    # Instrumentasi latensi per tahap (span no-op saat dimatikan)
+    st.sidebar.subheader("⏱️ Latensi per Tahap")
+    if st.sidebar.toggle("Aktifkan instrumentasi", value=instrumentation.ENABLED):
+        instrumentation.enable()
+    else:
+        instrumentation.disable()
+    ringkasan_latensi = instrumentation.histogram_summaries()
+    if not ringkasan_latensi:
+        st.sidebar.info("Belum ada data latensi (aktifkan lalu lakukan pencarian).")
+    else:
+        st.sidebar.dataframe(
+            pd.DataFrame.from_dict(ringkasan_latensi, orient='index').round(3)[['n', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']]
+        )
+        if instrumentation.RECENT_TRACES:
+            trace_terakhir = instrumentation.RECENT_TRACES[-1]
+            with st.sidebar.expander(f"Kueri Terakhir: '{trace_terakhir['query']}' ({trace_terakhir['total_ms']:.1f} ms)"):
+                st.json(trace_terakhir['stages_ms'])
+        if st.sidebar.button("Reset Statistik Latensi"):
+            instrumentation.reset()
+
 elif admin_password: # Jika password diisi tapi salah
     st.sidebar.error("Password admin salah.")
 
@@ -123,41 +156,51 @@ with col_main:
 # ======================================================================
 
 # --- Inisialisasi state jika belum ada ---
-if 'results_df' not in st.session_state:
-    st.session_state.results_df = pd.DataFrame()
 if 'query_info' not in st.session_state:
     st.session_state.query_info = {}
+if 'page' not in st.session_state:
+    st.session_state.page = 0 # Halaman hasil (mulai 0); kartu dibuat per halaman saja
 
 # --- 1. LOGIKA SAAT PENCARIAN BARU DILAKUKAN ---
 if tombol_cari and query_input:
     st.session_state.search_performed = True
     st.session_state.modal_data = None # Tutup modal lama jika ada
     
-    with st.spinner("⏳ Menganalisis ulasan dan mencari rekomendasi..."):
+    with st.spinner("⏳ Menganalisis ulasan dan mencari rekomendasi..."), \
+            instrumentation.trace(query_input, fusion=fusion) as trace:
         vsm_tokens, intent, region = mesin_pencari.analyze_full_query(query_input)
-        results = mesin_pencari.search_by_keyword(vsm_tokens, intent, region)
 
-        utils.log_pencarian_csv(query_input, vsm_tokens, intent, region)
-        
-        # Simpan hasil ke session state agar tidak hilang saat rerun
-        st.session_state.results_df = pd.DataFrame(results)
+        # Halaman pertama dihitung di sini agar jumlah hasil ikut tercatat
+        # (peringkatnya di-cache, jadi tampilan di bawah tidak menskor ulang)
+        first_page = mesin_pencari.search_page(
+            vsm_tokens, intent, region, offset=0, limit=mesin_pencari.DEFAULT_PAGE_SIZE, fusion=fusion
+        )
+        utils.log_pencarian_csv(query_input, vsm_tokens, intent, region, n_hasil=first_page['total'])
+        trace['n_hasil'] = first_page['total']
         
-        # Simpan semua info kueri ke session state
+        # Simpan info kueri ke session state; hasil diambil per halaman saat ditampilkan
+        # (peringkat tempat di-cache oleh mesin_pencari, jadi pindah halaman tidak menskor ulang)
         st.session_state.query_info = {
             "query": query_input,
             "tokens": vsm_tokens,
             "intent": intent,
-            "region": region
+            "region": region,
+            "fusion": fusion
         }
+        st.session_state.page = 0
 
 # --- 2. LOGIKA UNTUK MENAMPILKAN HASIL ---
 # (Berjalan jika pencarian *pernah* dilakukan, terlepas dari tombol_cari)
 if st.session_state.search_performed:
     st.divider()
     
-    # Ambil data dari session state
-    df_results = st.session_state.results_df
+    # Ambil info kueri dari session state, lalu hanya halaman yang sedang dilihat
     info = st.session_state.query_info
+    page_size = mesin_pencari.DEFAULT_PAGE_SIZE
+    page = mesin_pencari.search_page(
+        info['tokens'], info['intent'], info['region'],
+        offset=st.session_state.page * page_size, limit=page_size, fusion=info['fusion']
+    )
     
     res_margin1, res_content, res_margin2 = st.columns([1, 3, 1])
     
@@ -169,14 +212,14 @@ if st.session_state.search_performed:
 
         st.write("") 
 
-        if df_results.empty:
+        if page['total'] == 0:
             st.warning("Maaf, tidak ditemukan tempat kemah yang cocok dengan kueri Anda.")
         else:
+            st.caption(f"Menampilkan {page['offset'] + 1}-{page['offset'] + len(page['results'])} dari {page['total']} tempat")
             grid_cols = st.columns(3) 
             
-            for index, item_row in df_results.iterrows():
+            for index, item in enumerate(page['results'], start=page['offset']):
 
-                item = item_row.to_dict()
                 col = grid_cols[index % 3]
                 
                 with col:
@@ -212,6 +255,20 @@ if st.session_state.search_performed:
                         if st.button("Lihat Detail & Harga", key=f"btn_{index}", use_container_width=True):
                             st.session_state.selected_item = item # Simpan data item (dict)
 
+            # --- Navigasi halaman ---
+            nav_prev, nav_info, nav_next = st.columns([1, 2, 1])
+            with nav_prev:
+                if st.button("⬅️ Sebelumnya", disabled=st.session_state.page == 0, use_container_width=True):
+                    st.session_state.page -= 1
+                    st.rerun()
+            with nav_info:
+                total_pages = -(-page['total'] // page_size)
+                st.markdown(f"<p style='text-align: center;'>Halaman {st.session_state.page + 1} dari {total_pages}</p>", unsafe_allow_html=True)
+            with nav_next:
+                if st.button("Berikutnya ➡️", disabled=not page['has_more'], use_container_width=True):
+                    st.session_state.page += 1
+                    st.rerun()
+
         # --- 3. BLOK DIALOG (DITEMPATKAN SETELAH LOOP) ---
         # Ini akan berjalan jika 'selected_item' BUKAN None
         if st.session_state.selected_item:
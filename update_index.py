@@ -0,0 +1,101 @@
+import argparse
+import os
+import subprocess
+import sys
+import pandas as pd
+
+try:
+    from src.indexer import preprocess_corpus, count_document_frequencies, compute_idf, build_vsm_index, build_metadata
+    from src.mmap_index import open_index, MappedMetadata, INDEX_FILENAME
+    from src import preprocessing
+    from src.places import PlaceTable
+    from src.segments import (
+        open_segmented_index, add_segment, needs_merge, merge_segments, DEFAULT_MAX_SEGMENTS
+    )
+except ImportError as e:
+    print(f"❌ FATAL ERROR: Gagal mengimpor modul. Pastikan semua file .py ada: {e}")
+    exit()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_PATH = os.path.join(BASE_DIR, 'Documents', 'corpus_master.csv')
+INFO_STATIS_PATH = os.path.join(BASE_DIR, 'Documents', 'info_tempat.csv')
+ASSETS_DIR = os.path.join(BASE_DIR, 'Assets')
+
+def jalankan_merge_background():
+    """Menjalankan 'update_index.py --merge' sebagai proses terpisah (tidak ditunggu)."""
+    print("🔄 Jumlah segmen melewati batas. Penggabungan segmen berjalan di background...")
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--merge'],
+        cwd=BASE_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+def main():
+    """
+    Indexing inkremental: hanya Doc_ID baru (lebih besar dari Doc_ID
+    terakhir yang sudah terindeks) yang diproses dan ditulis sebagai satu
+    segmen immutable baru. Aset lama tidak ditulis ulang.
+    """
+    parser = argparse.ArgumentParser(description="Indexing inkremental berbasis segmen")
+    parser.add_argument("--input", type=str, default=DATASET_PATH, help="CSV ulasan (kolom sama dengan corpus_master.csv)")
+    parser.add_argument("--max-segments", type=int, default=DEFAULT_MAX_SEGMENTS, help="Batas jumlah segmen sebelum digabung")
+    parser.add_argument("--merge", action="store_true", help="Hanya gabungkan segmen tambahan, lalu keluar")
+    parser.add_argument("--no-background", action="store_true", help="Gabungkan segmen di proses ini (tidak di background)")
+    args = parser.parse_args()
+
+    if args.merge:
+        merged = merge_segments(ASSETS_DIR)
+        print(f"✅ Segmen digabung menjadi: {merged}" if merged else "Tidak ada segmen yang perlu digabung.")
+        return
+
+    base_index = open_index(ASSETS_DIR)
+    if base_index is None:
+        print(f"❌ FATAL ERROR: {INDEX_FILENAME} tidak ditemukan. Jalankan 'build_index.py' terlebih dahulu.")
+        return
+    index = open_segmented_index(ASSETS_DIR, base_index)
+    max_doc_id = index.max_doc_id() if index is not None else int(base_index.doc_id_array()[-1])
+
+    # 1. Ambil hanya ulasan baru
+    df_input = pd.read_csv(args.input)
+    df_new = df_input[df_input['Doc_ID'] > max_doc_id].copy()
+    if df_new.empty:
+        print(f"✅ Tidak ada ulasan baru (Doc_ID terakhir: {max_doc_id}).")
+        return
+    print(f"🔄 Mengindeks {len(df_new)} ulasan baru (Doc_ID > {max_doc_id})...")
+
+    # 2. Preprocessing & postings HANYA untuk dokumen baru
+    df_new = preprocess_corpus(df_new)
+    df_counts = count_document_frequencies(df_new['Clean_Tokens'])
+    idf_local = compute_idf(df_counts, len(df_new)) # IDF global dihitung saat query
+    vsm_index = build_vsm_index(df_new['Doc_ID'], df_new['Clean_Tokens'])
+    print(f"   Kamus stem: {preprocessing.STEM_CACHE.format_stats()}")
+    try:
+        preprocessing.save_stem_cache()
+    except OSError as e:
+        print(f"⚠️ Gagal menyimpan kamus stem: {e}")
+
+    # 3. Metadata; Avg_Rating memperhitungkan rating ulasan yang sudah terindeks
+    existing = index.metadata_frame() if index is not None else MappedMetadata(base_index).to_dataframe()
+    df_metadata = build_metadata(df_new, INFO_STATIS_PATH, rating_history=existing)
+
+    # 4. Tulis segmen baru (tempat segmen diberi region agar partisi region tetap lengkap)
+    places = PlaceTable.from_metadata(df_metadata)
+    places.assign_regions(preprocessing.classify_location)
+    filename = add_segment(ASSETS_DIR, idf_local, vsm_index, df_metadata, places=places)
+    if filename is None:
+        # Proses update lain sudah mendaftarkan Doc_ID ini selagi kita memproses
+        print(f"⚠️ Segmen dilewati: ulasan Doc_ID > {max_doc_id} sudah diindeks proses lain. Jalankan ulang untuk sisanya.")
+        return
+    print(f"✅ SUKSES: Segmen '{filename}' ditambahkan ({len(df_new)} dokumen).")
+
+    # 5. Gabungkan segmen jika sudah terlalu banyak
+    if needs_merge(ASSETS_DIR, args.max_segments):
+        if args.no_background:
+            print(f"✅ Segmen digabung menjadi: {merge_segments(ASSETS_DIR)}")
+        else:
+            jalankan_merge_background()
+
+if __name__ == "__main__":
+    main()